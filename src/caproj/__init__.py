@@ -1,10 +1,42 @@
 import logging
-from pkg_resources import get_distribution, DistributionNotFound
+import sys
+
+
+def __getattr__(name):
+    """Resolve ``__version__`` lazily to keep ``import caproj`` fast
+
+    Importing package metadata tools is slow, so the installed version is
+    only looked up the first time ``caproj.__version__`` is accessed.
+    """
+    if name == "__version__":
+        try:
+            from importlib.metadata import version, PackageNotFoundError
+        except ImportError:  # python < 3.8
+            from pkg_resources import get_distribution, DistributionNotFound
+
+            try:
+                return get_distribution(__name__).version
+            except DistributionNotFound:
+                # package is not installed
+                pass
+        else:
+            try:
+                return version(__name__)
+            except PackageNotFoundError:
+                # package is not installed
+                pass
+    raise AttributeError(
+        "module '{}' has no attribute '{}'".format(__name__, name)
+    )
+
+
+if sys.version_info < (3, 7):
+    # module __getattr__ (PEP 562) is ignored before python 3.7, so the
+    # version is looked up eagerly
+    try:
+        __version__ = __getattr__("__version__")
+    except AttributeError:
+        pass
 
-try:
-    __version__ = get_distribution(__name__).version
-except DistributionNotFound:
-    # package is not installed
-    pass
 
 logging.getLogger('caproj').addHandler(logging.NullHandler())
@@ -0,0 +1,289 @@
+"""
+caproj.bench
+~~~~~~~~~~~~
+
+This module contains the benchmark suite used to time and memory-profile the
+:mod:`caproj.data` operations across data sizes, and to compare results
+against a stored baseline
+
+**Module functions:**
+
+.. autosummary::
+
+   make_bench_data
+   run_benchmarks
+   compare_results
+   save_results
+   load_results
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+   BENCHMARKS
+   DEFAULT_SIZES
+
+|
+"""
+import gc
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import caproj
+from caproj.data import BaseData
+from caproj.data.synthetic import SyntheticDataGenerator
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+DEFAULT_SIZES = (10000, 1000000, 10000000)
+"""Default numbers of rows for which each benchmark is run"""
+
+
+def make_bench_data(n_rows, seed=0):
+    """Generate a dataframe shaped like the NYC capital projects dataset
+
+    :param n_rows: number of records to generate
+    :type n_rows: int
+    :param seed: random seed, defaults to 0
+    :type seed: int, optional
+    :return: dataframe with dirty numeric, date and text columns generated by
+             :class:`caproj.data.synthetic.SyntheticDataGenerator`
+    :rtype: pandas.DataFrame
+    """
+    return SyntheticDataGenerator(seed=seed).generate(n_rows)
+
+
+def _bench_from_file(df, tmpdir):
+    """Benchmark reading csv into ``BaseData``
+
+    The csv file is written once per data size and reused by every run,
+    since ``tmpdir`` is only shared by runs on the same data.
+    """
+    filepath = os.path.join(tmpdir, "bench.csv")
+    if not os.path.exists(filepath):
+        df.to_csv(filepath, index=False)
+    return lambda: BaseData.from_file(filepath)
+
+
+def _bench_to_file(df, tmpdir):
+    """Benchmark writing ``BaseData.df`` to csv"""
+    data = BaseData(df.copy(), copy_input=False)
+    filepath = os.path.join(tmpdir, "bench_out.csv")
+    return lambda: data.to_file(filepath)
+
+
+def _bench_set_dtypes(colname, dtype):
+    """Benchmark converting one column with ``BaseData.set_dtypes``"""
+    def setup(df, tmpdir):
+        data = BaseData(df.copy(), copy_input=False)
+        return lambda: data.set_dtypes(map_dict={colname: dtype})
+
+    return setup
+
+
+def _bench_to_datetime(df, tmpdir):
+    """Benchmark ``BaseData._to_datetime`` on the date column"""
+    data = BaseData(df.copy(), copy_input=False)
+    return lambda: data._to_datetime("Date Reported As Of")
+
+
+def _bench_method(method, **kwargs):
+    """Benchmark a ``BaseData`` method called with ``kwargs``"""
+    def setup(df, tmpdir):
+        data = BaseData(df.copy(), copy_input=False)
+        return lambda: getattr(data, method)(**kwargs)
+
+    return setup
+
+
+BENCHMARKS = OrderedDict(
+    [
+        ("from_file", _bench_from_file),
+        ("to_file", _bench_to_file),
+        ("set_dtypes[float]", _bench_set_dtypes("Budget Forecast", "float")),
+        ("set_dtypes[integer]", _bench_set_dtypes("Budget Forecast", "integer")),
+        (
+            "set_dtypes[datetime]",
+            _bench_set_dtypes("Date Reported As Of", "datetime"),
+        ),
+        ("set_dtypes[string]", _bench_set_dtypes("PID", "string")),
+        ("_to_datetime", _bench_to_datetime),
+        (
+            "concat_values",
+            _bench_method(
+                "concat_values",
+                columns=["PID", "Date Reported As Of"],
+                to_colname="ID",
+            ),
+        ),
+        (
+            "sort_values",
+            _bench_method("sort_values", by=["PID", "Date Reported As Of"]),
+        ),
+        (
+            "remove_missing_records",
+            _bench_method("remove_missing_records", columns=["PID"]),
+        ),
+        ("lint_colnames", _bench_method("lint_colnames")),
+    ]
+)
+"""Benchmark names mapped to setup functions returning the callable to time"""
+
+
+def _measure(setup, df, tmpdir, repeat):
+    """Return best run time in seconds and peak memory in bytes of a benchmark
+
+    Timing runs and the memory run are separate so that ``tracemalloc``
+    overhead does not distort timings. Setup is excluded from both.
+    """
+    seconds = list()
+    for _ in range(repeat):
+        func = setup(df, tmpdir)
+        gc.collect()
+        t1 = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - t1)
+
+    func = setup(df, tmpdir)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(seconds), peak
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, names=None, repeat=3, seed=0):
+    """Run benchmarks for each data size
+
+    :param sizes: numbers of rows to benchmark, defaults to
+                  :data:`DEFAULT_SIZES`
+    :type sizes: list of int, optional
+    :param names: names of :data:`BENCHMARKS` to run, if None all are run,
+                  defaults to None
+    :type names: list of str, optional
+    :param repeat: number of timed runs per benchmark, the fastest is
+                   reported, defaults to 3
+    :type repeat: int, optional
+    :param seed: random seed for generated data, defaults to 0
+    :type seed: int, optional
+    :return: results dictionary with environment metadata and a list of
+             per-benchmark ``seconds`` and ``peak_memory`` (bytes) records
+    :rtype: dict
+    :raise KeyError: if ``names`` contains an unknown benchmark
+    """
+    names = list(BENCHMARKS) if names is None else names
+    for name in names:
+        if name not in BENCHMARKS:
+            raise KeyError("unknown benchmark '{}'".format(name))
+
+    results = list()
+    for n_rows in sizes:
+        df = make_bench_data(n_rows, seed=seed)
+        # files written by benchmark setups are reused for this size only
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in names:
+                seconds, peak = _measure(BENCHMARKS[name], df, tmpdir, repeat)
+                results.append(
+                    {
+                        "benchmark": name,
+                        "rows": n_rows,
+                        "seconds": seconds,
+                        "peak_memory": peak,
+                    }
+                )
+                log.info(
+                    "{} rows={} {:.4f} sec, peak memory {:.1f} MB".format(
+                        name, n_rows, seconds, peak / 2 ** 20
+                    ),
+                    extra={"function": name, "duration": seconds, "rows": n_rows},
+                )
+
+    return {
+        "caproj_version": getattr(caproj, "__version__", None),
+        "python_version": platform.python_version(),
+        "pandas_version": pd.__version__,
+        "numpy_version": np.__version__,
+        "results": results,
+    }
+
+
+def compare_results(results, baseline, threshold=0.1):
+    """Flag benchmarks that are slower or use more memory than a baseline
+
+    :param results: results dictionary from :func:`run_benchmarks`
+    :type results: dict
+    :param baseline: baseline results dictionary from :func:`run_benchmarks`
+    :type baseline: dict
+    :param threshold: relative increase over baseline flagged as a
+                      regression, defaults to 0.1 (i.e. 10%)
+    :type threshold: float, optional
+    :return: list of regression records with ``benchmark``, ``rows``,
+             ``metric``, ``baseline``, ``current`` and ``change`` keys
+    :rtype: list of dict
+    """
+    baseline_lookup = {
+        (record["benchmark"], record["rows"]): record
+        for record in baseline["results"]
+    }
+    regressions = list()
+    for record in results["results"]:
+        base = baseline_lookup.get((record["benchmark"], record["rows"]))
+        if base is None:
+            continue
+        for metric in ["seconds", "peak_memory"]:
+            if base[metric] <= 0:
+                continue
+            change = record[metric] / base[metric] - 1
+            if change > threshold:
+                regressions.append(
+                    {
+                        "benchmark": record["benchmark"],
+                        "rows": record["rows"],
+                        "metric": metric,
+                        "baseline": base[metric],
+                        "current": record[metric],
+                        "change": change,
+                    }
+                )
+    return regressions
+
+
+def save_results(results, filepath):
+    """Save benchmark results to json file
+
+    :param results: results dictionary from :func:`run_benchmarks`
+    :type results: dict
+    :param filepath: json file path
+    :type filepath: str
+    """
+    dirname = os.path.dirname(filepath)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    with open(filepath, "wt") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(filepath):
+    """Load benchmark results from json file
+
+    :param filepath: json file path
+    :type filepath: str
+    :return: results dictionary
+    :rtype: dict
+    """
+    with open(filepath, "rt") as f:
+        return json.load(f)
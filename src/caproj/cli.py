@@ -23,29 +23,342 @@ cause problems: the code will get executed twice:
 .. autosummary::
 
    main
+   run
+   batch
+   bench
+   serve
+   watch
 
 |
 """
 import argparse
+import os
 
 
-parser = argparse.ArgumentParser(description='Command description.')
-parser.add_argument('names', metavar='NAME', nargs=argparse.ZERO_OR_MORE,
-                    help="A name of something.")
+parser = argparse.ArgumentParser(
+    prog="caproj", description="NYC capital projects data operations."
+)
+subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+run_parser = subparsers.add_parser(
+    "run", help="Run a declarative data pipeline defined in a json file."
+)
+run_parser.add_argument(
+    "pipeline", metavar="PIPELINE", help="Path to pipeline json file."
+)
+run_parser.add_argument(
+    "--checkpoint-dir",
+    metavar="DIR",
+    default=None,
+    help="Directory for step checkpoints, e.g. 'data/interim'. "
+    "Checkpointing is disabled if not given.",
+)
+run_parser.add_argument(
+    "--no-resume",
+    dest="resume",
+    action="store_false",
+    help="Rerun all steps instead of resuming from the last checkpoint.",
+)
+
+batch_parser = subparsers.add_parser(
+    "batch", help="Run a pipeline over many input files in parallel."
+)
+batch_parser.add_argument(
+    "pipeline", metavar="PIPELINE", help="Path to pipeline json file."
+)
+batch_parser.add_argument(
+    "--inputs",
+    metavar="GLOB",
+    nargs="+",
+    default=None,
+    help="Glob pattern(s) of input files, e.g. 'data/raw/*.csv'.",
+)
+batch_parser.add_argument(
+    "--manifest",
+    metavar="FILE",
+    default=None,
+    help="Text file listing one input file path per line.",
+)
+batch_parser.add_argument(
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of worker processes (default: number of CPUs).",
+)
+batch_parser.add_argument(
+    "--checkpoint-dir",
+    metavar="DIR",
+    default=None,
+    help="Directory for step checkpoints of every input file.",
+)
+
+bench_parser = subparsers.add_parser(
+    "bench", help="Benchmark caproj data operations across data sizes."
+)
+bench_parser.add_argument(
+    "--sizes",
+    metavar="N",
+    type=int,
+    nargs="+",
+    default=None,
+    help="Numbers of rows to benchmark (default: 10000 1000000 10000000).",
+)
+bench_parser.add_argument(
+    "--benchmarks",
+    metavar="NAME",
+    nargs="+",
+    default=None,
+    help="Names of benchmarks to run (default: all).",
+)
+bench_parser.add_argument(
+    "--repeat", type=int, default=3, help="Timed runs per benchmark."
+)
+bench_parser.add_argument(
+    "--output",
+    metavar="FILE",
+    default=os.path.join("reports", "bench.json"),
+    help="Json file to which results are saved.",
+)
+bench_parser.add_argument(
+    "--baseline",
+    metavar="FILE",
+    default=None,
+    help="Json results file to compare against.",
+)
+bench_parser.add_argument(
+    "--threshold",
+    type=float,
+    default=0.1,
+    help="Relative slowdown or memory increase flagged as regression.",
+)
+
+serve_parser = subparsers.add_parser(
+    "serve", help="Serve queries on pipeline output kept in memory."
+)
+serve_parser.add_argument(
+    "pipeline", metavar="PIPELINE", help="Path to pipeline json file."
+)
+serve_parser.add_argument(
+    "--host", default="127.0.0.1", help="Host address to bind."
+)
+serve_parser.add_argument("--port", type=int, default=8000, help="Port to bind.")
+serve_parser.add_argument(
+    "--id-col", default="PID", help="Name of the project ID column."
+)
+serve_parser.add_argument(
+    "--reload-interval",
+    type=float,
+    default=2.0,
+    help="Seconds between checks for changed input and schema files.",
+)
+
+watch_parser = subparsers.add_parser(
+    "watch",
+    help="Rerun affected pipeline steps when input or schema files change.",
+)
+watch_parser.add_argument(
+    "pipeline", metavar="PIPELINE", help="Path to pipeline json file."
+)
+watch_parser.add_argument(
+    "--interval",
+    type=float,
+    default=1.0,
+    help="Seconds between checks for changed input and schema files.",
+)
+
+
+def run(args):
+    """Run a declarative ``caproj.data.pipeline.Pipeline`` json file
+
+    Prints the run time of each pipeline step once the pipeline completes
+
+    :param args: ``argparse.Namespace`` parsed command line arguments
+    """
+    from caproj.data.pipeline import Pipeline
+    from caproj.logger import start_logging
+
+    start_logging()
+    pipeline = Pipeline.from_json(
+        args.pipeline, checkpoint_dir=args.checkpoint_dir
+    )
+    pipeline.run(resume=args.resume)
+    for step, seconds in pipeline.timings:
+        print("{:<24} {:>10.3f} sec".format(step, seconds))
+
+
+def batch(args):
+    """Run a pipeline json file over many input files in a process pool
+
+    The pipeline's ``from_file`` filename is replaced by each input file and
+    ``{stem}`` in its ``to_file`` target is replaced by the input file name.
+    Prints a per-file status and an aggregated summary, and exits with status
+    1 if any file failed
+
+    :param args: ``argparse.Namespace`` parsed command line arguments
+    """
+    from caproj.data.batch import check_targets, expand_inputs, run_batch
+    from caproj.data.pipeline import Pipeline
+    from caproj.logger import start_logging
+
+    filenames = expand_inputs(patterns=args.inputs, manifest=args.manifest)
+    if not filenames:
+        parser.error("batch found no input files, use --inputs or --manifest")
+
+    start_logging()
+    pipeline = Pipeline.from_json(
+        args.pipeline, checkpoint_dir=args.checkpoint_dir
+    )
+    try:
+        check_targets(pipeline, filenames)
+    except ValueError as exc:
+        parser.error(str(exc))
+    summary = run_batch(pipeline, filenames, workers=args.workers)
+
+    for result in summary["results"]:
+        print(
+            "{:<7} {:>10.3f} sec {:>10} rows  {}{}".format(
+                result["status"].upper(),
+                result["seconds"],
+                result["rows"],
+                result["filename"],
+                "  ({})".format(result["error"]) if result["error"] else "",
+            )
+        )
+    print(
+        "{files} files, {succeeded} succeeded, {failed} failed, {rows} rows "
+        "in {seconds:.3f} sec ({rows_per_sec:.0f} rows/sec, "
+        "{files_per_sec:.2f} files/sec)".format(**summary)
+    )
+    if summary["failed"]:
+        parser.exit(1)
+
+
+def bench(args):
+    """Run the ``caproj.bench`` benchmark suite and save results as json
+
+    If a baseline is given, regressions are printed and the command exits
+    with status 1
+
+    :param args: ``argparse.Namespace`` parsed command line arguments
+    """
+    from caproj import bench as caproj_bench
+
+    sizes = args.sizes or caproj_bench.DEFAULT_SIZES
+    results = caproj_bench.run_benchmarks(
+        sizes=sizes, names=args.benchmarks, repeat=args.repeat
+    )
+    caproj_bench.save_results(results, args.output)
+    for record in results["results"]:
+        print(
+            "{:<24} {:>10} rows {:>10.4f} sec {:>10.1f} MB".format(
+                record["benchmark"],
+                record["rows"],
+                record["seconds"],
+                record["peak_memory"] / 2 ** 20,
+            )
+        )
+    print("results saved to {}".format(args.output))
+
+    if args.baseline:
+        regressions = caproj_bench.compare_results(
+            results,
+            caproj_bench.load_results(args.baseline),
+            threshold=args.threshold,
+        )
+        for reg in regressions:
+            print(
+                "REGRESSION {} rows={} {}: {:.4g} -> {:.4g} ({:+.1%})".format(
+                    reg["benchmark"],
+                    reg["rows"],
+                    reg["metric"],
+                    reg["baseline"],
+                    reg["current"],
+                    reg["change"],
+                )
+            )
+        if regressions:
+            parser.exit(1)
+        print("no regressions against {}".format(args.baseline))
+
+
+def serve(args):
+    """Load pipeline output once and serve queries over local HTTP
+
+    Runs until interrupted, reloading the data whenever the pipeline's input
+    or schema files change
+
+    :param args: ``argparse.Namespace`` parsed command line arguments
+    """
+    from caproj.data.pipeline import Pipeline
+    from caproj.logger import start_logging
+    from caproj.service import DataService, make_server
+
+    start_logging()
+    service = DataService(
+        Pipeline.from_json(args.pipeline),
+        id_col=args.id_col,
+        reload_interval=args.reload_interval,
+    )
+    server = make_server(service, host=args.host, port=args.port)
+    service.start_watching()
+    print("serving on http://{}:{}".format(*server.server_address[:2]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop_watching()
+        server.server_close()
+
+
+def watch(args):
+    """Run a pipeline and rerun its affected steps whenever sources change
+
+    Runs until interrupted
+
+    :param args: ``argparse.Namespace`` parsed command line arguments
+    """
+    from caproj.data.pipeline import Pipeline
+    from caproj.data.watch import PipelineWatcher
+    from caproj.logger import start_logging
+
+    start_logging()
+    watcher = PipelineWatcher(
+        Pipeline.from_json(args.pipeline), interval=args.interval
+    )
+    print(
+        "watching {}".format(", ".join(watcher.pipeline.source_files()))
+    )
+    try:
+        watcher.watch()
+    except KeyboardInterrupt:
+        watcher.stop()
 
 
 def main(args=None):
-    """Placeholder function for testing and to illustrate ``caproj`` cli
+    """Run the ``caproj`` command line app
 
-    Prints list of input arguments
+    Prints the help message if no command is given
 
-    :param args: ``str`` or ``NoneType``, default is ``None``
+    :param args: ``list`` of ``str`` or ``NoneType``, default is ``None``
 
     Example::
 
-        >> python -m caproj foo bar
-        ['foo', 'bar']
+        >> python -m caproj run pipeline.json
+        from_file                     0.012 sec
+        ...
 
     """
     args = parser.parse_args(args=args)
-    print(args.names)
+    if args.command == "run":
+        run(args)
+    elif args.command == "batch":
+        batch(args)
+    elif args.command == "bench":
+        bench(args)
+    elif args.command == "serve":
+        serve(args)
+    elif args.command == "watch":
+        watch(args)
+    else:
+        parser.print_help()
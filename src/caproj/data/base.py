@@ -20,11 +20,11 @@ This module contains the core :mod:`caproj.data` read and write functionality
 """
 import json
 import logging
-import math
 import os
 
 import pandas as pd
 
+from caproj.data.stats import DataStats
 from caproj.logger import logfunc
 
 log = logging.getLogger(__name__)
@@ -43,6 +43,8 @@ class BaseDataOps(object):
                     ``copy_input`` parameter set to ``True`` during
                     :meth:`BaseDataOps.from_file` or :meth:`~BaseDataOps.from_object`
                     class creation
+    :cvar self.stats: :class:`~caproj.data.stats.DataStats` object providing
+                 lazily computed and cached statistics for ``self.df``
 
     **Class methods:**
 
@@ -51,25 +53,38 @@ class BaseDataOps(object):
        BaseDataOps.from_file
        BaseDataOps.from_object
        BaseDataOps.to_file
+       BaseDataOps.stats
        BaseDataOps.log_record_count
        BaseDataOps.lint_colnames
        BaseDataOps.rename_columns
        BaseDataOps.set_dtypes
     """
 
+    _stats = None
+
     def __init__(self, df_input, copy_input):
         if copy_input:
             self.df_input = df_input.copy()  # input df persists for reference
         self.df = df_input  # all basedata changes applied to this df
         self.log = logging.getLogger(self.__class__.__name__)
 
-        try:
-            self.log_record_count()
-        except Exception as error:
-            self.log.exception(
-                "During __init__ of {} class, unable to log record count with "
-                "exception: {}".format(self.__class__.__name__, error)
-            )
+        # only the O(1) record count is logged here, unique counts and other
+        # statistics are computed on demand through self.stats
+        self.log.info(
+            "Number of project change records: {}".format(len(self.df)),
+            extra={"rows": len(self.df)},
+        )
+
+    @property
+    def stats(self):
+        """Lazily created :class:`~caproj.data.stats.DataStats` for ``self.df``
+
+        The statistics object is rebuilt if ``self.df`` has been replaced by
+        a different dataframe since the statistics were last read.
+        """
+        if self._stats is None or self._stats.df is not self.df:
+            self._stats = DataStats(self.df)
+        return self._stats
 
     @classmethod
     @logfunc(log=log, funcname=True, docdescr=True, argvals=True, runtime=False)
@@ -135,13 +150,21 @@ class BaseDataOps(object):
 
     def log_record_count(self, id_col="PID"):
         """Log number of records and unique projects in `BaseDataOps.df`
+
+        Counts are read from the cached ``BaseDataOps.stats`` object, so
+        repeated calls do not rescan the ``id_col`` column.
+
+        :param id_col: name of the project ID column, defaults to "PID"
+        :type id_col: str, optional
+        :raise KeyError: if ``id_col`` does not exist in ``BaseDataOps.df``
         """
         self.log.info(
-            "Number of project change records: {}".format(len(self.df))
+            "Number of project change records: {}".format(self.stats.n_records),
+            extra={"rows": self.stats.n_records},
         )
         self.log.info(
             "Number of unique projects in dataset: {}".format(
-                self.df[id_col].nunique()
+                self.stats.n_unique(id_col)
             )
         )
 
@@ -155,6 +178,8 @@ class BaseDataOps(object):
             for col in orig_colnames
         ]
         self.df.columns = new_colnames
+        if self._stats is not None:
+            self._stats.rename(dict(zip(orig_colnames, new_colnames)))
 
         # log changes to colnames
         changed_colnames = [
@@ -256,6 +281,8 @@ class BaseDataOps(object):
             return
 
         self.df.rename(columns=map_dict, inplace=True)
+        if self._stats is not None:
+            self._stats.rename(map_dict)
 
     @logfunc(log=log, funcname=True, docdescr=True, argvals=True, runtime=False)
     def set_dtypes(self, map_dict=None, json_path=None, coerce=False):
@@ -328,9 +355,17 @@ class BaseDataOps(object):
                             len(dtype_errors_dict[colname]),
                             dtype_errors_dict[colname],
                         ),
-                    )
+                    ),
+                    extra={
+                        "function": "set_dtypes",
+                        "column": colname,
+                        "dtype": dtype,
+                        "errors": len(dtype_errors_dict[colname]),
+                    },
                 )
                 self.df[colname] = series_coerce if coerce else series_ignore
+                if self._stats is not None:
+                    self._stats.invalidate(columns=colname)
             else:
                 dtype_errors_dict[
                     colname
@@ -362,7 +397,7 @@ class BaseDataOps(object):
             string_series != series_coerce.astype(str)
         ].to_dict()
         dict_errors = {
-            key: val for key, val in dict_errors.items() if not math.isnan(val)
+            key: val for key, val in dict_errors.items() if not pd.isnull(val)
         }
         return series_ignore, series_coerce, dict_errors
 
@@ -398,3 +433,4 @@ class BaseDataOps(object):
             na_position=na_position,
             ignore_index=ignore_index,
         )
+        # record order does not affect cached self.stats, so nothing is reset
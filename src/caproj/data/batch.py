@@ -0,0 +1,219 @@
+"""
+caproj.data.batch
+~~~~~~~~~~~~~~~~~
+
+This module contains functionality for applying one
+:class:`~caproj.data.pipeline.Pipeline` to many input files in parallel
+
+**Module functions:**
+
+.. autosummary::
+
+   check_targets
+   expand_inputs
+   read_manifest
+   run_batch
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+
+|
+"""
+import glob
+import logging
+import os
+import time
+
+from caproj.pool import run_in_pool
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+
+def read_manifest(filepath):
+    """Read input file paths from a manifest file
+
+    The manifest lists one file path per line. Blank lines and lines
+    starting with '#' are ignored, and relative paths are resolved against
+    the directory containing the manifest.
+
+    :param filepath: path to manifest file
+    :type filepath: str
+    :return: list of input file paths
+    :rtype: list of str
+    """
+    dirname = os.path.dirname(filepath)
+    with open(filepath, "rt") as f:
+        lines = [line.strip() for line in f]
+    return [
+        os.path.join(dirname, line)
+        for line in lines
+        if line and not line.startswith("#")
+    ]
+
+
+def expand_inputs(patterns=None, manifest=None):
+    """Return sorted, de-duplicated input files from glob patterns and manifest
+
+    :param patterns: glob pattern(s) of input files, defaults to None
+    :type patterns: str or list of str, optional
+    :param manifest: path to a manifest file read with :func:`read_manifest`,
+                     defaults to None
+    :type manifest: str, optional
+    :return: list of input file paths
+    :rtype: list of str
+    """
+    patterns = [patterns] if isinstance(patterns, str) else patterns or []
+    filenames = [fp for pattern in patterns for fp in glob.glob(pattern)]
+    if manifest:
+        filenames.extend(read_manifest(manifest))
+    return sorted(set(filenames))
+
+
+def _run_one(pipeline, filename):
+    """Run pipeline for a single input file, capturing any exception
+
+    :param pipeline: :class:`~caproj.data.pipeline.Pipeline` to apply
+    :param filename: input file path
+    :type filename: str
+    :return: result dictionary with ``filename``, ``status``, ``seconds``,
+             ``rows`` and ``error`` keys
+    :rtype: dict
+    """
+    t1 = time.perf_counter()
+    try:
+        data = pipeline.for_input(filename).run()
+    except Exception as error:
+        log.exception("batch input {} failed".format(filename))
+        return {
+            "filename": filename,
+            "status": "failed",
+            "seconds": time.perf_counter() - t1,
+            "rows": 0,
+            "error": "{}: {}".format(type(error).__name__, error),
+        }
+    return {
+        "filename": filename,
+        "status": "ok",
+        "seconds": time.perf_counter() - t1,
+        "rows": len(data.df),
+        "error": None,
+    }
+
+
+def _failed(args, error):
+    """Return result of an input whose worker process died"""
+    return {
+        "filename": args[1],
+        "status": "failed",
+        "seconds": 0.0,
+        "rows": 0,
+        "error": "{}: {}".format(type(error).__name__, error),
+    }
+
+
+def check_targets(pipeline, filenames):
+    """Check that inputs of a batch do not overwrite each other's output
+
+    :param pipeline: :class:`~caproj.data.pipeline.Pipeline` to apply
+    :param filenames: input file paths
+    :type filenames: list of str
+    :raise ValueError: if there are several inputs and a ``to_file`` target
+                       has no ``{stem}`` placeholder, or if two inputs
+                       resolve to the same target file or, with
+                       checkpointing, the same checkpoint name
+    """
+    if len(filenames) > 1:
+        for target in pipeline.target_files():
+            if "{stem}" not in target:
+                raise ValueError(
+                    "to_file target '{}' has no {{stem}} placeholder, so all "
+                    "{} inputs would write the same file".format(
+                        target, len(filenames)
+                    )
+                )
+    targets, names = dict(), dict()
+    for filename in filenames:
+        input_pipeline = pipeline.for_input(filename)
+        for target in input_pipeline.target_files():
+            target = os.path.abspath(target)
+            if target in targets:
+                raise ValueError(
+                    "inputs {} and {} both write {}".format(
+                        targets[target], filename, target
+                    )
+                )
+            targets[target] = filename
+        if pipeline.checkpoint_dir:
+            if input_pipeline.name in names:
+                raise ValueError(
+                    "inputs {} and {} share the checkpoint name '{}'".format(
+                        names[input_pipeline.name], filename, input_pipeline.name
+                    )
+                )
+            names[input_pipeline.name] = filename
+
+
+def run_batch(pipeline, filenames, workers=None):
+    """Apply a pipeline to every input file using a process pool
+
+    Failures are isolated per file: an exception raised while processing one
+    file is recorded in its result and does not stop the other files. If
+    queue-based logging was started with a multiprocessing queue (see
+    :func:`caproj.logger.start_logging`), worker processes forward their log
+    records to it. Schema files are read once in the calling process and
+    sent to the workers with the pipeline.
+
+    :param pipeline: :class:`~caproj.data.pipeline.Pipeline` to apply, its
+                     ``from_file`` filename is replaced for each input
+    :param filenames: input file paths
+    :type filenames: list of str
+    :param workers: number of worker processes, if 1 files are processed in
+                    the calling process, if None ``os.cpu_count()`` is used,
+                    defaults to None
+    :type workers: int, optional
+    :return: summary dictionary with counts of ``files``, ``succeeded`` and
+             ``failed`` inputs, total ``rows``, wall ``seconds``,
+             ``rows_per_sec``, ``files_per_sec`` and per-file ``results``
+    :rtype: dict
+    :raise ValueError: if inputs would overwrite each other's output, see
+                       :func:`check_targets`
+    """
+    check_targets(pipeline, filenames)
+    pipeline.load_schemas()
+    workers = workers or os.cpu_count() or 1
+    t1 = time.perf_counter()
+    results = list(
+        run_in_pool(
+            _run_one,
+            [(pipeline, filename) for filename in filenames],
+            workers,
+            on_error=_failed,
+        )
+    )
+    order = {filename: i for i, filename in enumerate(filenames)}
+    results.sort(key=lambda result: order[result["filename"]])
+
+    seconds = time.perf_counter() - t1
+    rows = sum(result["rows"] for result in results)
+    failed = [result for result in results if result["status"] != "ok"]
+    summary = {
+        "files": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else 0.0,
+        "files_per_sec": len(results) / seconds if seconds else 0.0,
+        "results": results,
+    }
+    log.info(
+        "batch processed {} files ({} failed), {} rows in {:.3f} sec".format(
+            summary["files"], summary["failed"], rows, seconds
+        ),
+        extra={"rows": rows, "duration": seconds, "errors": len(failed)},
+    )
+    return summary
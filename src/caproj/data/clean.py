@@ -33,7 +33,7 @@ class CleanMixin(object):
 
     def _concat_values(self, columns):
         """"""
-        columns = list(columns) if type(columns) != list else columns
+        columns = [columns] if isinstance(columns, str) else list(columns)
 
         class ZeroObject(object):
             def __add__(self, other):
@@ -54,8 +54,10 @@ class CleanMixin(object):
                         from dataframe
         :type columns: str or list of str
         """
-        columns = list(columns) if type(columns) != list else columns
+        columns = [columns] if isinstance(columns, str) else list(columns)
         self.df.dropna(subset=columns, axis=0, inplace=True)
+        if getattr(self, "_stats", None) is not None:
+            self._stats.invalidate()
 
     @logfunc(log=log, funcname=True, docdescr=True, argvals=True, runtime=False)
     def concat_values(self, columns, to_colname):
@@ -71,6 +73,8 @@ class CleanMixin(object):
         :type to_colname: str
         """
         self.df[to_colname] = self._concat_values(columns=columns)
+        if getattr(self, "_stats", None) is not None:
+            self._stats.invalidate(columns=to_colname)
 
     def check_duplicates(self, columns):
         """Check column or combination of columns for duplicate records
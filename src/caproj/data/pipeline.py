@@ -0,0 +1,547 @@
+"""
+caproj.data.pipeline
+~~~~~~~~~~~~~~~~~~~~
+
+This module contains the declarative pipeline runner used to apply a sequence
+of ``BaseData`` operations defined in a json file
+
+**Module classes:**
+
+.. autosummary::
+
+   Pipeline
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+   PIPELINE_STEPS
+   CHECKPOINT_FORMATS
+
+|
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import time
+
+import pandas as pd
+
+from caproj.data import BaseData
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+PIPELINE_STEPS = (
+    "from_file",
+    "lint_colnames",
+    "rename_columns",
+    "set_dtypes",
+    "remove_missing_records",
+    "concat_values",
+    "sort_values",
+    "to_file",
+)
+"""Names of ``BaseData`` methods that can be used as pipeline steps"""
+
+CHECKPOINT_FORMATS = {
+    "pickle": (".pkl", pd.DataFrame.to_pickle, pd.read_pickle),
+    "parquet": (".parquet", pd.DataFrame.to_parquet, pd.read_parquet),
+}
+"""Checkpoint file formats mapped to (extension, write, read) functions"""
+
+# BaseData attributes not saved in checkpoint state files: the frame is saved
+# in the checkpoint itself and df_input is restored from the input
+_UNSAVED_ATTRS = ("df", "df_input", "log", "_stats")
+
+
+def _hash_file(filepath, chunksize=2 ** 20):
+    """Return hex digest of a file's contents
+
+    :param filepath: path to file
+    :type filepath: str
+    :param chunksize: number of bytes read per chunk, defaults to 2 ** 20
+    :type chunksize: int, optional
+    :return: hex digest string
+    :rtype: str
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunksize), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Pipeline(object):
+    """Run a declarative list of ``BaseData`` steps with per-step timing
+
+    Each step is a dictionary with a ``"step"`` key naming one of the
+    :data:`PIPELINE_STEPS` and any remaining keys passed to that ``BaseData``
+    method as keyword arguments. The first step must be ``from_file``, e.g.::
+
+        {
+            "steps": [
+                {"step": "from_file", "filename": "data/raw/projects.csv"},
+                {"step": "lint_colnames"},
+                {"step": "set_dtypes", "json_path": "dtypes.json"},
+                {"step": "to_file", "target_filename": "data/interim/out.csv"}
+            ]
+        }
+
+    All steps operate in place on the single ``BaseData`` object created by
+    ``from_file``, so no intermediate copies of the dataframe are made.
+    Schema files referenced via ``json_path`` are read once per
+    :class:`Pipeline` and reused by every step (and every run) that refers
+    to them, until the file's modification time or size changes.
+
+    If a ``checkpoint_dir`` is given, the dataframe is saved after each step
+    under a key hashing the input file contents and the parameters of that
+    step and all preceding steps (including the contents of schema files).
+    A later run resumes from the last step whose checkpoint is still valid.
+    Individual steps can opt out with ``"checkpoint": false``. The
+    ``to_file`` step is never checkpointed and always runs. Other attributes
+    set by steps, such as ``dtype_errors`` from ``set_dtypes``, are pickled
+    to a ``.state`` file next to each checkpoint, and ``df_input`` is read
+    from the ``from_file`` checkpoint or input file, so a resumed run
+    returns the same ``BaseData`` attributes as a run from scratch.
+    Checkpoints that no longer match the current input, steps or schemas
+    are removed with :meth:`Pipeline.prune_checkpoints`.
+
+    :param steps: list of step dictionaries
+    :type steps: list of dict
+    :param name: descriptive name used in logs and checkpoint file names,
+                 defaults to "pipeline"
+    :type name: str, optional
+    :param checkpoint_dir: directory in which to save step checkpoints, if
+                           None no checkpoints are used, defaults to None
+    :type checkpoint_dir: str, optional
+    :param checkpoint_format: one of :data:`CHECKPOINT_FORMATS`, 'parquet'
+                              requires ``pyarrow``, defaults to "pickle"
+    :type checkpoint_format: str, optional
+    :cvar self.timings: list of (step name, run time in seconds) tuples
+                        recorded during the most recent :meth:`Pipeline.run`
+    :raise ValueError: if the steps are empty, do not start with
+                       ``from_file``, or contain unknown step names, or if
+                       ``checkpoint_format`` is invalid
+
+    **Class methods:**
+
+    .. autosummary::
+
+       Pipeline.from_json
+       Pipeline.for_input
+       Pipeline.source_files
+       Pipeline.target_files
+       Pipeline.load_schemas
+       Pipeline.clear_schemas
+       Pipeline.step_kwargs
+       Pipeline.checkpoint_keys
+       Pipeline.is_checkpointed
+       Pipeline.prune_checkpoints
+       Pipeline.run
+    """
+
+    def __init__(
+        self,
+        steps,
+        name="pipeline",
+        checkpoint_dir=None,
+        checkpoint_format="pickle",
+    ):
+        self.steps = [dict(step) for step in steps]
+        self.name = name
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_format = checkpoint_format
+        self.timings = list()
+        self._schemas = dict()
+        self._validate()
+
+    @classmethod
+    def from_json(cls, filepath, **kwargs):
+        """Create pipeline from a json file
+
+        The file may contain either a list of steps or an object with a
+        ``"steps"`` key.
+
+        :param filepath: path to the pipeline json file
+        :type filepath: str
+        :param kwargs: optional args to :class:`Pipeline`
+        :return: :class:`Pipeline` object
+        """
+        with open(filepath, "rt") as f:
+            config = json.load(f)
+        steps = config["steps"] if isinstance(config, dict) else config
+        kwargs.setdefault(
+            "name", os.path.splitext(os.path.basename(filepath))[0]
+        )
+        return cls(steps, **kwargs)
+
+    def for_input(self, filename):
+        """Return a copy of this pipeline that reads a different input file
+
+        The ``filename`` of the ``from_file`` step is replaced, and any
+        ``{stem}`` placeholder in a ``to_file`` step's ``target_filename`` is
+        replaced with the input file name without extension. The copy is
+        named ``<name>_<stem>`` so checkpoints of different inputs do not
+        collide, and it shares already loaded schema files with this
+        pipeline.
+
+        :param filename: input file path
+        :type filename: str
+        :return: :class:`Pipeline` object
+        """
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        steps = [dict(step) for step in self.steps]
+        steps[0]["filename"] = filename
+        for step in steps:
+            if step["step"] == "to_file" and "target_filename" in step:
+                step["target_filename"] = step["target_filename"].format(
+                    stem=stem
+                )
+        pipeline = self.__class__(
+            steps,
+            name="{}_{}".format(self.name, stem),
+            checkpoint_dir=self.checkpoint_dir,
+            checkpoint_format=self.checkpoint_format,
+        )
+        pipeline._schemas = self._schemas
+        return pipeline
+
+    def source_files(self):
+        """Return paths of the input file and all schema files used by steps
+
+        :return: list of file paths, input file first
+        :rtype: list of str
+        """
+        filenames = [self.steps[0]["filename"]]
+        for step in self.steps:
+            if step.get("json_path") and step["json_path"] not in filenames:
+                filenames.append(step["json_path"])
+        return filenames
+
+    def target_files(self):
+        """Return target file paths of all ``to_file`` steps
+
+        :return: list of file paths
+        :rtype: list of str
+        """
+        return [
+            step["target_filename"]
+            for step in self.steps
+            if step["step"] == "to_file" and "target_filename" in step
+        ]
+
+    def load_schemas(self):
+        """Read all schema files used by steps into the schema cache
+
+        Pipelines pickled afterwards, e.g. to be sent to worker processes,
+        carry the loaded schemas with them.
+        """
+        for step in self.steps:
+            if step.get("json_path") and not step.get("map_dict"):
+                self._read_schema(step["json_path"])
+
+    def clear_schemas(self):
+        """Drop cached schema files so they are read again on the next run"""
+        self._schemas.clear()
+
+    def _validate(self):
+        """Check that steps are known and that the pipeline reads a file first
+        """
+        if not self.steps:
+            raise ValueError("pipeline must contain at least one step")
+        for i, step in enumerate(self.steps):
+            if step.get("step") not in PIPELINE_STEPS:
+                raise ValueError(
+                    "step {} has invalid step name '{}', valid steps are "
+                    "{}".format(i, step.get("step"), PIPELINE_STEPS)
+                )
+        if self.steps[0]["step"] != "from_file":
+            raise ValueError("first pipeline step must be 'from_file'")
+        if self.checkpoint_format not in CHECKPOINT_FORMATS:
+            raise ValueError(
+                "checkpoint_format must be one of {}, got '{}'".format(
+                    list(CHECKPOINT_FORMATS), self.checkpoint_format
+                )
+            )
+
+    def _read_schema(self, json_path):
+        """Return schema dictionary from json file, reading it only if changed
+
+        The cached schema is keyed on the file's modification time and size,
+        so an edited schema file is read again and changes the checkpoint
+        keys of the steps using it.
+
+        :param json_path: path to schema json file
+        :type json_path: str
+        :return: dictionary read from file, or None if the file does not exist
+        :rtype: dict or None
+        """
+        try:
+            stat = os.stat(json_path)
+        except FileNotFoundError:
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._schemas.get(json_path)
+        if cached is None or cached[0] != version:
+            with open(json_path, "rt") as f:
+                cached = (version, json.load(f))
+            self._schemas[json_path] = cached
+        return cached[1]
+
+    def step_kwargs(self, step):
+        """Return method keyword arguments for a step, resolving schema files
+
+        The ``step`` and ``checkpoint`` keys are dropped, and a ``json_path``
+        is replaced with the schema it refers to as ``map_dict``, read
+        through the schema cache. A missing schema file is left as
+        ``json_path`` for the ``BaseData`` method to handle.
+
+        :param step: step dictionary
+        :type step: dict
+        :return: keyword arguments for the ``BaseData`` method
+        :rtype: dict
+        """
+        kwargs = {
+            key: val
+            for key, val in step.items()
+            if key not in ["step", "checkpoint"]
+        }
+        json_path = kwargs.get("json_path")
+        if json_path and not kwargs.get("map_dict"):
+            map_dict = self._read_schema(json_path)
+            if map_dict is not None:
+                kwargs["map_dict"] = map_dict
+                del kwargs["json_path"]
+        return kwargs
+
+    def checkpoint_keys(self, step_kwargs):
+        """Return chained checkpoint key for every step
+
+        The key of each step hashes the key of the preceding step with the
+        step's name and resolved parameters, while the first key also hashes
+        the contents of the input file. A step whose key is unchanged
+        between two calls produces the same output frame.
+
+        :param step_kwargs: resolved keyword arguments for every step, as
+                            returned by :meth:`Pipeline.step_kwargs`
+        :type step_kwargs: list of dict
+        :return: list of hex digest strings, one per step
+        :rtype: list of str
+        """
+        keys = list()
+        key = _hash_file(step_kwargs[0]["filename"])
+        for step, kwargs in zip(self.steps, step_kwargs):
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(key.encode())
+            digest.update(
+                json.dumps(
+                    [step["step"], kwargs], sort_keys=True, default=str
+                ).encode()
+            )
+            key = digest.hexdigest()
+            keys.append(key)
+        return keys
+
+    def _checkpoint_path(self, index, key):
+        """Return checkpoint file path for a step
+
+        :param index: position of step in pipeline
+        :type index: int
+        :param key: checkpoint key of step
+        :type key: str
+        :return: checkpoint file path
+        :rtype: str
+        """
+        ext, _, _ = CHECKPOINT_FORMATS[self.checkpoint_format]
+        return os.path.join(
+            self.checkpoint_dir,
+            "{}_{:02d}_{}_{}{}".format(
+                self.name, index, self.steps[index]["step"], key, ext
+            ),
+        )
+
+    def is_checkpointed(self, index):
+        """Check whether a step's output frame should be checkpointed
+
+        ``to_file`` steps and steps with ``"checkpoint": false`` are not
+        checkpointed.
+
+        :param index: position of step in pipeline
+        :type index: int
+        :return: True if the step's output frame is checkpointed
+        :rtype: bool
+        """
+        step = self.steps[index]
+        return step["step"] != "to_file" and step.get("checkpoint", True)
+
+    def _save_checkpoint(self, data, filepath):
+        """Write checkpoint and state files atomically so partial files are not
+        used, the state file first so that every checkpoint has its state
+        """
+        _, write, _ = CHECKPOINT_FORMATS[self.checkpoint_format]
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        state = {
+            key: val
+            for key, val in vars(data).items()
+            if key not in _UNSAVED_ATTRS
+        }
+        state_filepath = "{}.state".format(filepath)
+        with open("{}.tmp".format(state_filepath), "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace("{}.tmp".format(state_filepath), state_filepath)
+        tmp_filepath = "{}.tmp".format(filepath)
+        write(data.df, tmp_filepath)
+        os.replace(tmp_filepath, filepath)
+
+    def _load_checkpoint(self, data_cls, index, keys, step_kwargs):
+        """Return ``BaseData`` object as it was after a checkpointed step
+
+        :param data_cls: class used to create the object
+        :type data_cls: type
+        :param index: position of step in pipeline
+        :type index: int
+        :param keys: checkpoint keys of all steps
+        :type keys: list of str
+        :param step_kwargs: resolved keyword arguments for every step
+        :type step_kwargs: list of dict
+        :return: the ``BaseData`` object
+        """
+        _, _, read = CHECKPOINT_FORMATS[self.checkpoint_format]
+        filepath = self._checkpoint_path(index, keys[index])
+        data = data_cls(read(filepath), False)
+        with open("{}.state".format(filepath), "rb") as f:
+            vars(data).update(pickle.load(f))
+        if step_kwargs[0].get("copy_input", False):
+            input_filepath = self._checkpoint_path(0, keys[0])
+            if index == 0:
+                data.df_input = data.df.copy()
+            elif self.is_checkpointed(0) and os.path.exists(input_filepath):
+                data.df_input = read(input_filepath)
+            else:
+                data.df_input = data_cls.from_file(
+                    **dict(step_kwargs[0], copy_input=False)
+                ).df
+        return data
+
+    def prune_checkpoints(self):
+        """Remove checkpoint files of this pipeline that are no longer valid
+
+        Checkpoints written for a different input file content, different
+        step parameters or schemas, as well as leftover temporary files, are
+        removed. Checkpoints of other pipelines in the same directory are
+        kept.
+
+        :return: paths of removed files
+        :rtype: list of str
+        """
+        if not self.checkpoint_dir or not os.path.isdir(self.checkpoint_dir):
+            return list()
+        keys = self.checkpoint_keys(
+            [self.step_kwargs(step) for step in self.steps]
+        )
+        current = set()
+        for index, key in enumerate(keys):
+            filename = os.path.basename(self._checkpoint_path(index, key))
+            current.update([filename, "{}.state".format(filename)])
+        ext, _, _ = CHECKPOINT_FORMATS[self.checkpoint_format]
+        prefixes = [
+            "{}_{:02d}_{}_".format(self.name, index, step["step"])
+            for index, step in enumerate(self.steps)
+        ]
+        removed = list()
+        for filename in os.listdir(self.checkpoint_dir):
+            stem = filename
+            for suffix in (".tmp", ".state"):
+                if stem.endswith(suffix):
+                    stem = stem[: -len(suffix)]
+            ours = any(
+                stem.startswith(prefix)
+                and stem.endswith(ext)
+                and len(stem) == len(prefix) + 32 + len(ext)
+                for prefix in prefixes
+            )
+            if ours and filename not in current:
+                filepath = os.path.join(self.checkpoint_dir, filename)
+                os.remove(filepath)
+                removed.append(filepath)
+        log.info(
+            "{} pruned {} stale checkpoint files".format(self.name, len(removed))
+        )
+        return removed
+
+    def _resume_index(self, keys):
+        """Return index of last step with an existing checkpoint, or -1"""
+        for index in reversed(range(len(self.steps))):
+            filepath = self._checkpoint_path(index, keys[index])
+            if (
+                self.is_checkpointed(index)
+                and os.path.exists(filepath)
+                and os.path.exists("{}.state".format(filepath))
+            ):
+                return index
+        return -1
+
+    def run(self, data_cls=BaseData, resume=True):
+        """Execute all pipeline steps in order
+
+        :param data_cls: class used to read the input file, defaults to
+                         :class:`caproj.data.BaseData`
+        :type data_cls: type, optional
+        :param resume: whether to resume from the last valid checkpoint when
+                       a ``checkpoint_dir`` is set, defaults to True
+        :type resume: bool, optional
+        :return: the ``BaseData`` object after all steps have been applied
+        """
+        self.timings = list()
+        data = None
+        t_start = time.perf_counter()
+        step_kwargs = [self.step_kwargs(step) for step in self.steps]
+        keys = None
+        start = 0
+
+        if self.checkpoint_dir:
+            keys = self.checkpoint_keys(step_kwargs)
+            resume_index = self._resume_index(keys) if resume else -1
+            if resume_index >= 0:
+                data = self._load_checkpoint(
+                    data_cls, resume_index, keys, step_kwargs
+                )
+                start = resume_index + 1
+                log.info(
+                    "{} resumed from checkpoint {} after step {}".format(
+                        self.name,
+                        self._checkpoint_path(resume_index, keys[resume_index]),
+                        self.steps[resume_index]["step"],
+                    )
+                )
+
+        for index in range(start, len(self.steps)):
+            name = self.steps[index]["step"]
+            kwargs = step_kwargs[index]
+            t1 = time.perf_counter()
+            if name == "from_file":
+                data = data_cls.from_file(**kwargs)
+            else:
+                getattr(data, name)(**kwargs)
+            if keys and self.is_checkpointed(index):
+                self._save_checkpoint(
+                    data, self._checkpoint_path(index, keys[index])
+                )
+            t2 = time.perf_counter() - t1
+            self.timings.append((name, t2))
+            log.info(
+                "{} step {} run time: {:.3f} sec".format(self.name, name, t2),
+                extra={"function": name, "duration": t2},
+            )
+
+        log.info(
+            "{} completed {} steps in {:.3f} sec".format(
+                self.name, len(self.steps) - start, time.perf_counter() - t_start
+            ),
+            extra={"rows": len(data.df)},
+        )
+        return data
@@ -0,0 +1,140 @@
+"""
+caproj.data.stats
+~~~~~~~~~~~~~~~~~
+
+This module contains the lazily computed, cached dataset statistics used by
+:mod:`caproj.data` classes
+
+**Module classes:**
+
+.. autosummary::
+
+   DataStats
+
+|
+"""
+import pandas as pd
+
+
+class DataStats(object):
+    """Lazily compute and cache summary statistics for a ``pandas.DataFrame``
+
+    No statistic is computed when the object is created. Each statistic is
+    computed per column the first time it is read and cached afterwards.
+    Methods that mutate the underlying dataframe in place are expected to call
+    :meth:`DataStats.invalidate` or :meth:`DataStats.rename` so that only the
+    affected cache entries are recomputed.
+
+    :param df: pandas.DataFrame for which statistics are reported
+    :cvar self.df: the pandas.DataFrame the cached statistics refer to
+
+    **Class methods:**
+
+    .. autosummary::
+
+       DataStats.n_records
+       DataStats.n_unique
+       DataStats.null_counts
+       DataStats.memory_usage
+       DataStats.invalidate
+       DataStats.rename
+       DataStats.to_dict
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._n_unique = dict()
+        self._null_counts = dict()
+        self._memory_usage = dict()
+
+    @property
+    def n_records(self):
+        """Number of records (rows) in the dataframe"""
+        return len(self.df)
+
+    def n_unique(self, column="PID"):
+        """Return cached number of unique non-null values in a column
+
+        :param column: name of the column, defaults to "PID"
+        :type column: str, optional
+        :return: number of unique values
+        :rtype: int
+        :raise KeyError: if ``column`` does not exist in the dataframe
+        """
+        if column not in self._n_unique:
+            self._n_unique[column] = self.df[column].nunique()
+        return self._n_unique[column]
+
+    @property
+    def null_counts(self):
+        """Number of missing values per column, as a ``pandas.Series``"""
+        missing = [col for col in self.df.columns if col not in self._null_counts]
+        if missing:
+            self._null_counts.update(self.df[missing].isnull().sum().to_dict())
+        return pd.Series(
+            [self._null_counts[col] for col in self.df.columns],
+            index=self.df.columns,
+            dtype="int64",
+        )
+
+    @property
+    def memory_usage(self):
+        """Total memory usage of the dataframe and its index in bytes"""
+        missing = [col for col in self.df.columns if col not in self._memory_usage]
+        if missing:
+            self._memory_usage.update(
+                self.df[missing].memory_usage(index=False, deep=True).to_dict()
+            )
+        return int(
+            sum(self._memory_usage[col] for col in self.df.columns)
+            + self.df.index.memory_usage(deep=True)
+        )
+
+    def invalidate(self, columns=None):
+        """Drop cached statistics so they are recomputed on next read
+
+        :param columns: name(s) of columns whose values changed, if None all
+                        cached statistics are dropped (e.g. after records are
+                        added or removed), defaults to None
+        :type columns: str or list of str, optional
+        """
+        if columns is None:
+            self._n_unique.clear()
+            self._null_counts.clear()
+            self._memory_usage.clear()
+            return
+
+        columns = [columns] if isinstance(columns, str) else columns
+        for cache in [self._n_unique, self._null_counts, self._memory_usage]:
+            for col in columns:
+                cache.pop(col, None)
+
+    def rename(self, map_dict):
+        """Carry cached statistics over to renamed columns
+
+        :param map_dict: column name mapping {current_value: new_value}
+        :type map_dict: dict
+        """
+        for cache in [self._n_unique, self._null_counts, self._memory_usage]:
+            renamed = {
+                map_dict.get(col, col): val for col, val in cache.items()
+            }
+            cache.clear()
+            cache.update(renamed)
+
+    def to_dict(self, id_col="PID"):
+        """Return all statistics as a dictionary
+
+        :param id_col: name of the project ID column used for the unique
+                       count, defaults to "PID"
+        :type id_col: str, optional
+        :return: dictionary of ``n_records``, ``n_unique``, ``null_counts``
+                 and ``memory_usage`` statistics
+        :rtype: dict
+        """
+        return {
+            "n_records": self.n_records,
+            "n_unique": self.n_unique(id_col),
+            "null_counts": self.null_counts.to_dict(),
+            "memory_usage": self.memory_usage,
+        }
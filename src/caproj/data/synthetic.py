@@ -0,0 +1,438 @@
+"""
+caproj.data.synthetic
+~~~~~~~~~~~~~~~~~~~~~
+
+This module contains a seeded, vectorized generator of synthetic data shaped
+like the NYC Capital Projects dataset, for use in benchmarks and load tests
+
+**Module classes:**
+
+.. autosummary::
+
+   SyntheticDataGenerator
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+   DEFAULT_ERROR_RATES
+   DEFAULT_MISSING_RATES
+
+|
+"""
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+DEFAULT_ERROR_RATES = {
+    "Date Reported As Of": 0.002,
+    "Design Start": 0.01,
+    "Budget Forecast": 0.01,
+    "Latest Budget Changes": 0.005,
+    "Total Budget Changes": 0.005,
+    "Forecast Completion": 0.01,
+}
+"""Default fraction of values per column replaced with invalid entries"""
+
+DEFAULT_MISSING_RATES = {
+    "PID": 0.001,
+    "Date Reported As Of": 0.001,
+    "Description": 0.05,
+    "Borough": 0.1,
+    "Design Start": 0.05,
+    "Budget Forecast": 0.01,
+    "Forecast Completion": 0.02,
+}
+"""Default fraction of values per column left blank"""
+
+_DATE_COLUMNS = ("Date Reported As Of", "Design Start", "Forecast Completion")
+
+_CATEGORIES = np.array(
+    [
+        "Streets and Roadways",
+        "Sewers",
+        "Water Supply",
+        "Schools",
+        "Health and Hospitals",
+        "Parks",
+        "Public Safety and Criminal Justice",
+        "Libraries",
+        "Bridges",
+        "Industrial Development",
+    ],
+    dtype=object,
+)
+_BOROUGHS = np.array(
+    ["Manhattan", "Brooklyn", "Queens", "Bronx", "Staten Island", "Citywide"],
+    dtype=object,
+)
+_AGENCIES = np.array(
+    ["DDC", "DEP", "DOT", "DPR", "SCA", "HHC", "EDC", "DCAS", "NYPD", "FDNY"],
+    dtype=object,
+)
+_PHASES = np.array(
+    ["Scope", "Design", "Procurement", "Construction", "Close-Out"],
+    dtype=object,
+)
+_WORDS = np.array(
+    [
+        "reconstruction",
+        "upgrade",
+        "of",
+        "new",
+        "facility",
+        "roof",
+        "HVAC",
+        "water",
+        "main",
+        "replacement",
+        "boiler",
+        "plaza",
+        "bridge",
+        "rehabilitation",
+        "sewer",
+        "school",
+        "addition",
+        "library",
+        "park",
+        "lighting",
+    ],
+    dtype=object,
+)
+_NUMERIC_JUNK = np.array(
+    ["n/a", "TBD", "-", "1,2OO,000", "$", "see notes", "#VALUE!"], dtype=object
+)
+_DATE_JUNK = np.array(
+    ["unknown", "TBD", "00/00/0000", "2019-13-45", "n/a", "43831"],
+    dtype=object,
+)
+
+
+def _format_dates(dates):
+    """Format an array of dates as ISO strings using a lookup table
+
+    Converting each ``datetime64`` value to a string is slow, so the range of
+    distinct days is formatted once and values are mapped by day offset.
+
+    :param dates: array of ``datetime64[D]`` values
+    :type dates: numpy.ndarray
+    :return: object array of 'YYYY-MM-DD' strings
+    :rtype: numpy.ndarray
+    """
+    days = dates.astype("datetime64[D]").astype(np.int64)
+    if len(days) == 0:
+        return np.empty(0, dtype=object)
+    first = days.min()
+    table = (
+        np.arange(first, days.max() + 1)
+        .astype("datetime64[D]")
+        .astype(str)
+        .astype(object)
+    )
+    return table[days - first]
+
+
+class SyntheticDataGenerator(object):
+    """Generate synthetic NYC capital project change records at scale
+
+    Each project has several change records with increasing report dates, a
+    cumulative budget trajectory and a forecast completion date that slips
+    over time. Numeric and date columns are written as strings so that, as in
+    the public dataset, they need to be converted with
+    ``BaseData.set_dtypes``. A configurable fraction of values per column is
+    replaced with junk entries or left missing.
+
+    Data is generated in chunks using only vectorized ``numpy`` operations.
+    Each chunk uses a random state derived from ``seed`` and the chunk number,
+    so output is reproducible for a given ``seed`` and ``chunksize``.
+
+    :param seed: random seed, defaults to 0
+    :type seed: int, optional
+    :param max_records_per_project: maximum number of change records per
+                                    project, defaults to 12
+    :type max_records_per_project: int, optional
+    :param error_rates: column names mapped to the fraction of invalid values,
+                        merged with :data:`DEFAULT_ERROR_RATES`, defaults to
+                        None
+    :type error_rates: dict, optional
+    :param missing_rates: column names mapped to the fraction of missing
+                          values, merged with :data:`DEFAULT_MISSING_RATES`,
+                          defaults to None
+    :type missing_rates: dict, optional
+
+    **Class methods:**
+
+    .. autosummary::
+
+       SyntheticDataGenerator.generate_chunk
+       SyntheticDataGenerator.iter_chunks
+       SyntheticDataGenerator.generate
+       SyntheticDataGenerator.to_file
+    """
+
+    def __init__(
+        self,
+        seed=0,
+        max_records_per_project=12,
+        error_rates=None,
+        missing_rates=None,
+    ):
+        self.seed = seed
+        self.max_records_per_project = max_records_per_project
+        self.error_rates = dict(DEFAULT_ERROR_RATES, **(error_rates or {}))
+        self.missing_rates = dict(DEFAULT_MISSING_RATES, **(missing_rates or {}))
+
+    def generate_chunk(self, n_rows, chunk_index=0, pid_offset=0):
+        """Generate a single chunk of change records
+
+        :param n_rows: number of records in chunk
+        :type n_rows: int
+        :param chunk_index: position of chunk, used to derive the random
+                            state, defaults to 0
+        :type chunk_index: int, optional
+        :param pid_offset: number added to project IDs, which start at 1
+                           within each chunk, defaults to 0
+        :type pid_offset: int, optional
+        :return: dataframe of change records
+        :rtype: pandas.DataFrame
+        """
+        rng = np.random.default_rng([self.seed, chunk_index])
+
+        # assign change records to projects, with every project in a chunk
+        # receiving between 1 and max_records_per_project records
+        counts = rng.integers(1, self.max_records_per_project + 1, n_rows)
+        n_projects = int(np.searchsorted(np.cumsum(counts), n_rows)) + 1
+        n_projects = n_projects if n_rows else 0
+        counts = counts[:n_projects]
+        if n_projects:
+            counts[-1] -= counts.sum() - n_rows
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        record_idx = np.arange(n_rows) - starts
+        project = np.repeat(np.arange(n_projects), counts)
+        pid = pid_offset + project + 1
+
+        # project level attributes
+        design_start = np.datetime64("2005-01-01") + rng.integers(
+            0, 5000, n_projects
+        ).astype("timedelta64[D]")
+        duration = rng.integers(365, 3650, n_projects)
+        budget_base = np.round(rng.lognormal(16, 1.2, n_projects), -3)
+
+        # change record level trajectories, cumulative within each project
+        reported = (
+            np.repeat(design_start, counts)
+            + (record_idx * 91 + rng.integers(0, 60, n_rows)).astype(
+                "timedelta64[D]"
+            )
+        )
+        budget_change = np.where(
+            record_idx == 0,
+            0.0,
+            np.round(
+                rng.normal(0.02, 0.1, n_rows) * np.repeat(budget_base, counts),
+                -3,
+            ),
+        )
+        total_budget_change = np.cumsum(budget_change)
+        total_budget_change -= np.repeat(
+            total_budget_change[np.cumsum(counts) - counts], counts
+        )
+        schedule_change = np.where(
+            record_idx == 0, 0, rng.integers(-30, 180, n_rows)
+        )
+        total_schedule_change = np.cumsum(schedule_change)
+        total_schedule_change -= np.repeat(
+            total_schedule_change[np.cumsum(counts) - counts], counts
+        )
+        forecast = (
+            np.repeat(design_start + duration.astype("timedelta64[D]"), counts)
+            + total_schedule_change.astype("timedelta64[D]")
+        )
+        phase = np.minimum(
+            record_idx * len(_PHASES) // self.max_records_per_project,
+            len(_PHASES) - 1,
+        )
+
+        name_words = rng.integers(0, len(_WORDS), (n_projects, 3))
+        project_name = (
+            _WORDS[name_words[:, 0]]
+            + " "
+            + _WORDS[name_words[:, 1]]
+            + " "
+            + _WORDS[name_words[:, 2]]
+        )
+        category = _CATEGORIES[rng.integers(0, len(_CATEGORIES), n_projects)]
+
+        df = pd.DataFrame(
+            {
+                "Date Reported As Of": _format_dates(reported),
+                "PID": pid.astype(float),
+                "Project Name": np.repeat(project_name, counts),
+                "Description": np.repeat(
+                    category + ": " + project_name, counts
+                ),
+                "Category": np.repeat(category, counts),
+                "Borough": np.repeat(
+                    _BOROUGHS[rng.integers(0, len(_BOROUGHS), n_projects)],
+                    counts,
+                ),
+                "Managing Agency": np.repeat(
+                    _AGENCIES[rng.integers(0, len(_AGENCIES), n_projects)],
+                    counts,
+                ),
+                "Current Phase": _PHASES[phase],
+                "Design Start": _format_dates(np.repeat(design_start, counts)),
+                "Budget Forecast": (
+                    np.repeat(budget_base, counts) + total_budget_change
+                )
+                .astype(np.int64)
+                .astype(str)
+                .astype(object),
+                "Latest Budget Changes": budget_change.astype(np.int64)
+                .astype(str)
+                .astype(object),
+                "Total Budget Changes": total_budget_change.astype(np.int64)
+                .astype(str)
+                .astype(object),
+                "Forecast Completion": _format_dates(forecast),
+                "Latest Schedule Changes": schedule_change,
+                "Total Schedule Changes": total_schedule_change,
+            }
+        )
+
+        self._add_errors(df, rng)
+        return df
+
+    def _add_errors(self, df, rng):
+        """Replace values with junk entries and blanks at configured rates
+
+        :param df: dataframe to alter in place
+        :type df: pandas.DataFrame
+        :param rng: random generator for chunk
+        :type rng: numpy.random.Generator
+        """
+        n_rows = len(df)
+        for colname, rate in self.error_rates.items():
+            if colname not in df.columns or rate <= 0:
+                continue
+            mask = rng.random(n_rows) < rate
+            junk = _DATE_JUNK if colname in _DATE_COLUMNS else _NUMERIC_JUNK
+            values = df[colname].values.astype(object)
+            values[mask] = junk[rng.integers(0, len(junk), mask.sum())]
+            df[colname] = values
+        for colname, rate in self.missing_rates.items():
+            if colname not in df.columns or rate <= 0:
+                continue
+            mask = rng.random(n_rows) < rate
+            values = df[colname].values
+            if values.dtype.kind == "f":
+                values = values.copy()
+            else:
+                values = values.astype(object)
+            values[mask] = np.nan
+            df[colname] = values
+
+    def iter_chunks(self, n_rows, chunksize=1000000):
+        """Yield chunks of change records until ``n_rows`` are generated
+
+        :param n_rows: total number of records
+        :type n_rows: int
+        :param chunksize: maximum number of records per chunk, defaults to
+                          1000000
+        :type chunksize: int, optional
+        :return: generator of dataframes, a single empty dataframe with all
+                 columns if ``n_rows`` is 0
+        """
+        if n_rows == 0:
+            yield self.generate_chunk(0)
+            return
+        for chunk_index, start in enumerate(range(0, n_rows, chunksize)):
+            yield self.generate_chunk(
+                min(chunksize, n_rows - start),
+                chunk_index=chunk_index,
+                pid_offset=start,
+            )
+
+    def generate(self, n_rows, chunksize=1000000):
+        """Generate ``n_rows`` change records as a single dataframe
+
+        :param n_rows: total number of records
+        :type n_rows: int
+        :param chunksize: maximum number of records per chunk, defaults to
+                          1000000
+        :type chunksize: int, optional
+        :return: dataframe of change records
+        :rtype: pandas.DataFrame
+        """
+        return pd.concat(
+            self.iter_chunks(n_rows, chunksize=chunksize), ignore_index=True
+        )
+
+    def to_file(self, filename, n_rows, chunksize=1000000):
+        """Stream generated change records to a .csv or .parquet file
+
+        Chunks are written as they are generated so memory use is bounded by
+        ``chunksize`` regardless of ``n_rows``. Writing parquet requires
+        ``pyarrow``. If ``n_rows`` is 0 a file with only the header (or
+        schema) is written.
+
+        Throughput is bound by serialization rather than generation: records
+        are generated at about 45 MB/s of CSV output, but
+        ``pandas.DataFrame.to_csv`` writes only about 11-15 MB/s on a single
+        core, so parquet is preferable for large files.
+
+        :param filename: target .csv or .parquet file path
+        :type filename: str
+        :param n_rows: total number of records
+        :type n_rows: int
+        :param chunksize: maximum number of records per chunk, defaults to
+                          1000000
+        :type chunksize: int, optional
+        :raise TypeError: if ``filename`` is not a .csv or .parquet filetype
+        """
+        _, ext = os.path.splitext(filename)
+        if ext not in [".csv", ".parquet"]:
+            raise TypeError("to_file writes only .csv or .parquet filetypes")
+
+        t1 = time.perf_counter()
+        writer = None
+        try:
+            for i, chunk in enumerate(self.iter_chunks(n_rows, chunksize)):
+                if ext == ".csv":
+                    chunk.to_csv(
+                        filename,
+                        mode="w" if i == 0 else "a",
+                        header=i == 0,
+                        index=False,
+                    )
+                else:
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+
+                    table = pa.Table.from_pandas(
+                        chunk,
+                        schema=None if writer is None else writer.schema,
+                        preserve_index=False,
+                    )
+                    if writer is None:
+                        writer = pq.ParquetWriter(filename, table.schema)
+                    writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        t2 = time.perf_counter() - t1
+        log.info(
+            "{} synthetic records written to {} in {:.3f} sec "
+            "({:.1f} MB/s)".format(
+                n_rows, filename, t2, os.path.getsize(filename) / 2 ** 20 / t2
+            ),
+            extra={"rows": n_rows, "duration": t2},
+        )
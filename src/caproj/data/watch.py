@@ -0,0 +1,236 @@
+"""
+caproj.data.watch
+~~~~~~~~~~~~~~~~~
+
+This module contains the watch mode runner that re-executes the affected
+steps of a :class:`~caproj.data.pipeline.Pipeline` when its input or schema
+files change
+
+**Module classes:**
+
+.. autosummary::
+
+   PipelineWatcher
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+
+|
+"""
+import logging
+import os
+import threading
+import time
+
+from caproj.data import BaseData
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+
+class PipelineWatcher(object):
+    """Rerun only the pipeline steps affected by changed source files
+
+    The output frame of each step is kept in memory under the same chained
+    key the pipeline uses for its checkpoints, so a key only changes when
+    the input file, the step's parameters (including schema file contents)
+    or a preceding step changes. On each update the pipeline resumes after
+    the last step whose key is unchanged. If the first changed step is a
+    ``set_dtypes`` step whose ``map_dict`` is the only difference from the
+    previous run, only the columns whose dtype entries were added, changed
+    or removed are taken from the step's input and converted again; all
+    other columns are reused from the previous output.
+
+    Steps with ``"checkpoint": false`` are not cached and the ``to_file``
+    step always runs. Holding one frame per step in memory trades memory for
+    fast reruns while tuning schema files.
+
+    :param pipeline: :class:`~caproj.data.pipeline.Pipeline` to watch
+    :param data_cls: class used to read the input file, defaults to
+                     :class:`caproj.data.BaseData`
+    :type data_cls: type, optional
+    :param interval: seconds between checks for changed source files,
+                     defaults to 1.0
+    :type interval: float, optional
+    :cvar self.data: ``BaseData`` object produced by the most recent update
+    :cvar self.timings: list of (step label, run time in seconds) tuples of
+                        the steps executed by the most recent update
+
+    **Class methods:**
+
+    .. autosummary::
+
+       PipelineWatcher.update
+       PipelineWatcher.check
+       PipelineWatcher.watch
+       PipelineWatcher.stop
+    """
+
+    def __init__(self, pipeline, data_cls=BaseData, interval=1.0):
+        self.pipeline = pipeline
+        self.data_cls = data_cls
+        self.interval = interval
+        self.data = None
+        self.timings = list()
+        self._cache = dict()
+        self._mtimes = dict()
+        self._stop = threading.Event()
+
+    def _source_mtimes(self):
+        """Return modification times of the pipeline's source files"""
+        return {
+            filename: os.path.getmtime(filename)
+            for filename in self.pipeline.source_files()
+            if os.path.exists(filename)
+        }
+
+    def _resume_index(self, keys):
+        """Return index of last step with a valid cached frame, or -1"""
+        for index in reversed(range(len(keys))):
+            entry = self._cache.get(index)
+            if entry is not None and entry[0] == keys[index]:
+                return index
+        return -1
+
+    def _column_update(self, index, step_kwargs):
+        """Reconvert only the columns whose ``set_dtypes`` entries changed
+
+        :param index: position of the first changed step, whose input frame
+                      is cached under a valid key
+        :type index: int
+        :param step_kwargs: resolved keyword arguments for every step
+        :type step_kwargs: list of dict
+        :return: tuple of the updated ``BaseData`` object and the list of
+                 reconverted columns, or None if the step must run in full
+        :rtype: tuple or None
+        """
+        if self.pipeline.steps[index]["step"] != "set_dtypes":
+            return None
+        if index not in self._cache or index - 1 not in self._cache:
+            return None
+        _, old_kwargs, old_df = self._cache[index]
+        new_kwargs = step_kwargs[index]
+        old_map = old_kwargs.get("map_dict")
+        new_map = new_kwargs.get("map_dict")
+        if not isinstance(old_map, dict) or not isinstance(new_map, dict):
+            return None
+        other_kwargs = [
+            {key: val for key, val in kwargs.items() if key != "map_dict"}
+            for kwargs in [old_kwargs, new_kwargs]
+        ]
+        if other_kwargs[0] != other_kwargs[1]:
+            return None
+
+        input_df = self._cache[index - 1][2]
+        columns = sorted(
+            col
+            for col in set(old_map) | set(new_map)
+            if old_map.get(col) != new_map.get(col)
+        )
+        df = old_df.copy()
+        for col in columns:
+            if col in input_df.columns:
+                df[col] = input_df[col]
+        data = self.data_cls(df, False)
+        kwargs = dict(
+            new_kwargs,
+            map_dict={col: new_map[col] for col in columns if col in new_map},
+        )
+        data.set_dtypes(**kwargs)
+        return data, columns
+
+    def update(self):
+        """Execute the steps affected by changes since the previous update
+
+        :return: the ``BaseData`` object after all steps have been applied
+        """
+        pipeline = self.pipeline
+        t_start = time.perf_counter()
+        self._mtimes = self._source_mtimes()
+        self.timings = list()
+        pipeline.clear_schemas()
+        step_kwargs = [pipeline.step_kwargs(step) for step in pipeline.steps]
+        keys = pipeline.checkpoint_keys(step_kwargs)
+        start = self._resume_index(keys) + 1
+
+        data = None
+        for index in range(start, len(pipeline.steps)):
+            name = pipeline.steps[index]["step"]
+            kwargs = step_kwargs[index]
+            label = name
+            t1 = time.perf_counter()
+            update = None
+            if index == start and start > 0:
+                update = self._column_update(index, step_kwargs)
+                if update is None:
+                    data = self.data_cls(self._cache[start - 1][2].copy(), False)
+
+            if update is not None:
+                data, columns = update
+                label = "{}[{}]".format(name, ", ".join(columns))
+            elif name == "from_file":
+                data = self.data_cls.from_file(**kwargs)
+            else:
+                getattr(data, name)(**kwargs)
+
+            if pipeline.is_checkpointed(index):
+                self._cache[index] = (keys[index], kwargs, data.df.copy())
+            t2 = time.perf_counter() - t1
+            self.timings.append((label, t2))
+            log.info(
+                "{} step {} run time: {:.3f} sec".format(pipeline.name, label, t2),
+                extra={"function": name, "duration": t2},
+            )
+
+        if data is None:
+            data = self.data_cls(self._cache[start - 1][2].copy(), False)
+        self.data = data
+        log.info(
+            "{} re-executed {} of {} steps in {:.3f} sec".format(
+                pipeline.name,
+                len(pipeline.steps) - start,
+                len(pipeline.steps),
+                time.perf_counter() - t_start,
+            ),
+            extra={"rows": len(data.df)},
+        )
+        return data
+
+    def check(self):
+        """Update if any source file changed since the previous update
+
+        Errors raised by the update, e.g. from a schema file saved while only
+        partly edited, are logged and the watcher waits for the next change.
+
+        :return: True if an update completed
+        :rtype: bool
+        """
+        if self._source_mtimes() == self._mtimes:
+            return False
+        try:
+            self.update()
+        except Exception:
+            log.exception(
+                "{} update failed, waiting for next change".format(
+                    self.pipeline.name
+                )
+            )
+            return False
+        return True
+
+    def watch(self):
+        """Check for changed source files until :meth:`PipelineWatcher.stop`
+
+        The first check always runs the pipeline.
+        """
+        self._stop.clear()
+        self.check()
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        """Stop a running :meth:`PipelineWatcher.watch` loop"""
+        self._stop.set()
@@ -11,8 +11,23 @@ used in modeling for this project.
 
    placeholder
 
+**Submodules:**
+
+.. autosummary::
+
+   caproj.features.engine
+   caproj.features.store
+   caproj.features.incremental
+   caproj.features.text
+   caproj.features.timeseries
+
 |
 """
+from .engine import FEATURES, FeatureEngine, register_feature  # noqa: F401
+from .incremental import IncrementalFeatures, project_signatures  # noqa: F401
+from .store import FeatureStore  # noqa: F401
+from .text import HashingVectorizer  # noqa: F401
+from .timeseries import ProjectSeries, resample_projects  # noqa: F401
 
 
 def placeholder():
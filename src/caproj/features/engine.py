@@ -0,0 +1,377 @@
+"""
+caproj.features.engine
+~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the feature registry and the engine that computes
+registered features from a cleaned ``BaseData`` object using only columnar
+operations
+
+**Module classes:**
+
+.. autosummary::
+
+   Feature
+   FeatureEngine
+
+**Module functions:**
+
+.. autosummary::
+
+   register_feature
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+   FEATURES
+   COLUMNS
+
+|
+"""
+import logging
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+COLUMNS = {
+    "report_date": "Date Reported As Of",
+    "design_start": "Design Start",
+    "budget": "Budget Forecast",
+    "forecast_completion": "Forecast Completion",
+}
+"""Input column keys mapped to default dataset column names"""
+
+Feature = namedtuple("Feature", ["name", "func", "requires", "version", "doc"])
+Feature.__doc__ = """Registered feature definition
+
+:param name: feature name
+:param func: function called with the :class:`FeatureEngine` returning the
+             feature values in the engine's sorted record order
+:param requires: names of features the function reads
+:param version: definition version, increased whenever ``func`` changes
+:param doc: short description of the feature
+"""
+
+FEATURES = OrderedDict()
+"""Feature names mapped to registered :class:`Feature` definitions"""
+
+
+def register_feature(name, requires=(), version=1, registry=None):
+    """Return decorator registering a feature function
+
+    The decorated function is called with the :class:`FeatureEngine` and
+    must return an array or ``pandas.Series`` with one value per record, in
+    the engine's sorted record order (by ID, then report date). Values of
+    the features named in ``requires`` are read with ``engine[name]``, and
+    input columns with :meth:`FeatureEngine.column`.
+
+    :param name: feature name
+    :type name: str
+    :param requires: names of features the function reads, defaults to ()
+    :type requires: tuple of str, optional
+    :param version: definition version, increase it whenever the function's
+                    output changes, defaults to 1
+    :type version: int, optional
+    :param registry: registry to add the feature to, defaults to
+                     :data:`FEATURES`
+    :type registry: dict, optional
+    :return: decorator returning the function unchanged
+    """
+    registry = FEATURES if registry is None else registry
+
+    def decorator(func):
+        doc = (func.__doc__ or "").strip().split("\n")[0]
+        registry[name] = Feature(name, func, tuple(requires), version, doc)
+        return func
+
+    return decorator
+
+
+@register_feature("report_date")
+def _report_date(engine):
+    """Date the record was reported"""
+    return engine.report_dates
+
+
+@register_feature("design_start")
+def _design_start(engine):
+    """Project design start date"""
+    return pd.to_datetime(engine.column("design_start"), errors="coerce")
+
+
+@register_feature("forecast_completion")
+def _forecast_completion(engine):
+    """Forecast completion date"""
+    return pd.to_datetime(engine.column("forecast_completion"), errors="coerce")
+
+
+@register_feature("budget")
+def _budget(engine):
+    """Budget forecast"""
+    return pd.to_numeric(engine.column("budget"), errors="coerce")
+
+
+@register_feature("initial_budget", requires=["budget"])
+def _initial_budget(engine):
+    """First reported budget forecast of the project"""
+    return engine.groupby(engine["budget"]).transform("first")
+
+
+@register_feature("budget_growth_ratio", requires=["budget", "initial_budget"])
+def _budget_growth_ratio(engine):
+    """Budget forecast relative to the first reported budget, minus 1"""
+    initial = engine["initial_budget"].where(engine["initial_budget"] != 0)
+    return engine["budget"] / initial - 1
+
+
+@register_feature("budget_change", requires=["budget"])
+def _budget_change(engine):
+    """Change in budget forecast since the project's previous record"""
+    return engine.groupby(engine["budget"]).diff()
+
+
+@register_feature("initial_forecast_completion", requires=["forecast_completion"])
+def _initial_forecast_completion(engine):
+    """First reported forecast completion date of the project"""
+    return engine.groupby(engine["forecast_completion"]).transform("first")
+
+
+@register_feature(
+    "schedule_slip_days",
+    requires=["forecast_completion", "initial_forecast_completion"],
+)
+def _schedule_slip_days(engine):
+    """Days the forecast completion moved since the first record"""
+    slip = engine["forecast_completion"] - engine["initial_forecast_completion"]
+    return slip.dt.days
+
+
+@register_feature("change_count")
+def _change_count(engine):
+    """Number of records of the project up to and including this one"""
+    return engine.groupby(engine.ids).cumcount() + 1
+
+
+@register_feature("project_age_days", requires=["report_date", "design_start"])
+def _project_age_days(engine):
+    """Days between design start and the report date"""
+    return (engine["report_date"] - engine["design_start"]).dt.days
+
+
+@register_feature(
+    "change_frequency", requires=["change_count", "project_age_days"]
+)
+def _change_frequency(engine):
+    """Records per year of project age up to the report date"""
+    years = engine["project_age_days"].where(engine["project_age_days"] > 0)
+    return engine["change_count"] / (years / 365.25)
+
+
+class FeatureEngine(object):
+    """Compute registered features of a cleaned dataset
+
+    Records are sorted once by ID and report date, and every feature is
+    computed for all records at once with columnar ``numpy`` and ``pandas``
+    operations; per-project values use a single grouping by ID. Requesting a
+    feature computes it and the features it declares in ``requires``, and no
+    others. Computed features are cached by the engine, so later requests
+    reuse them.
+
+    Input columns are looked up by their :data:`COLUMNS` names, or by the
+    same names with spaces replaced by underscores as produced by
+    ``BaseData.lint_colnames``.
+
+    :param data: ``BaseData`` object or ``pandas.DataFrame`` of records
+    :param id_col: name of the project ID column, defaults to "PID"
+    :type id_col: str, optional
+    :param columns: input column keys mapped to dataset column names,
+                    overriding :data:`COLUMNS`, defaults to None
+    :type columns: dict, optional
+    :param registry: feature registry, defaults to :data:`FEATURES`
+    :type registry: dict, optional
+
+    **Class methods:**
+
+    .. autosummary::
+
+       FeatureEngine.resolve
+       FeatureEngine.compute
+       FeatureEngine.column
+       FeatureEngine.groupby
+    """
+
+    def __init__(self, data, id_col="PID", columns=None, registry=None):
+        self.df = getattr(data, "df", data)
+        self.id_col = id_col
+        self.columns = dict(COLUMNS, **(columns or {}))
+        self.registry = FEATURES if registry is None else registry
+        self._values = dict()
+        self._order = None
+        self._report_dates = None
+        self._id_codes = None
+
+    def _column_name(self, key):
+        """Return dataset column name of an input column key
+
+        :raise KeyError: if the column does not exist
+        """
+        name = self.columns.get(key, key)
+        for candidate in [name, name.replace(" ", "_")]:
+            if candidate in self.df.columns:
+                return candidate
+        raise KeyError(
+            "input column '{}' for '{}' not found in data".format(name, key)
+        )
+
+    def _sort(self):
+        """Compute record order by ID and report date"""
+        ids = self.df[self._column_name(self.id_col)].to_numpy()
+        dates = pd.to_datetime(
+            self.df[self._column_name("report_date")], errors="coerce"
+        ).to_numpy()
+        id_codes, uniques = pd.factorize(ids, sort=True)
+        self._order = np.lexsort((dates.view("int64"), id_codes))
+        self._report_dates = pd.Series(dates[self._order])
+        # missing IDs are coded -1; they form one group of their own
+        id_codes[id_codes < 0] = len(uniques)
+        self._id_codes = id_codes[self._order]
+
+    @property
+    def order(self):
+        """Positions of the records in sorted order (by ID, report date)"""
+        if self._order is None:
+            self._sort()
+        return self._order
+
+    @property
+    def report_dates(self):
+        """Parsed report dates in sorted record order"""
+        if self._report_dates is None:
+            self._sort()
+        return self._report_dates
+
+    @property
+    def ids(self):
+        """Project IDs in sorted record order"""
+        return self.column(self.id_col)
+
+    def column(self, key):
+        """Return an input column in sorted record order
+
+        :param key: key of :data:`COLUMNS` or dataset column name
+        :type key: str
+        :return: column values with a ``RangeIndex``
+        :rtype: pandas.Series
+        :raise KeyError: if the column does not exist
+        """
+        series = self.df[self._column_name(key)]
+        return pd.Series(series.to_numpy()[self.order], name=series.name)
+
+    def groupby(self, values):
+        """Group values in sorted record order by project ID
+
+        Records are grouped by integer ID codes rather than the IDs, so
+        records with a missing ID form one group instead of being dropped.
+
+        :param values: values in sorted record order
+        :type values: pandas.Series
+        :return: ``pandas.core.groupby.SeriesGroupBy`` object
+        """
+        if self._order is None:
+            self._sort()
+        return values.groupby(self._id_codes, sort=False)
+
+    def __getitem__(self, name):
+        """Return computed feature values in sorted record order"""
+        if name not in self._values:
+            self._compute_sorted([name])
+        return self._values[name]
+
+    def resolve(self, names):
+        """Return features needed to compute ``names`` in dependency order
+
+        :param names: feature names
+        :type names: list of str
+        :return: feature names, each listed after the features it requires
+        :rtype: list of str
+        :raise KeyError: if a feature is not registered
+        :raise ValueError: if features require each other in a cycle
+        """
+        resolved = list()
+        visiting = set()
+
+        def visit(name, path):
+            if name in resolved:
+                return
+            if name not in self.registry:
+                raise KeyError(
+                    "unknown feature '{}'{}".format(
+                        name,
+                        " required by '{}'".format(path[-1]) if path else "",
+                    )
+                )
+            if name in visiting:
+                raise ValueError(
+                    "feature dependency cycle: {}".format(
+                        " -> ".join(path + [name])
+                    )
+                )
+            visiting.add(name)
+            for required in self.registry[name].requires:
+                visit(required, path + [name])
+            visiting.discard(name)
+            resolved.append(name)
+
+        for name in names:
+            visit(name, [])
+        return resolved
+
+    def compute(self, names=None):
+        """Compute features and return them aligned with the input records
+
+        :param names: feature names, if None all registered features are
+                      computed, defaults to None
+        :type names: list of str, optional
+        :return: dataframe with one column per requested feature and the
+                 index of the input dataframe
+        :rtype: pandas.DataFrame
+        :raise KeyError: if a feature or input column does not exist
+        """
+        names = list(self.registry) if names is None else list(names)
+        self._compute_sorted(names)
+
+        # scatter sorted values back to the input record positions
+        inverse = np.empty_like(self.order)
+        inverse[self.order] = np.arange(len(self.order))
+        return pd.DataFrame(
+            {name: self._values[name].to_numpy()[inverse] for name in names},
+            index=self.df.index,
+            columns=names,
+        )
+
+    def _compute_sorted(self, names):
+        """Compute features and their requirements in sorted record order"""
+        for name in self.resolve(names):
+            if name in self._values:
+                continue
+            t1 = time.perf_counter()
+            values = self.registry[name].func(self)
+            values = pd.Series(np.asarray(values), name=name)
+            if len(values) != len(self.df):
+                raise ValueError(
+                    "feature '{}' returned {} values for {} records".format(
+                        name, len(values), len(self.df)
+                    )
+                )
+            self._values[name] = values
+            t2 = time.perf_counter() - t1
+            log.info(
+                "feature {} computed in {:.3f} sec".format(name, t2),
+                extra={"function": name, "duration": t2},
+            )
@@ -0,0 +1,206 @@
+"""
+caproj.features.incremental
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the incremental feature table that recomputes
+per-project features only for projects whose change records changed
+
+**Module classes:**
+
+.. autosummary::
+
+   IncrementalFeatures
+
+**Module functions:**
+
+.. autosummary::
+
+   project_signatures
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+
+|
+"""
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from caproj.features.engine import FeatureEngine
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+
+def _row_hashes(df):
+    """Return uint64 content hash of every record, ignoring the index"""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def project_signatures(df, id_col="PID", row_hashes=None):
+    """Return a content signature of the records of every project
+
+    The signature combines the hashes of all of a project's records with an
+    order-independent wrapping sum, so it changes when a record of the
+    project is added, removed or modified, but not when records are
+    reordered. Records without an ID are left out.
+
+    :param df: pandas.DataFrame of change records
+    :param id_col: name of the project ID column, defaults to "PID"
+    :type id_col: str, optional
+    :param row_hashes: precomputed record hashes, defaults to None
+    :type row_hashes: numpy.ndarray, optional
+    :return: uint64 signatures indexed by project ID
+    :rtype: pandas.Series
+    """
+    hashes = _row_hashes(df) if row_hashes is None else row_hashes
+    codes, ids = pd.factorize(df[id_col])
+    keep = codes >= 0
+    codes, hashes = codes[keep], hashes[keep]
+    if len(codes) == 0:
+        return pd.Series([], dtype="uint64")
+
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    # uint64 addition wraps around, so the sum is a valid 64 bit signature
+    signatures = np.add.reduceat(hashes[order], starts)
+    return pd.Series(signatures, index=ids[codes[starts]], dtype="uint64")
+
+
+class IncrementalFeatures(object):
+    """Keep a feature table up to date as project change records change
+
+    The first :meth:`IncrementalFeatures.update` computes features for all
+    records. Later updates compare :func:`project_signatures` with those of
+    the previous update, compute features only for the records of projects
+    that are new or whose records changed, and reuse the stored rows of all
+    other projects. Records are matched to stored rows by content, so the
+    order and index of the input may change between updates.
+
+    This is only valid for features computed from the records of a single
+    project, which is the case for the built-in
+    :data:`~caproj.features.engine.FEATURES`. Records without an ID are
+    recomputed on every update.
+
+    :param names: feature names, if None all registered features are used,
+                  defaults to None
+    :type names: list of str, optional
+    :param id_col: name of the project ID column, defaults to "PID"
+    :type id_col: str, optional
+    :param columns: input column keys mapped to dataset column names, see
+                    :class:`~caproj.features.engine.FeatureEngine`, defaults
+                    to None
+    :type columns: dict, optional
+    :param registry: feature registry, defaults to
+                     :data:`caproj.features.engine.FEATURES`
+    :type registry: dict, optional
+    :cvar self.table: feature table of the last update, indexed by record
+                      content hash and occurrence
+    :cvar self.signatures: project signatures of the last update
+    :cvar self.changed_ids: IDs of projects recomputed by the last update
+
+    **Class methods:**
+
+    .. autosummary::
+
+       IncrementalFeatures.update
+       IncrementalFeatures.to_pickle
+       IncrementalFeatures.read_pickle
+    """
+
+    def __init__(self, names=None, id_col="PID", columns=None, registry=None):
+        self.names = names
+        self.id_col = id_col
+        self.columns = columns
+        self.registry = registry
+        self.table = None
+        self.signatures = None
+        self.changed_ids = None
+
+    def _record_keys(self, hashes):
+        """Return (hash, occurrence) keys that are unique per record"""
+        occurrence = pd.Series(hashes).groupby(hashes, sort=False).cumcount()
+        return pd.MultiIndex.from_arrays(
+            [hashes, occurrence.to_numpy()], names=["hash", "occurrence"]
+        )
+
+    def update(self, data):
+        """Return features of the records, recomputing only changed projects
+
+        :param data: ``BaseData`` object or ``pandas.DataFrame`` of records
+        :return: dataframe with one column per feature and the index of the
+                 input dataframe
+        :rtype: pandas.DataFrame
+        """
+        t1 = time.perf_counter()
+        df = getattr(data, "df", data)
+        hashes = _row_hashes(df)
+        keys = self._record_keys(hashes)
+        signatures = project_signatures(df, self.id_col, row_hashes=hashes)
+
+        if self.table is None:
+            changed = signatures.index
+        else:
+            previous = self.signatures.reindex(signatures.index)
+            changed = signatures.index[
+                previous.isnull().to_numpy()
+                | (previous.to_numpy() != signatures.to_numpy())
+            ]
+        ids = df[self.id_col]
+        recompute = (ids.isin(changed) | ids.isnull()).to_numpy()
+
+        parts, positions = list(), list()
+        if recompute.any() or self.table is None:
+            engine = FeatureEngine(
+                df[recompute],
+                id_col=self.id_col,
+                columns=self.columns,
+                registry=self.registry,
+            )
+            parts.append(engine.compute(self.names).reset_index(drop=True))
+            positions.append(np.flatnonzero(recompute))
+        if not recompute.all():
+            parts.append(
+                self.table.reindex(keys[~recompute]).reset_index(drop=True)
+            )
+            positions.append(np.flatnonzero(~recompute))
+
+        order = np.argsort(np.concatenate(positions), kind="stable")
+        features = pd.concat(parts, ignore_index=True).iloc[order]
+        self.table = features.set_axis(keys, axis=0)
+        self.signatures = signatures
+        self.changed_ids = changed
+
+        t2 = time.perf_counter() - t1
+        log.info(
+            "features of {} of {} projects ({} records) recomputed in "
+            "{:.3f} sec".format(
+                len(changed), len(signatures), int(recompute.sum()), t2
+            ),
+            extra={"rows": int(recompute.sum()), "duration": t2},
+        )
+        return features.set_axis(df.index, axis=0)
+
+    def to_pickle(self, filepath):
+        """Save the feature table and signatures to a pickle file
+
+        :param filepath: pickle file path
+        :type filepath: str
+        """
+        pd.to_pickle(self, filepath)
+
+    @staticmethod
+    def read_pickle(filepath):
+        """Load an :class:`IncrementalFeatures` object from a pickle file
+
+        :param filepath: pickle file path
+        :type filepath: str
+        :return: :class:`IncrementalFeatures` object
+        """
+        return pd.read_pickle(filepath)
@@ -0,0 +1,308 @@
+"""
+caproj.features.store
+~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the versioned on-disk feature store used to reuse
+computed feature columns across runs
+
+**Module classes:**
+
+.. autosummary::
+
+   FeatureStore
+
+**Module functions:**
+
+.. autosummary::
+
+   feature_key
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+
+|
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from caproj.features.engine import FEATURES, FeatureEngine
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+
+def feature_key(name, registry=None, cache=None):
+    """Return hash of a feature's definition and its requirements
+
+    :param name: feature name
+    :type name: str
+    :param registry: feature registry, defaults to
+                     :data:`caproj.features.engine.FEATURES`
+    :type registry: dict, optional
+    :param cache: feature names mapped to already computed keys, updated in
+                  place, defaults to None
+    :type cache: dict, optional
+    :return: hex digest string
+    :rtype: str
+    :raise KeyError: if the feature is not registered
+    """
+    registry = FEATURES if registry is None else registry
+    cache = dict() if cache is None else cache
+    if name not in cache:
+        feature = registry[name]
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(
+            json.dumps(
+                [
+                    feature.name,
+                    feature.version,
+                    [feature_key(req, registry, cache) for req in feature.requires],
+                ]
+            ).encode()
+        )
+        cache[name] = digest.hexdigest()
+    return cache[name]
+
+
+class FeatureStore(object):
+    """Persist computed feature columns and reload them memory-mapped
+
+    Each feature column is saved as a ``.npy`` file under a directory for
+    the input dataset::
+
+        <root>/<dataset key>/<feature>-<definition key>.npy
+
+    The dataset key hashes the input records and the engine's column
+    mapping. The definition key hashes the feature's name and ``version``
+    and the definition keys of the features it requires, so increasing the
+    version of a feature invalidates it and every feature computed from it.
+    On :meth:`FeatureStore.load_arrays`, features with a current file are
+    memory-mapped and only the stale ones are computed and saved.
+    :meth:`FeatureStore.load` returns the same features as a dataframe;
+    depending on the ``pandas`` version, building it may copy the columns
+    into memory.
+
+    Features with ``object`` dtype cannot be memory-mapped and are loaded
+    into memory instead.
+
+    :param root: directory in which features are stored, defaults to
+                 "data/processed/features"
+    :type root: str, optional
+    :param registry: feature registry, defaults to
+                     :data:`caproj.features.engine.FEATURES`
+    :type registry: dict, optional
+
+    **Class methods:**
+
+    .. autosummary::
+
+       FeatureStore.dataset_key
+       FeatureStore.feature_key
+       FeatureStore.path
+       FeatureStore.load_arrays
+       FeatureStore.load
+       FeatureStore.save
+       FeatureStore.prune
+    """
+
+    def __init__(
+        self, root=os.path.join("data", "processed", "features"), registry=None
+    ):
+        self.root = root
+        self.registry = FEATURES if registry is None else registry
+        self._feature_keys = dict()
+
+    def dataset_key(self, engine):
+        """Return hash of an engine's input records and column mapping
+
+        :param engine: :class:`~caproj.features.engine.FeatureEngine` object
+        :return: hex digest string
+        :rtype: str
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(
+            pd.util.hash_pandas_object(engine.df, index=True).values.tobytes()
+        )
+        digest.update(
+            json.dumps(
+                [
+                    [str(col) for col in engine.df.columns],
+                    engine.id_col,
+                    engine.columns,
+                ],
+                sort_keys=True,
+            ).encode()
+        )
+        return digest.hexdigest()
+
+    def feature_key(self, name):
+        """Return hash of a feature's definition and its requirements
+
+        :param name: feature name
+        :type name: str
+        :return: hex digest string
+        :rtype: str
+        :raise KeyError: if the feature is not registered
+        """
+        return feature_key(name, self.registry, self._feature_keys)
+
+    def path(self, data_key, name):
+        """Return file path of a stored feature
+
+        :param data_key: dataset key from :meth:`FeatureStore.dataset_key`
+        :type data_key: str
+        :param name: feature name
+        :type name: str
+        :return: file path
+        :rtype: str
+        """
+        return os.path.join(
+            self.root, data_key, "{}-{}.npy".format(name, self.feature_key(name))
+        )
+
+    def _load_array(self, filepath, mmap):
+        """Load a stored feature array, memory-mapped if possible"""
+        try:
+            return np.load(filepath, mmap_mode="r" if mmap else None)
+        except ValueError:
+            # object arrays are pickled and cannot be memory-mapped
+            return np.load(filepath, allow_pickle=True)
+
+    def save(self, data_key, features):
+        """Save feature columns atomically
+
+        :param data_key: dataset key from :meth:`FeatureStore.dataset_key`
+        :type data_key: str
+        :param features: dataframe of feature columns
+        :type features: pandas.DataFrame
+        """
+        os.makedirs(os.path.join(self.root, data_key), exist_ok=True)
+        for name in features.columns:
+            filepath = self.path(data_key, name)
+            tmp_filepath = "{}.tmp".format(filepath)
+            values = features[name].to_numpy()
+            with open(tmp_filepath, "wb") as f:
+                np.save(f, values, allow_pickle=values.dtype == object)
+            os.replace(tmp_filepath, filepath)
+
+    def load_arrays(
+        self,
+        data,
+        names=None,
+        data_key=None,
+        mmap=True,
+        id_col="PID",
+        columns=None,
+    ):
+        """Return feature arrays of a dataset, computing only stale ones
+
+        The arrays are returned as loaded, so with ``mmap`` they stay
+        memory-mapped whatever the ``pandas`` version.
+
+        :param data: ``BaseData`` object or ``pandas.DataFrame`` of records
+        :param names: feature names, if None all registered features are
+                      loaded, defaults to None
+        :type names: list of str, optional
+        :param data_key: dataset key, e.g. a pipeline checkpoint key, used
+                         instead of hashing ``data``, defaults to None
+        :type data_key: str, optional
+        :param mmap: whether stored features are memory-mapped (read-only)
+                     rather than read into memory, defaults to True
+        :type mmap: bool, optional
+        :param id_col: name of the project ID column, defaults to "PID"
+        :type id_col: str, optional
+        :param columns: input column keys mapped to dataset column names,
+                        see :class:`~caproj.features.engine.FeatureEngine`,
+                        defaults to None
+        :type columns: dict, optional
+        :return: tuple of feature names mapped to arrays in record order and
+                 the index of the input dataframe
+        :rtype: tuple
+        """
+        t1 = time.perf_counter()
+        engine = FeatureEngine(
+            data, id_col=id_col, columns=columns, registry=self.registry
+        )
+        names = list(self.registry) if names is None else list(names)
+        data_key = data_key or self.dataset_key(engine)
+
+        stale = [
+            name for name in names if not os.path.exists(self.path(data_key, name))
+        ]
+        if stale:
+            self.save(data_key, engine.compute(stale))
+
+        values = OrderedDict(
+            (name, self._load_array(self.path(data_key, name), mmap))
+            for name in names
+        )
+        for name, array in values.items():
+            if len(array) != len(engine.df):
+                raise ValueError(
+                    "stored feature '{}' has {} values for {} records".format(
+                        name, len(array), len(engine.df)
+                    )
+                )
+        t2 = time.perf_counter() - t1
+        log.info(
+            "feature store loaded {} features ({} computed) in {:.3f} sec".format(
+                len(names), len(stale), t2
+            ),
+            extra={"rows": len(engine.df), "duration": t2},
+        )
+        return values, engine.df.index
+
+    def load(self, data, names=None, **kwargs):
+        """Return features of a dataset as a dataframe
+
+        Older ``pandas`` versions, such as 1.0, consolidate the columns into
+        new blocks, which copies memory-mapped features into memory. Use
+        :meth:`FeatureStore.load_arrays` to keep them memory-mapped.
+
+        :param data: ``BaseData`` object or ``pandas.DataFrame`` of records
+        :param names: feature names, if None all registered features are
+                      loaded, defaults to None
+        :type names: list of str, optional
+        :param kwargs: keyword arguments to :meth:`FeatureStore.load_arrays`
+        :return: dataframe with one column per feature and the index of the
+                 input dataframe
+        :rtype: pandas.DataFrame
+        """
+        values, index = self.load_arrays(data, names, **kwargs)
+        return pd.DataFrame(values, index=index, columns=list(values), copy=False)
+
+    def prune(self, data_key=None):
+        """Remove stored features whose definition key is outdated
+
+        :param data_key: dataset key whose features are pruned, if None all
+                         datasets are pruned, defaults to None
+        :type data_key: str, optional
+        :return: paths of removed files
+        :rtype: list of str
+        """
+        if not os.path.isdir(self.root):
+            return list()
+        data_keys = [data_key] if data_key else os.listdir(self.root)
+        current = {
+            os.path.basename(self.path("", name)) for name in self.registry
+        }
+        removed = list()
+        for key in data_keys:
+            dirname = os.path.join(self.root, key)
+            if not os.path.isdir(dirname):
+                continue
+            for filename in os.listdir(dirname):
+                if filename not in current:
+                    os.remove(os.path.join(dirname, filename))
+                    removed.append(os.path.join(dirname, filename))
+        return removed
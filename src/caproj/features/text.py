@@ -0,0 +1,271 @@
+"""
+caproj.features.text
+~~~~~~~~~~~~~~~~~~~~
+
+This module contains the streaming hashing vectorizer used to turn free-text
+project fields into sparse token count features with a fixed memory
+footprint
+
+**Module classes:**
+
+.. autosummary::
+
+   HashingVectorizer
+
+**Module functions:**
+
+.. autosummary::
+
+   iter_text_chunks
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+
+|
+"""
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from caproj.pool import run_in_pool
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+
+def iter_text_chunks(texts, chunksize=100000):
+    """Yield consecutive chunks of texts
+
+    :param texts: texts, e.g. the "Description" column of the records
+    :type texts: pandas.Series or list of str
+    :param chunksize: number of texts per chunk, defaults to 100000
+    :type chunksize: int, optional
+    :return: generator of ``pandas.Series`` chunks
+    """
+    texts = pd.Series(texts) if not isinstance(texts, pd.Series) else texts
+    for start in range(0, len(texts), chunksize):
+        yield texts.iloc[start:start + chunksize]
+
+
+class HashingVectorizer(object):
+    """Convert texts to sparse token count matrices by feature hashing
+
+    Tokens are mapped to columns by hashing instead of through a vocabulary,
+    so memory does not grow with the number of distinct tokens and chunks
+    can be transformed independently, in any process, into matrices with
+    the same columns. Tokenizing, n-gram building and hashing are vectorized
+    over all texts of a chunk; ``pandas.util.hash_array`` is used because,
+    unlike the built-in ``hash``, it gives the same value in every process.
+
+    :meth:`HashingVectorizer.transform_arrays` returns the compressed sparse
+    row (CSR) arrays using only ``numpy``. The methods returning
+    ``scipy.sparse.csr_matrix`` objects require the optional ``scipy``
+    dependency.
+
+    :param n_features: number of columns, defaults to 2 ** 20
+    :type n_features: int, optional
+    :param ngram_range: (min n, max n) of word n-grams, defaults to (1, 1)
+    :type ngram_range: tuple of int, optional
+    :param lowercase: whether texts are lowercased, defaults to True
+    :type lowercase: bool, optional
+    :param token_pattern: regular expression matching tokens, defaults to
+                          words of at least two characters
+    :type token_pattern: str, optional
+    :param alternate_sign: whether a hash bit sets the sign of each count, so
+                           hash collisions tend to cancel out, defaults to
+                           True
+    :type alternate_sign: bool, optional
+    :param norm: "l2", "l1" or None row normalization, defaults to "l2"
+    :type norm: str, optional
+    :param dtype: dtype of the matrix values, defaults to numpy.float32
+    :raise ValueError: if ``norm`` is invalid
+
+    **Class methods:**
+
+    .. autosummary::
+
+       HashingVectorizer.transform_arrays
+       HashingVectorizer.transform
+       HashingVectorizer.transform_chunk_arrays
+       HashingVectorizer.transform_chunks
+    """
+
+    def __init__(
+        self,
+        n_features=2 ** 20,
+        ngram_range=(1, 1),
+        lowercase=True,
+        token_pattern=r"(?u)\b\w\w+\b",
+        alternate_sign=True,
+        norm="l2",
+        dtype=np.float32,
+    ):
+        if norm not in ["l2", "l1", None]:
+            raise ValueError(
+                "norm must be 'l2', 'l1' or None, got '{}'".format(norm)
+            )
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.lowercase = lowercase
+        self.token_pattern = token_pattern
+        self.alternate_sign = alternate_sign
+        self.norm = norm
+        self.dtype = dtype
+
+    def _tokens(self, texts):
+        """Return document positions and n-gram strings of all texts"""
+        texts = pd.Series(texts, dtype=object).fillna("").astype(str)
+        if self.lowercase:
+            texts = texts.str.lower()
+        tokens = texts.reset_index(drop=True).str.findall(self.token_pattern)
+        tokens = tokens.explode().dropna()
+        docs = tokens.index.to_numpy()
+        words = tokens.to_numpy(dtype=object)
+
+        min_n, max_n = self.ngram_range
+        all_docs, all_grams = list(), list()
+        for n in range(min_n, max_n + 1):
+            if n > len(words):
+                break
+            # an n-gram starts at i if the following n - 1 words share its doc
+            starts = np.flatnonzero(docs[: len(docs) - n + 1] == docs[n - 1:])
+            grams = words[starts]
+            for offset in range(1, n):
+                grams = grams + " " + words[starts + offset]
+            all_docs.append(docs[starts])
+            all_grams.append(grams)
+        if not all_docs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=object)
+        return np.concatenate(all_docs), np.concatenate(all_grams)
+
+    def transform_arrays(self, texts):
+        """Return CSR arrays of the hashed token counts of texts
+
+        Missing texts give empty rows.
+
+        :param texts: texts to transform
+        :type texts: pandas.Series or list of str
+        :return: tuple of ``data``, ``indices`` and ``indptr`` arrays and the
+                 matrix ``shape``, as accepted by
+                 ``scipy.sparse.csr_matrix``
+        :rtype: tuple
+        """
+        n_docs = len(texts)
+        docs, grams = self._tokens(texts)
+        hashes = pd.util.hash_array(grams) if len(grams) else np.empty(
+            0, dtype=np.uint64
+        )
+        columns = (hashes % np.uint64(self.n_features)).astype(np.int64)
+        if self.alternate_sign:
+            signs = np.where(hashes >> np.uint64(63), -1.0, 1.0)
+        else:
+            signs = np.ones(len(hashes))
+
+        # sum the signed counts of each (doc, column) pair; unique keys are
+        # sorted by doc and then column, as CSR requires
+        keys, inverse = np.unique(
+            docs * self.n_features + columns, return_inverse=True
+        )
+        data = np.bincount(inverse, weights=signs, minlength=len(keys))
+        nonzero = data != 0
+        keys, data = keys[nonzero], data[nonzero]
+        rows = keys // self.n_features
+        indices = (keys % self.n_features).astype(np.int32)
+
+        if self.norm is not None and len(data):
+            values = data ** 2 if self.norm == "l2" else np.abs(data)
+            totals = np.bincount(rows, weights=values, minlength=n_docs)
+            if self.norm == "l2":
+                totals = np.sqrt(totals)
+            data = data / totals[rows]
+
+        indptr = np.searchsorted(rows, np.arange(n_docs + 1)).astype(np.int64)
+        return (
+            data.astype(self.dtype),
+            indices,
+            indptr,
+            (n_docs, self.n_features),
+        )
+
+    def transform(self, texts):
+        """Return the hashed token counts of texts as a sparse matrix
+
+        :param texts: texts to transform
+        :type texts: pandas.Series or list of str
+        :return: matrix with one row per text
+        :rtype: scipy.sparse.csr_matrix
+        :raise ImportError: if ``scipy`` is not installed
+        """
+        return _csr_matrix(self.transform_arrays(texts))
+
+    def transform_chunk_arrays(self, texts, chunksize=100000, workers=1):
+        """Yield CSR arrays of consecutive chunks of texts
+
+        Memory is bounded by the chunk size: at most ``2 * workers`` chunks
+        are transformed or waiting to be consumed at any time. Chunks are
+        yielded in order, so their rows can be stacked vertically or passed
+        to a model trained incrementally.
+
+        :param texts: texts to transform
+        :type texts: pandas.Series or list of str
+        :param chunksize: number of texts per chunk, defaults to 100000
+        :type chunksize: int, optional
+        :param workers: number of worker processes, if 1 chunks are
+                        transformed in the calling process, if None
+                        ``os.cpu_count()`` is used, defaults to 1
+        :type workers: int, optional
+        :return: generator of ``(data, indices, indptr, shape)`` tuples, see
+                 :meth:`HashingVectorizer.transform_arrays`
+        """
+        workers = workers or os.cpu_count() or 1
+        return run_in_pool(
+            self.transform_arrays,
+            ((chunk,) for chunk in iter_text_chunks(texts, chunksize)),
+            workers,
+            ordered=True,
+            window=2 * workers,
+        )
+
+    def transform_chunks(self, texts, chunksize=100000, workers=1):
+        """Yield sparse matrices of consecutive chunks of texts
+
+        The chunks are transformed as in
+        :meth:`HashingVectorizer.transform_chunk_arrays`.
+
+        :param texts: texts to transform
+        :type texts: pandas.Series or list of str
+        :param chunksize: number of texts per chunk, defaults to 100000
+        :type chunksize: int, optional
+        :param workers: number of worker processes, if 1 chunks are
+                        transformed in the calling process, if None
+                        ``os.cpu_count()`` is used, defaults to 1
+        :type workers: int, optional
+        :return: generator of ``scipy.sparse.csr_matrix`` objects
+        :raise ImportError: if ``scipy`` is not installed
+        """
+        _import_sparse()
+        for arrays in self.transform_chunk_arrays(texts, chunksize, workers):
+            yield _csr_matrix(arrays)
+
+
+def _import_sparse():
+    """Return ``scipy.sparse``, raising ImportError if it is not installed"""
+    try:
+        import scipy.sparse
+    except ImportError:
+        raise ImportError(
+            "scipy is required for sparse matrices, install it with "
+            "'pip install scipy' or use HashingVectorizer.transform_arrays"
+        )
+    return scipy.sparse
+
+
+def _csr_matrix(arrays):
+    """Create ``scipy.sparse.csr_matrix`` from CSR arrays and shape"""
+    data, indices, indptr, shape = arrays
+    return _import_sparse().csr_matrix((data, indices, indptr), shape=shape)
@@ -0,0 +1,225 @@
+"""
+caproj.features.timeseries
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the resampling of irregular project change records
+into aligned per-project monthly time series
+
+**Module classes:**
+
+.. autosummary::
+
+   ProjectSeries
+
+**Module functions:**
+
+.. autosummary::
+
+   resample_projects
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+   RESAMPLE_METHODS
+
+|
+"""
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from caproj.features.engine import FeatureEngine
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+RESAMPLE_METHODS = ("ffill", "interpolate")
+"""Supported methods of filling months between change records"""
+
+
+class ProjectSeries(object):
+    """Monthly values of project features as 2D arrays
+
+    Each feature is stored as one array with a row per project and a column
+    per month, so all projects share the same monthly grid.
+
+    :param ids: project IDs, one per array row
+    :type ids: pandas.Index
+    :param months: monthly periods, one per array column
+    :type months: pandas.PeriodIndex
+    :param arrays: feature names mapped to 2D arrays of shape
+                   ``(len(ids), len(months))``
+    :type arrays: dict
+
+    **Class methods:**
+
+    .. autosummary::
+
+       ProjectSeries.to_frame
+    """
+
+    def __init__(self, ids, months, arrays):
+        self.ids = ids
+        self.months = months
+        self.arrays = arrays
+
+    def __getitem__(self, name):
+        """Return the 2D array of a feature"""
+        return self.arrays[name]
+
+    def to_frame(self, name):
+        """Return one feature as a dataframe of projects by months
+
+        :param name: feature name
+        :type name: str
+        :return: dataframe indexed by project ID with a column per month
+        :rtype: pandas.DataFrame
+        """
+        return pd.DataFrame(
+            self.arrays[name], index=self.ids, columns=self.months, copy=False
+        )
+
+
+def _month_bounds(report_dates, start, end):
+    """Return first and last month of the grid"""
+    months = report_dates.dropna().dt.to_period("M")
+    start = pd.Period(start, "M") if start is not None else months.min()
+    end = pd.Period(end, "M") if end is not None else months.max()
+    return start, end
+
+
+def resample_projects(
+    data,
+    names=("budget", "forecast_completion"),
+    method="ffill",
+    start=None,
+    end=None,
+    id_col="PID",
+    columns=None,
+    registry=None,
+):
+    """Resample features of every project's change records to months
+
+    The value of a project in a month is its value as of the end of the
+    month. With ``method="ffill"`` it is the value of the project's last
+    record reported on or before the end of the month. With
+    ``method="interpolate"`` it is linearly interpolated in time between
+    that record and the project's next record, and held after the last
+    record. Months before a project's first record are missing. Records
+    with a missing value are skipped, so the previous value is carried.
+
+    Records are sorted once by ID and report date with
+    :class:`~caproj.features.engine.FeatureEngine`, and every grid point of
+    all projects is matched to its record with a single
+    ``numpy.searchsorted`` over combined (project, month) keys, without a
+    loop over projects.
+
+    Features must be numeric or datetime; datetime features are returned
+    as ``datetime64[ns]`` arrays with ``NaT`` for missing values.
+
+    :param data: ``BaseData`` object or ``pandas.DataFrame`` of records
+    :param names: names of features to resample, defaults to
+                  ("budget", "forecast_completion")
+    :type names: list of str, optional
+    :param method: one of :data:`RESAMPLE_METHODS`, defaults to "ffill"
+    :type method: str, optional
+    :param start: first month of the grid, if None the month of the earliest
+                  report date is used, defaults to None
+    :type start: str, optional
+    :param end: last month of the grid, if None the month of the latest
+                report date is used, defaults to None
+    :type end: str, optional
+    :param id_col: name of the project ID column, defaults to "PID"
+    :type id_col: str, optional
+    :param columns: input column keys mapped to dataset column names, see
+                    :class:`~caproj.features.engine.FeatureEngine`, defaults
+                    to None
+    :type columns: dict, optional
+    :param registry: feature registry, defaults to
+                     :data:`caproj.features.engine.FEATURES`
+    :type registry: dict, optional
+    :return: :class:`ProjectSeries` object
+    :raise ValueError: if ``method`` is invalid or no report date is valid
+    """
+    if method not in RESAMPLE_METHODS:
+        raise ValueError(
+            "method must be one of {}, got '{}'".format(RESAMPLE_METHODS, method)
+        )
+    t1 = time.perf_counter()
+    engine = FeatureEngine(data, id_col=id_col, columns=columns, registry=registry)
+    dates = engine.report_dates
+    if dates.isnull().all():
+        raise ValueError("no valid report dates to resample")
+    start, end = _month_bounds(dates, start, end)
+    n_months = max(end.ordinal - start.ordinal + 1, 0)
+    months = pd.period_range(start, periods=n_months, freq="M")
+
+    # records are sorted by ID, so sorted factorize codes are non-decreasing
+    codes, ids = pd.factorize(engine.ids, sort=True)
+    n_ids = len(ids)
+    # month offsets are clipped to [-1, n_months] and shifted by one, so
+    # records before or after the grid never reach a neighbouring project
+    stride = n_months + 2
+    date_values = dates.to_numpy()
+    # monthly period ordinals count months since 1970-01
+    record_months = date_values.astype("datetime64[M]").view("int64")
+    offsets = np.clip(record_months - start.ordinal, -1, n_months)
+    grid_codes = np.repeat(np.arange(n_ids), n_months)
+    grid_keys = grid_codes * stride + np.tile(np.arange(n_months), n_ids) + 1
+    grid_times = (
+        months.to_timestamp(how="end").to_numpy().view("int64").astype(float)
+    )
+    grid_times = np.tile(grid_times, n_ids)
+
+    arrays = dict()
+    for name in names:
+        values = engine[name]
+        is_datetime = pd.api.types.is_datetime64_any_dtype(values)
+        valid = (codes >= 0) & dates.notnull().to_numpy() & values.notnull().to_numpy()
+        if is_datetime:
+            values = values.to_numpy().view("int64")
+        rec_codes = codes[valid]
+        rec_values = np.asarray(values, dtype=float)[valid]
+        rec_times = date_values.view("int64")[valid].astype(float)
+        rec_keys = rec_codes * stride + offsets[valid] + 1
+
+        prev = np.searchsorted(rec_keys, grid_keys, side="right") - 1
+        found = prev >= 0
+        found[found] = rec_codes[prev[found]] == grid_codes[found]
+        out = np.full(len(grid_keys), np.nan)
+        out[found] = rec_values[prev[found]]
+
+        if method == "interpolate":
+            nxt = prev + 1
+            between = found & (nxt < len(rec_keys))
+            between[between] = rec_codes[nxt[between]] == grid_codes[between]
+            p, n = prev[between], nxt[between]
+            span = rec_times[n] - rec_times[p]
+            weight = np.divide(
+                grid_times[between] - rec_times[p],
+                span,
+                out=np.zeros(len(span)),
+                where=span > 0,
+            )
+            out[between] = rec_values[p] + weight * (rec_values[n] - rec_values[p])
+
+        out = out.reshape(n_ids, n_months)
+        if is_datetime:
+            nat = np.isnan(out)
+            out = np.where(nat, 0, np.round(out)).astype(np.int64)
+            out[nat] = np.iinfo(np.int64).min
+            out = out.view("datetime64[ns]")
+        arrays[name] = out
+
+    t2 = time.perf_counter() - t1
+    log.info(
+        "{} features of {} projects resampled to {} months in {:.3f} sec".format(
+            len(arrays), n_ids, n_months, t2
+        ),
+        extra={"rows": len(engine.df), "duration": t2},
+    )
+    return ProjectSeries(pd.Index(ids, name=id_col), months, arrays)
@@ -9,24 +9,399 @@ This module contains logging-related features for the ``caproj`` package
 .. autosummary::
    logfunc
    start_logging
+   stop_logging
+   start_worker_logging
+   worker_initializer
+   get_log_queue
+   profile_call
+
+**Module classes:**
+
+.. autosummary::
+   BoundedQueueHandler
+   JsonFormatter
+   SamplingFilter
 
 |
 """
 
+import atexit
+import cProfile
 import functools
+import itertools
 import json
 import logging
 import logging.config
+import logging.handlers
 import os
+import queue
 import sys
+import threading
 import time
 
 
+QUEUE_OVERFLOW_POLICIES = ("drop", "block")
+"""Accepted ``overflow`` values for queue-based logging"""
+
+PROFILE_ENV_KEY = "CAPROJ_PROFILE"
+"""Environment variable listing comma-separated function names to profile"""
+
+PROFILE_DIR_ENV_KEY = "CAPROJ_PROFILE_DIR"
+"""Environment variable overriding the directory profile files are saved to"""
+
+STRUCTURED_FIELDS = (
+    "function",
+    "duration",
+    "rows",
+    "errors",
+    "column",
+    "dtype",
+    "suppressed",
+)
+"""``LogRecord`` attributes emitted as top-level fields by ``JsonFormatter``"""
+
+_listener = None
+_queue_handler = None
+_profile_counter = itertools.count()
+# held while a profile runs, only one profiler can be active per process
+# from Python 3.12 on and nested calls are captured by the outer profile
+_profile_lock = threading.Lock()
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """Non-blocking ``QueueHandler`` that enqueues records to a bounded queue
+
+    Records are handed to a ``logging.handlers.QueueListener`` running in a
+    background thread, which formats and writes them using the original
+    handlers. When the queue is full, the ``overflow`` policy decides
+    whether the record is dropped ('drop') or the caller waits for space
+    ('block'). Dropped records are counted in ``BoundedQueueHandler.dropped``.
+
+    If the handler is used from a forked worker process while backed by an
+    in-process ``queue.Queue`` (which no listener drains in the child),
+    records are passed straight to the target handlers instead.
+
+    :param log_queue: ``queue.Queue`` or ``multiprocessing.Queue`` instance
+    :param handlers: list of target ``logging.Handler`` objects served by the
+                     listener, used as fallback in forked worker processes
+    :param overflow: string overflow policy, either 'drop' or 'block'
+                     (default is 'drop')
+    :raise ValueError: if ``overflow`` is not a valid policy
+    """
+
+    def __init__(self, log_queue, handlers=(), overflow="drop"):
+        if overflow not in QUEUE_OVERFLOW_POLICIES:
+            raise ValueError(
+                "overflow must be one of {}, got '{}'".format(
+                    QUEUE_OVERFLOW_POLICIES, overflow
+                )
+            )
+        super().__init__(log_queue)
+        self.handlers = list(handlers)
+        self.overflow = overflow
+        self.dropped = 0
+        self._pid = os.getpid()
+        self._is_local_queue = isinstance(log_queue, queue.Queue)
+
+    def prepare(self, record):
+        """Defer formatting to the listener thread where the queue allows it
+
+        In-process queues pass the record object as-is, so formatting happens
+        in the listener thread. Multiprocessing queues require a picklable
+        record, so the default ``QueueHandler.prepare`` is applied.
+        """
+        if self._is_local_queue:
+            return record
+        return super().prepare(record)
+
+    def enqueue(self, record):
+        """Put record on queue, applying the overflow policy when full"""
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        """Enqueue record, or handle it directly in a forked child process"""
+        if self._is_local_queue and os.getpid() != self._pid:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+            return
+        super().emit(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as single-line JSON objects
+
+    Every record contains ``time``, ``level``, ``logger`` and ``message``
+    fields. Any of the :data:`STRUCTURED_FIELDS` passed to a logging call via
+    ``extra`` (for instance ``function``, ``duration``, ``rows`` and
+    ``errors``, as set by :func:`logfunc` and ``BaseDataOps.set_dtypes``) are
+    added as top-level fields. Long messages can be truncated so that lines
+    remain a bounded size.
+
+    Select this formatter in ``logging.json`` with
+    ``{"()": "caproj.logger.JsonFormatter", "max_message_length": 1000}``.
+
+    :param max_message_length: integer or None, maximum number of message
+                               characters retained, if None messages are not
+                               truncated (default is None)
+    :param kwargs: optional args to ``logging.Formatter``
+    """
+
+    def __init__(self, max_message_length=None, **kwargs):
+        super().__init__(**kwargs)
+        self.max_message_length = max_message_length
+
+    def format(self, record):
+        """Return record serialized as a JSON string"""
+        message = record.getMessage()
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": message,
+        }
+        if (
+            self.max_message_length is not None
+            and len(message) > self.max_message_length
+        ):
+            entry["message"] = message[: self.max_message_length]
+            entry["truncated"] = len(message)
+        for field in STRUCTURED_FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Rate-limit and sample high-frequency log events
+
+    Records are grouped into events by the source location of the logging
+    call (logger name, file and line number) and, for records logged by
+    :func:`logfunc`, the decorated function's name, since all of those
+    share the decorator's source location. Within each ``interval``
+    seconds at most ``max_per_interval`` records of an event pass the filter,
+    and of those only every n-th record is kept, where n is derived from
+    ``sample_rate``. Records at or above ``always_level`` are never dropped.
+    The number of records suppressed since an event last passed is attached
+    to the next passing record as ``suppressed``.
+
+    Attach the filter in ``logging.json`` with
+    ``{"()": "caproj.logger.SamplingFilter", "max_per_interval": 100}``.
+
+    :param max_per_interval: integer or None, maximum number of records per
+                             event and interval, if None there is no limit
+                             (default is 100)
+    :param interval: float length of the rate-limiting window in seconds
+                     (default is 60.0)
+    :param sample_rate: float between 0 and 1, fraction of records kept
+                        (default is 1.0)
+    :param always_level: string level at and above which records always pass
+                         (default is 'WARNING')
+    :raise ValueError: if ``sample_rate`` is not in the interval (0, 1]
+    """
+
+    def __init__(
+        self,
+        max_per_interval=100,
+        interval=60.0,
+        sample_rate=1.0,
+        always_level="WARNING",
+    ):
+        super().__init__()
+        if not 0 < sample_rate <= 1:
+            raise ValueError(
+                "sample_rate must be in (0, 1], got {}".format(sample_rate)
+            )
+        self.max_per_interval = max_per_interval
+        self.interval = interval
+        self.sample_every = int(round(1 / sample_rate))
+        self.always_level = logging.getLevelName(always_level.upper())
+        self._events = dict()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """Return True if record should be logged"""
+        if record.levelno >= self.always_level:
+            return True
+
+        key = (
+            record.name,
+            record.pathname,
+            record.lineno,
+            getattr(record, "function", None),
+        )
+        now = time.monotonic()
+        with self._lock:
+            window_start, seen, passed, suppressed = self._events.get(
+                key, (now, 0, 0, 0)
+            )
+            if now - window_start >= self.interval:
+                window_start, seen, passed = now, 0, 0
+            seen += 1
+            keep = (seen - 1) % self.sample_every == 0 and (
+                self.max_per_interval is None or passed < self.max_per_interval
+            )
+            if keep:
+                if suppressed:
+                    record.suppressed = suppressed
+                passed, suppressed = passed + 1, 0
+            else:
+                suppressed += 1
+            self._events[key] = (window_start, seen, passed, suppressed)
+        return keep
+
+
+def _start_queue_listener(maxsize=10000, overflow="drop", multiprocess=False):
+    """Move root logger handlers behind a bounded queue and background listener
+
+    :param maxsize: integer maximum number of queued records (default 10000)
+    :param overflow: string overflow policy, 'drop' or 'block' (default 'drop')
+    :param multiprocess: boolean indicating whether to use a
+                         ``multiprocessing.Queue`` so that worker processes
+                         can log through :func:`start_worker_logging`
+                         (default is False)
+    :return: the configured ``BoundedQueueHandler``
+    """
+    global _listener, _queue_handler
+
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    if multiprocess:
+        import multiprocessing
+
+        log_queue = multiprocessing.Queue(maxsize)
+    else:
+        log_queue = queue.Queue(maxsize)
+
+    queue_handler = BoundedQueueHandler(
+        log_queue, handlers=handlers, overflow=overflow
+    )
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+    _queue_handler = queue_handler
+    return queue_handler
+
+
+def stop_logging():
+    """Stop the queue listener, flushing queued records to their handlers
+
+    Restores the original handlers onto the root logger and logs a warning if
+    any records were dropped due to queue overflow. Has no effect if
+    queue-based logging is not active.
+    """
+    global _listener, _queue_handler
+
+    if _listener is None:
+        return
+
+    _listener.stop()
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    for handler in _listener.handlers:
+        root.addHandler(handler)
+
+    if _queue_handler.dropped:
+        logging.getLogger(__name__).warning(
+            "{} log records dropped due to full logging queue".format(
+                _queue_handler.dropped
+            )
+        )
+    _listener = None
+    _queue_handler = None
+
+
+atexit.register(stop_logging)
+
+
+def get_log_queue():
+    """Return the queue used by active queue-based logging, if any
+
+    Pass this queue to :func:`start_worker_logging` (for instance as a
+    ``multiprocessing.Pool`` initializer) so that worker processes route
+    their records to the listener in the parent process.
+
+    :return: ``queue.Queue``, ``multiprocessing.Queue`` or ``None``
+    """
+    if _queue_handler is None:
+        return None
+    return _queue_handler.queue
+
+
+def start_worker_logging(log_queue, level="INFO", overflow="drop"):
+    """Configure logging in a worker process to forward to a parent queue
+
+    Intended as the ``initializer`` of a ``multiprocessing.Pool`` or
+    ``concurrent.futures.ProcessPoolExecutor`` when the parent called
+    :func:`start_logging` with ``multiprocess`` queue settings. Any handlers
+    inherited by the worker are replaced by a single ``BoundedQueueHandler``.
+
+    :param log_queue: ``multiprocessing.Queue`` from :func:`get_log_queue`
+    :param level: string logging level for the worker root logger
+                  (default is 'INFO')
+    :param overflow: string overflow policy, 'drop' or 'block'
+                     (default is 'drop')
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(BoundedQueueHandler(log_queue, overflow=overflow))
+    root.setLevel(level.upper())
+
+
+def worker_initializer():
+    """Return the initializer that routes worker process logging to the parent
+
+    Pass the result as the ``initializer`` and ``initargs`` of a
+    ``concurrent.futures.ProcessPoolExecutor``. Workers only forward their
+    records when :func:`start_logging` was called with ``multiprocess``
+    queue settings; a thread-only ``queue.Queue`` cannot be shared with
+    other processes, so workers then keep their inherited configuration.
+
+    :return: ``(initializer, initargs)`` tuple, ``(None, ())`` if workers
+             need no set up
+    :rtype: tuple
+    """
+    log_queue = get_log_queue()
+    if log_queue is None or isinstance(log_queue, queue.Queue):
+        return None, ()
+    return start_worker_logging, (log_queue,)
+
+
 def start_logging(
-    default_path="logging.json", default_level="INFO", env_key="LOG_CFG"
+    default_path="logging.json",
+    default_level="INFO",
+    env_key="LOG_CFG",
+    use_queue=None,
+    queue_maxsize=None,
+    queue_overflow=None,
+    queue_multiprocess=None,
 ):
     """Set up logging configuration for ``caproj`` package
 
+    Queue-based logging can be enabled either with the ``use_queue``
+    parameter or with a top-level ``"queue"`` object in the json
+    configuration file, for example
+    ``{"enabled": true, "maxsize": 10000, "overflow": "drop"}``. Explicitly
+    passed ``use_queue`` and ``queue_*`` values take precedence over the
+    matching file settings, which in turn override the defaults. When
+    enabled, the
+    configured root handlers are served by a ``QueueListener`` thread so that
+    logging calls do not block on I/O.
+
     :param default_path: string file path for json formatted
                          logging configuration file (default is
                          'logging.json')
@@ -36,18 +411,36 @@ def start_logging(
                           'ERROR', 'CRITICAL' (default is 'INFO')
     :param env_key: string indicating environment key if one exists
                     (default is 'LOG_CFG')
+    :param use_queue: boolean or None, whether to enable queue-based logging,
+                      if None the json configuration decides (default is None)
+    :param queue_maxsize: integer maximum number of queued log records,
+                          if None the json configuration or 10000 is used
+                          (default is None)
+    :param queue_overflow: string policy applied when the queue is full,
+                           'drop' or 'block', if None the json configuration
+                           or 'drop' is used (default is None)
+    :param queue_multiprocess: boolean, use a ``multiprocessing.Queue`` that
+                               worker processes can log to via
+                               :func:`start_worker_logging`, if None the json
+                               configuration or False is used (default is
+                               None)
     """
     path = default_path
     value = os.getenv(env_key, None)
     default_level = default_level.upper()
     level = eval("logging.{}".format(default_level))
+    queue_config = {}
 
     if value:
         path = value
 
+    stop_logging()
+
     if os.path.exists(path):
         with open(path, "rt") as f:
             config = json.load(f)
+        if isinstance(config, dict) and isinstance(config.get("queue"), dict):
+            queue_config = config.pop("queue")
         logging.config.dictConfig(config)
 
         log = logging.getLogger(__name__)
@@ -67,6 +460,83 @@ def start_logging(
             )
         )
 
+    if use_queue is None:
+        use_queue = queue_config.get("enabled", False)
+
+    if use_queue:
+        settings = {
+            "maxsize": (queue_maxsize, 10000),
+            "overflow": (queue_overflow, "drop"),
+            "multiprocess": (queue_multiprocess, False),
+        }
+        _start_queue_listener(
+            **{
+                key: value
+                if value is not None
+                else queue_config.get(key, default)
+                for key, (value, default) in settings.items()
+            }
+        )
+        log.info("logging records routed through background queue listener")
+
+
+def _profile_requested(funcname, env_key=PROFILE_ENV_KEY):
+    """Check whether profiling is requested for a function via environment
+
+    :param funcname: string name of the function
+    :param env_key: string environment variable holding comma-separated
+                    function names, or '*' for all functions
+                    (default is 'CAPROJ_PROFILE')
+    :return: boolean indicating whether profiling is requested
+    """
+    value = os.getenv(env_key, "")
+    if not value:
+        return False
+    names = [name.strip() for name in value.split(",")]
+    return "*" in names or funcname in names
+
+
+def profile_call(func, *args, profile_dir=None, **kwargs):
+    """Run function under ``cProfile`` and save its stats to a ``.pstats`` file
+
+    One file named ``<funcname>_<timestamp>_<pid>_<n>.pstats`` is written per
+    invocation, which can be inspected with ``pstats`` or tools such as
+    ``snakeviz``. Calls made while a profile is already running, whether
+    nested or from another thread, are executed without a separate profile
+    rather than waiting for it to finish.
+
+    :param func: callable to profile
+    :param args: positional arguments passed to ``func``
+    :param profile_dir: string directory in which to save profile files,
+                        if None the ``CAPROJ_PROFILE_DIR`` environment
+                        variable or 'reports' is used (default is None)
+    :param kwargs: keyword arguments passed to ``func``
+    :return: the return value of ``func``
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return func(*args, **kwargs)
+
+    profile_dir = profile_dir or os.getenv(PROFILE_DIR_ENV_KEY, "reports")
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        _profile_lock.release()
+        os.makedirs(profile_dir, exist_ok=True)
+        filepath = os.path.join(
+            profile_dir,
+            "{}_{}_{}_{}.pstats".format(
+                func.__name__,
+                time.strftime("%Y%m%d-%H%M%S"),
+                os.getpid(),
+                next(_profile_counter),
+            ),
+        )
+        profiler.dump_stats(filepath)
+        logging.getLogger(__name__).info(
+            "{} profile saved to {}".format(func.__name__, filepath)
+        )
+
 
 def logfunc(
     orig_func=None,
@@ -75,6 +545,7 @@ def logfunc(
     argvals=False,
     docdescr=False,
     runtime=False,
+    profile=False,
 ):
     """Wrap function call to provide log information when function is called
 
@@ -92,6 +563,11 @@ def logfunc(
                      short description, default is False
     :param runtime: boolean indicating whether to log function execution
                     runtime in seconds, default is False
+    :param profile: boolean indicating whether to run the function under
+                    ``cProfile`` and save a ``.pstats`` file per call using
+                    :func:`profile_call`, default is False. Profiling can
+                    also be enabled at run time by listing the function name
+                    in the ``CAPROJ_PROFILE`` environment variable
     :return: ``functools.wraps`` wrapper function
 
     :Example:
@@ -116,31 +592,44 @@ def logfunc(
             argvals=argvals,
             docdescr=docdescr,
             runtime=runtime,
+            profile=profile,
         )
 
     @functools.wraps(orig_func)
     def wrapper(*args, **kwargs):
 
+        extra = {"function": orig_func.__name__}
+
         if funcname:
-            log.info("Run function {}".format(orig_func.__name__))
+            log.info("Run function {}".format(orig_func.__name__), extra=extra)
 
         if docdescr:
             try:
-                log.info(orig_func.__doc__.partition("\n")[0])
+                log.info(orig_func.__doc__.partition("\n")[0], extra=extra)
             except AttributeError:
-                log.info("No docstring provided")
+                log.info("No docstring provided", extra=extra)
 
         if argvals:
-            log.info("Run with args: {}, and kwargs: {}".format(args, kwargs))
+            log.info(
+                "Run with args: {}, and kwargs: {}".format(args, kwargs),
+                extra=extra,
+            )
+
+        func = orig_func
+        if profile or _profile_requested(orig_func.__name__):
+            func = functools.partial(profile_call, orig_func)
 
         if runtime:
             t1 = time.time()
-            result = orig_func(*args, **kwargs)
+            result = func(*args, **kwargs)
             t2 = time.time() - t1
-            log.info("{} run time: {:.3f} sec".format(orig_func.__name__, t2))
+            log.info(
+                "{} run time: {:.3f} sec".format(orig_func.__name__, t2),
+                extra=dict(extra, duration=t2),
+            )
             return result
 
         else:
-            return orig_func(*args, **kwargs)
+            return func(*args, **kwargs)
 
     return wrapper
@@ -2,8 +2,8 @@
 caproj.models
 ~~~~~~~~~~~~~
 
-This module contains functionality for generating engineered features to be
-used in modeling for this project.
+This module contains functionality for cross-validating, tuning and saving
+the models used in this project.
 
 **Module functions:**
 
@@ -11,8 +11,21 @@ used in modeling for this project.
 
    placeholder
 
+**Submodules:**
+
+.. autosummary::
+
+   caproj.models.estimators
+   caproj.models.registry
+   caproj.models.search
+   caproj.models.validation
+
 |
 """
+from .estimators import MeanRegressor, RidgeRegression  # noqa: F401
+from .registry import ModelRegistry  # noqa: F401
+from .search import expand_grid, successive_halving  # noqa: F401
+from .validation import METRICS, assign_folds, cross_validate  # noqa: F401
 
 
 def placeholder():
@@ -0,0 +1,129 @@
+"""
+caproj.models.estimators
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains lightweight ``numpy`` regression models following the
+``fit`` / ``predict`` interface expected by
+:func:`caproj.models.validation.cross_validate`
+
+**Module classes:**
+
+.. autosummary::
+
+   MeanRegressor
+   RidgeRegression
+
+|
+"""
+import numpy as np
+
+
+class MeanRegressor(object):
+    """Baseline model predicting the mean of the training target
+
+    **Class methods:**
+
+    .. autosummary::
+
+       MeanRegressor.fit
+       MeanRegressor.predict
+       MeanRegressor.get_params
+    """
+
+    def fit(self, X, y):
+        """Fit the model
+
+        :param X: 2D array of features
+        :type X: numpy.ndarray
+        :param y: 1D array of targets
+        :type y: numpy.ndarray
+        :return: the fitted model
+        """
+        self.mean_ = float(np.mean(y))
+        return self
+
+    def predict(self, X):
+        """Return predictions for the rows of ``X``
+
+        :param X: 2D array of features
+        :type X: numpy.ndarray
+        :return: 1D array of predictions
+        :rtype: numpy.ndarray
+        """
+        return np.full(len(X), self.mean_)
+
+    def get_params(self):
+        """Return the model's constructor parameters
+
+        :return: parameter names mapped to values
+        :rtype: dict
+        """
+        return dict()
+
+
+class RidgeRegression(object):
+    """Linear regression with L2 regularization, solved in closed form
+
+    The coefficients solve ``(X'X + alpha * I) w = X'y`` on centered data,
+    so fitting costs one pass over the data plus a solve of size
+    ``n_features``.
+
+    :param alpha: L2 regularization strength, defaults to 1.0
+    :type alpha: float, optional
+    :param fit_intercept: whether an intercept is fitted, defaults to True
+    :type fit_intercept: bool, optional
+    :cvar self.coef_: fitted coefficients, one per feature
+    :cvar self.intercept_: fitted intercept
+
+    **Class methods:**
+
+    .. autosummary::
+
+       RidgeRegression.fit
+       RidgeRegression.predict
+       RidgeRegression.get_params
+    """
+
+    def __init__(self, alpha=1.0, fit_intercept=True):
+        self.alpha = alpha
+        self.fit_intercept = fit_intercept
+
+    def fit(self, X, y):
+        """Fit the model
+
+        :param X: 2D array of features
+        :type X: numpy.ndarray
+        :param y: 1D array of targets
+        :type y: numpy.ndarray
+        :return: the fitted model
+        """
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if self.fit_intercept:
+            X_mean, y_mean = X.mean(axis=0), y.mean()
+            X, y = X - X_mean, y - y_mean
+        else:
+            X_mean, y_mean = np.zeros(X.shape[1]), 0.0
+        gram = X.T @ X + self.alpha * np.eye(X.shape[1])
+        # lstsq handles singular systems, e.g. constant columns with alpha=0
+        self.coef_ = np.linalg.lstsq(gram, X.T @ y, rcond=None)[0]
+        self.intercept_ = float(y_mean - X_mean @ self.coef_)
+        return self
+
+    def predict(self, X):
+        """Return predictions for the rows of ``X``
+
+        :param X: 2D array of features
+        :type X: numpy.ndarray
+        :return: 1D array of predictions
+        :rtype: numpy.ndarray
+        """
+        return np.asarray(X, dtype=float) @ self.coef_ + self.intercept_
+
+    def get_params(self):
+        """Return the model's constructor parameters
+
+        :return: parameter names mapped to values
+        :rtype: dict
+        """
+        return {"alpha": self.alpha, "fit_intercept": self.fit_intercept}
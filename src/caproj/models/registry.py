@@ -0,0 +1,339 @@
+"""
+caproj.models.registry
+~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the model registry that saves versioned model
+artifacts with their metadata to the ``models/`` directory and loads them
+memory-mapped through an in-process LRU cache
+
+**Module classes:**
+
+.. autosummary::
+
+   ModelRegistry
+
+**Module functions:**
+
+.. autosummary::
+
+   data_hash
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+
+|
+"""
+import copy
+import datetime
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from caproj.features.store import feature_key
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+
+def data_hash(data):
+    """Return content hash of a training dataset
+
+    :param data: ``BaseData`` object, ``pandas`` object or ``numpy`` array
+    :return: hex digest string
+    :rtype: str
+    """
+    data = getattr(data, "df", data)
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        columns = data.columns if isinstance(data, pd.DataFrame) else [data.name]
+        digest.update(json.dumps([str(col) for col in columns]).encode())
+    else:
+        array = np.ascontiguousarray(data)
+        digest.update(array.tobytes())
+        digest.update(json.dumps([str(array.dtype), array.shape]).encode())
+    return digest.hexdigest()
+
+
+def _array_attrs(model):
+    """Return names of a model's numeric array attributes"""
+    return sorted(
+        name
+        for name, value in getattr(model, "__dict__", {}).items()
+        if isinstance(value, np.ndarray) and value.dtype != object
+    )
+
+
+class ModelRegistry(object):
+    """Save and load versioned models with metadata
+
+    Every saved model gets the next integer version of its name::
+
+        <root>/<name>/<version>/metadata.json
+        <root>/<name>/<version>/model.pkl
+        <root>/<name>/<version>/<attribute>.npy
+
+    Numeric ``numpy`` array attributes of the model, such as fitted
+    coefficients, are saved as separate ``.npy`` files and the rest of the
+    model is pickled without them. On :meth:`ModelRegistry.load` the arrays
+    are memory-mapped read-only, so loading a large array-backed model reads
+    only its small pickle and the operating system pages the arrays in as
+    they are used and shares them between processes. Arrays nested inside
+    other attributes stay in the pickle.
+
+    Loaded models are kept in an in-process cache of the ``cache_size``
+    most recently used models, so repeated scoring jobs reuse them. The
+    cache is safe to use from several threads.
+
+    :param root: registry directory, defaults to "models"
+    :type root: str, optional
+    :param cache_size: number of loaded models kept in memory, defaults to 8
+    :type cache_size: int, optional
+
+    **Class methods:**
+
+    .. autosummary::
+
+       ModelRegistry.save
+       ModelRegistry.load
+       ModelRegistry.metadata
+       ModelRegistry.versions
+       ModelRegistry.names
+       ModelRegistry.clear_cache
+    """
+
+    def __init__(self, root="models", cache_size=8):
+        self.root = root
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def versions(self, name):
+        """Return saved versions of a model in increasing order
+
+        :param name: model name
+        :type name: str
+        :return: list of versions
+        :rtype: list of int
+        """
+        dirname = os.path.join(self.root, name)
+        if not os.path.isdir(dirname):
+            return list()
+        return sorted(int(entry) for entry in os.listdir(dirname) if entry.isdigit())
+
+    def names(self):
+        """Return names of saved models
+
+        :return: sorted list of model names
+        :rtype: list of str
+        """
+        if not os.path.isdir(self.root):
+            return list()
+        return sorted(name for name in os.listdir(self.root) if self.versions(name))
+
+    def _dirname(self, name, version=None):
+        """Return directory of a model version, latest if version is None
+
+        :raise KeyError: if the model or version does not exist
+        """
+        versions = self.versions(name)
+        if version is None and versions:
+            version = versions[-1]
+        if version not in versions:
+            raise KeyError(
+                "model '{}' version {} not found in {}".format(name, version, self.root)
+            )
+        return os.path.join(self.root, name, str(version))
+
+    def save(
+        self,
+        model,
+        name,
+        data=None,
+        features=None,
+        metrics=None,
+        params=None,
+        metadata=None,
+        feature_registry=None,
+    ):
+        """Save a model as the next version of its name
+
+        The version directory is written under a unique temporary name and
+        renamed once complete, so readers never see a partial model. If
+        another thread or process saved the same version first, the rename
+        fails and the next version is tried, so concurrent saves never
+        overwrite each other.
+
+        :param model: fitted model object
+        :param name: model name
+        :type name: str
+        :param data: training data whose :func:`data_hash` is recorded,
+                     defaults to None
+        :param features: names of the features the model was trained on,
+                         recorded with their
+                         :meth:`~caproj.features.store.FeatureStore.feature_key`
+                         definition versions, defaults to None
+        :type features: list of str, optional
+        :param metrics: evaluation metrics, e.g. the ``metrics`` of
+                        :func:`~caproj.models.validation.cross_validate`,
+                        defaults to None
+        :type metrics: dict, optional
+        :param params: model parameters, defaults to ``model.get_params()``
+                       if available
+        :type params: dict, optional
+        :param metadata: additional JSON serializable metadata, defaults to
+                         None
+        :type metadata: dict, optional
+        :param feature_registry: feature registry in which ``features`` are
+                                 defined, defaults to
+                                 :data:`caproj.features.engine.FEATURES`
+        :type feature_registry: dict, optional
+        :return: saved version
+        :rtype: int
+        """
+        t1 = time.perf_counter()
+        if params is None and hasattr(model, "get_params"):
+            params = model.get_params()
+        info = dict(
+            metadata or {},
+            name=name,
+            model="{}.{}".format(type(model).__module__, type(model).__qualname__),
+            params=params,
+            data_hash=data_hash(data) if data is not None else None,
+            features=(
+                {
+                    feature: feature_key(feature, feature_registry)
+                    for feature in features
+                }
+                if features is not None
+                else None
+            ),
+            metrics=metrics,
+            arrays=_array_attrs(model),
+            created=datetime.datetime.now().isoformat(timespec="seconds"),
+        )
+
+        skeleton = copy.copy(model)
+        for attr in info["arrays"]:
+            setattr(skeleton, attr, None)
+
+        model_dirname = os.path.join(self.root, name)
+        os.makedirs(model_dirname, exist_ok=True)
+        tmp_dirname = tempfile.mkdtemp(prefix=".tmp-", dir=model_dirname)
+        try:
+            # mkdtemp creates the directory readable by its owner only
+            os.chmod(tmp_dirname, 0o755)
+            for attr in info["arrays"]:
+                np.save(
+                    os.path.join(tmp_dirname, "{}.npy".format(attr)),
+                    getattr(model, attr),
+                )
+            with open(os.path.join(tmp_dirname, "model.pkl"), "wb") as f:
+                pickle.dump(skeleton, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            versions = self.versions(name)
+            version = versions[-1] + 1 if versions else 1
+            while True:
+                info["version"] = version
+                with open(os.path.join(tmp_dirname, "metadata.json"), "wt") as f:
+                    json.dump(info, f, indent=2, default=str)
+                dirname = os.path.join(model_dirname, str(version))
+                try:
+                    os.rename(tmp_dirname, dirname)
+                    break
+                except OSError:
+                    if not os.path.isdir(dirname):
+                        raise
+                    # the version was saved by another thread or process
+                    version += 1
+        except BaseException:
+            shutil.rmtree(tmp_dirname, ignore_errors=True)
+            raise
+
+        t2 = time.perf_counter() - t1
+        log.info(
+            "model {} version {} saved in {:.3f} sec".format(name, version, t2),
+            extra={"duration": t2},
+        )
+        return version
+
+    def metadata(self, name, version=None):
+        """Return metadata of a saved model
+
+        :param name: model name
+        :type name: str
+        :param version: model version, if None the latest is used, defaults
+                        to None
+        :type version: int, optional
+        :return: metadata dictionary
+        :rtype: dict
+        :raise KeyError: if the model or version does not exist
+        """
+        with open(os.path.join(self._dirname(name, version), "metadata.json")) as f:
+            return json.load(f)
+
+    def load(self, name, version=None, mmap=True):
+        """Load a saved model, from the cache if recently used
+
+        :param name: model name
+        :type name: str
+        :param version: model version, if None the latest is used, defaults
+                        to None
+        :type version: int, optional
+        :param mmap: whether array attributes are memory-mapped read-only
+                     rather than read into memory, defaults to True
+        :type mmap: bool, optional
+        :return: model object
+        :raise KeyError: if the model or version does not exist
+        """
+        dirname = self._dirname(name, version)
+        key = (dirname, mmap)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        t1 = time.perf_counter()
+        with open(os.path.join(dirname, "metadata.json")) as f:
+            arrays = json.load(f)["arrays"]
+        with open(os.path.join(dirname, "model.pkl"), "rb") as f:
+            model = pickle.load(f)
+        for attr in arrays:
+            setattr(
+                model,
+                attr,
+                np.load(
+                    os.path.join(dirname, "{}.npy".format(attr)),
+                    mmap_mode="r" if mmap else None,
+                ),
+            )
+        t2 = time.perf_counter() - t1
+        log.info(
+            "model {} loaded from {} in {:.3f} sec".format(name, dirname, t2),
+            extra={"duration": t2},
+        )
+
+        with self._lock:
+            self._cache[key] = model
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return model
+
+    def clear_cache(self):
+        """Remove all loaded models from the cache"""
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,428 @@
+"""
+caproj.models.search
+~~~~~~~~~~~~~~~~~~~~
+
+This module contains the successive halving hyperparameter search that
+evaluates many model configurations on small training subsets in parallel
+and spends the full data only on the most promising ones
+
+**Module functions:**
+
+.. autosummary::
+
+   expand_grid
+   successive_halving
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+   GREATER_IS_BETTER
+
+|
+"""
+import hashlib
+import itertools
+import json
+import logging
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from caproj.models.validation import (
+    METRICS,
+    _prepare,
+    _run_fold,
+    _SharedData,
+    assign_folds,
+)
+from caproj.pool import run_in_pool, worker_pool
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+GREATER_IS_BETTER = {"r2"}
+"""Names of :data:`~caproj.models.validation.METRICS` where higher is better"""
+
+
+def expand_grid(param_grid):
+    """Return every parameter combination of a grid
+
+    :param param_grid: parameter names mapped to lists of values, or a list
+                       of such dictionaries whose combinations are chained
+    :type param_grid: dict or list of dict
+    :return: list of parameter dictionaries
+    :rtype: list of dict
+    """
+    grids = [param_grid] if isinstance(param_grid, dict) else param_grid
+    configs = list()
+    for grid in grids:
+        names = sorted(grid)
+        for values in itertools.product(*[grid[name] for name in names]):
+            configs.append(dict(zip(names, values)))
+    return configs
+
+
+def _params_key(params):
+    """Return canonical JSON string of a parameter dictionary"""
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def _run_trial(dirname, model, params, folds, metric, resource, seed, capped=True):
+    """Score one configuration on every fold with a training subset
+
+    With ``capped`` every fold trains on at most ``resource`` records,
+    otherwise on all of its training records.
+
+    :return: trial dictionary with ``params``, ``resource``, ``status``,
+             ``score``, ``seconds``, ``fold_seconds`` and ``error`` keys
+    :rtype: dict
+    """
+    t1 = time.perf_counter()
+    results = [
+        _run_fold(
+            dirname, fold, model, params, [metric], resource if capped else None, seed
+        )
+        for fold in range(folds)
+    ]
+    failed = [result for result in results if result["status"] != "ok"]
+    return {
+        "params": params,
+        "resource": resource,
+        "status": "failed" if failed else "ok",
+        "score": (
+            None
+            if failed
+            else float(np.mean([result["metrics"][metric] for result in results]))
+        ),
+        "seconds": time.perf_counter() - t1,
+        "fold_seconds": [result["seconds"] for result in results],
+        "error": failed[0]["error"] if failed else None,
+    }
+
+
+def _rank_trials(trials, sign):
+    """Return successful trials from best to worst, NaN scores last"""
+    return sorted(
+        [trial for trial in trials if trial["status"] == "ok"],
+        key=lambda trial: (math.isnan(trial["score"]), sign * trial["score"]),
+    )
+
+
+class _Checkpoint(object):
+    """Append-only JSON lines file of completed trials
+
+    The first line identifies the search; a file written by a different
+    search raises ValueError. A partially written last line, e.g. from a
+    search killed while writing, is removed.
+    """
+
+    def __init__(self, filepath, search_key):
+        self.filepath = filepath
+        self.trials = dict()
+        if filepath is None:
+            return
+        if os.path.exists(filepath):
+            with open(filepath, "rt") as f:
+                text = f.read()
+            lines = text.splitlines()
+            if text and not text.endswith("\n"):
+                # drop the partial last line so new trials start on a new line
+                lines = lines[:-1]
+                tmp_filepath = "{}.tmp".format(filepath)
+                with open(tmp_filepath, "wt") as f:
+                    f.write("".join(line + "\n" for line in lines))
+                os.replace(tmp_filepath, filepath)
+            header = json.loads(lines[0]) if lines else {}
+            if lines and header.get("search") != search_key:
+                raise ValueError(
+                    "checkpoint {} belongs to a different search, remove it "
+                    "or use another checkpoint file".format(filepath)
+                )
+            for line in lines[1:]:
+                try:
+                    trial = json.loads(line)
+                except ValueError:
+                    continue
+                self.trials[self.key(trial["rung"], trial["params"])] = trial
+            if lines:
+                return
+        dirname = os.path.dirname(filepath)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        with open(filepath, "wt") as f:
+            f.write(json.dumps({"search": search_key}) + "\n")
+
+    @staticmethod
+    def key(rung, params):
+        """Return lookup key of a trial"""
+        return rung, _params_key(params)
+
+    def add(self, trial):
+        """Record a completed trial and append it to the file"""
+        self.trials[self.key(trial["rung"], trial["params"])] = trial
+        if self.filepath is None:
+            return
+        with open(self.filepath, "at") as f:
+            f.write(json.dumps(trial, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _search_key(X, y, fold_ids, model, configs, metric, eta, resources, seed):
+    """Return hash identifying the data and settings of a search"""
+    digest = hashlib.blake2b(digest_size=16)
+    for array in [X, y, fold_ids]:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(
+        json.dumps(
+            [
+                model if isinstance(model, str) else model.__qualname__,
+                [_params_key(params) for params in configs],
+                metric,
+                eta,
+                resources,
+                seed,
+            ]
+        ).encode()
+    )
+    return digest.hexdigest()
+
+
+def _rung_resources(n_configs, n_train, eta, min_resource):
+    """Return the number of training records of every rung"""
+    n_rungs = 1 + int(math.floor(math.log(max(n_configs, 1), eta) + 1e-9))
+    if min_resource is not None:
+        # no more rungs than needed to grow min_resource to all records
+        n_rungs = min(
+            n_rungs,
+            1 + max(int(math.ceil(math.log(n_train / min_resource, eta))), 0),
+        )
+    resources = [
+        int(n_train * eta ** (rung - n_rungs + 1)) for rung in range(n_rungs)
+    ]
+    floor = max(min_resource or 1, 1)
+    return [min(max(resource, floor), n_train) for resource in resources]
+
+
+def _failed_trial(args, error):
+    """Return trial whose worker process died"""
+    return {
+        "params": args[2],
+        "resource": args[5],
+        "status": "failed",
+        "score": None,
+        "seconds": 0.0,
+        "fold_seconds": [],
+        "error": "{}: {}".format(type(error).__name__, error),
+    }
+
+
+def successive_halving(
+    features,
+    target,
+    model,
+    param_grid,
+    metric="rmse",
+    eta=3,
+    min_resource=None,
+    folds=3,
+    groups=None,
+    workers=None,
+    checkpoint=None,
+    seed=0,
+    dropna=True,
+    tmpdir=None,
+):
+    """Search hyperparameters by successive halving with parallel trials
+
+    All configurations of ``param_grid`` are first cross-validated with a
+    small random subset of each training fold. Only the best
+    ``1 / eta`` of them are promoted to the next rung, which uses ``eta``
+    times more training records, until the last rung trains on all
+    training records of each fold. Most compute is thereby spent on
+    promising configurations.
+
+    Trials of a rung run in parallel worker processes that memory-map the
+    shared feature, target and fold arrays as in
+    :func:`~caproj.models.validation.cross_validate`. Failed trials are
+    logged and never promoted.
+
+    If ``checkpoint`` is given, every completed trial is appended to that
+    JSON lines file as soon as it finishes. Running the same search again
+    with the same checkpoint skips the trials recorded there, so an
+    interrupted search resumes where it stopped. A checkpoint written for
+    different data or settings raises ValueError.
+
+    :param features: numeric feature table
+    :type features: pandas.DataFrame or numpy.ndarray
+    :param target: name of the target column of ``features``, or array of
+                   targets
+    :type target: str or array-like
+    :param model: model class or import path, see
+                  :func:`~caproj.models.validation.resolve_model`
+    :type model: type or str
+    :param param_grid: grid of model parameters, see :func:`expand_grid`
+    :type param_grid: dict or list of dict
+    :param metric: name of the :data:`~caproj.models.validation.METRICS`
+                   used to rank trials, defaults to "rmse"
+    :type metric: str, optional
+    :param eta: factor by which configurations are cut and training records
+                grow per rung, defaults to 3
+    :type eta: int, optional
+    :param min_resource: minimum number of training records of the first
+                         rung, defaults to None
+    :type min_resource: int, optional
+    :param folds: number of cross-validation folds, defaults to 3
+    :type folds: int, optional
+    :param groups: group label of every record, e.g. the "PID" column,
+                   defaults to None
+    :type groups: array-like, optional
+    :param workers: number of worker processes, if 1 trials are run in the
+                    calling process, if None ``os.cpu_count()`` is used,
+                    defaults to None
+    :type workers: int, optional
+    :param checkpoint: JSON lines file of completed trials, defaults to None
+    :type checkpoint: str, optional
+    :param seed: random seed of folds and training subsets, defaults to 0
+    :type seed: int, optional
+    :param dropna: whether records with a missing feature or target value
+                   are dropped, defaults to True
+    :type dropna: bool, optional
+    :param tmpdir: directory in which the shared arrays are saved, defaults
+                   to the system temporary directory
+    :type tmpdir: str, optional
+    :return: summary dictionary with ``best_params``, ``best_score``,
+             ``metric``, per-rung ``rungs`` summaries, all ``trials``, the
+             number of ``resumed`` trials and wall ``seconds``
+    :rtype: dict
+    :raise ValueError: if the metric or ``eta`` is invalid, the records
+                       cannot be split into folds, see
+                       :func:`~caproj.models.validation.assign_folds`, or the
+                       checkpoint belongs to a different search
+    """
+    if metric not in METRICS:
+        raise ValueError(
+            "unknown metric '{}', valid metrics are {}".format(metric, list(METRICS))
+        )
+    if eta < 2:
+        raise ValueError("eta must be at least 2, got {}".format(eta))
+    workers = workers or os.cpu_count() or 1
+    t1 = time.perf_counter()
+    configs = expand_grid(param_grid)
+    sign = -1 if metric in GREATER_IS_BETTER else 1
+
+    X, y, keep = _prepare(features, target, dropna)
+    if groups is not None:
+        groups = pd.Series(groups).to_numpy()[keep]
+    fold_ids = assign_folds(len(X), folds, groups=groups, seed=seed)
+    n_train = len(X) - int(np.bincount(fold_ids, minlength=folds).max())
+    resources = _rung_resources(len(configs), n_train, eta, min_resource)
+    store = _Checkpoint(
+        checkpoint,
+        _search_key(X, y, fold_ids, model, configs, metric, eta, resources, seed),
+    )
+
+    # one pool serves all rungs, so workers are started only once
+    executor = worker_pool(workers) if workers > 1 else None
+    shared = _SharedData(X, y, fold_ids, dir=tmpdir)
+
+    trials, rungs, resumed = list(), list(), 0
+    candidates = configs
+    configs_by_key = {_params_key(params): params for params in configs}
+    try:
+        for rung, resource in enumerate(resources):
+            t2 = time.perf_counter()
+            done = [
+                store.trials[store.key(rung, params)]
+                for params in candidates
+                if store.key(rung, params) in store.trials
+            ]
+            resumed += len(done)
+            todo = [
+                params
+                for params in candidates
+                if store.key(rung, params) not in store.trials
+            ]
+            for trial in run_in_pool(
+                _run_trial,
+                [
+                    (
+                        shared.dirname,
+                        model,
+                        params,
+                        folds,
+                        metric,
+                        resource,
+                        seed,
+                        # folds with fewer test records have more than
+                        # n_train training records; the last rung uses all
+                        rung < len(resources) - 1,
+                    )
+                    for params in todo
+                ],
+                workers,
+                on_error=_failed_trial,
+                executor=executor,
+            ):
+                trial["rung"] = rung
+                if trial["status"] != "ok":
+                    log.error(
+                        "trial {} failed: {}".format(trial["params"], trial["error"])
+                    )
+                store.add(trial)
+                done.append(trial)
+            trials.extend(done)
+
+            ranked = _rank_trials(done, sign)
+            n_keep = max(int(math.ceil(len(candidates) / eta)), 1)
+            # map back to the grid's parameters, which JSON may not preserve
+            candidates = [
+                configs_by_key[_params_key(trial["params"])]
+                for trial in ranked[:n_keep]
+            ]
+            seconds = time.perf_counter() - t2
+            rungs.append(
+                {
+                    "rung": rung,
+                    "resource": resource,
+                    "trials": len(done),
+                    "failed": len(done) - len(ranked),
+                    "seconds": seconds,
+                }
+            )
+            log.info(
+                "rung {} scored {} trials on {} records in {:.3f} sec".format(
+                    rung, len(done), resource, seconds
+                ),
+                extra={"rows": resource, "duration": seconds},
+            )
+            if not candidates:
+                break
+    finally:
+        shared.cleanup()
+        if executor is not None:
+            executor.shutdown()
+
+    final = [trial for trial in trials if trial["rung"] == rungs[-1]["rung"]]
+    best = _rank_trials(final, sign)
+    seconds = time.perf_counter() - t1
+    summary = {
+        "best_params": best[0]["params"] if best else None,
+        "best_score": best[0]["score"] if best else None,
+        "metric": metric,
+        "rungs": rungs,
+        "trials": trials,
+        "resumed": resumed,
+        "seconds": seconds,
+    }
+    log.info(
+        "successive halving searched {} configurations ({} trials, {} resumed) "
+        "in {:.3f} sec".format(len(configs), len(trials), resumed, seconds),
+        extra={"duration": seconds},
+    )
+    return summary
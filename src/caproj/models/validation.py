@@ -0,0 +1,391 @@
+"""
+caproj.models.validation
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the cross-validation harness that fits and scores a
+model on every fold of a feature table in parallel worker processes
+
+**Module functions:**
+
+.. autosummary::
+
+   assign_folds
+   cross_validate
+   resolve_model
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+   METRICS
+
+|
+"""
+import importlib
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from caproj.pool import run_in_pool
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+
+def _rmse(y_true, y_pred):
+    """Root mean squared error"""
+    return float(np.sqrt(np.mean((y_true - y_pred) ** 2)))
+
+
+def _mae(y_true, y_pred):
+    """Mean absolute error"""
+    return float(np.mean(np.abs(y_true - y_pred)))
+
+
+def _r2(y_true, y_pred):
+    """Coefficient of determination"""
+    total = np.sum((y_true - np.mean(y_true)) ** 2)
+    if total == 0:
+        return float("nan")
+    return float(1 - np.sum((y_true - y_pred) ** 2) / total)
+
+
+METRICS = {"rmse": _rmse, "mae": _mae, "r2": _r2}
+"""Metric names mapped to functions of ``(y_true, y_pred)``"""
+
+
+def resolve_model(model):
+    """Return a model class from a class or its import path
+
+    :param model: model class, or import path such as
+                  "caproj.models.estimators.RidgeRegression"
+    :type model: type or str
+    :return: model class
+    :raise ImportError: if the import path cannot be imported
+    """
+    if not isinstance(model, str):
+        return model
+    module_name, _, class_name = model.rpartition(".")
+    try:
+        return getattr(importlib.import_module(module_name), class_name)
+    except (ValueError, AttributeError) as error:
+        raise ImportError("cannot import model '{}': {}".format(model, error))
+
+
+def assign_folds(n_records, folds=5, groups=None, shuffle=True, seed=0):
+    """Return the cross-validation fold of every record
+
+    Without ``groups`` records are split into ``folds`` folds of equal size.
+    With ``groups``, e.g. project IDs, all records of a group are assigned
+    to the same fold: groups are (optionally shuffled and) laid out one
+    after another and cut into ``folds`` runs of about equal record counts.
+
+    :param n_records: number of records
+    :type n_records: int
+    :param folds: number of folds, defaults to 5
+    :type folds: int, optional
+    :param groups: group label of every record, defaults to None
+    :type groups: array-like, optional
+    :param shuffle: whether records or groups are shuffled before they are
+                    assigned, defaults to True
+    :type shuffle: bool, optional
+    :param seed: random seed used when shuffling, defaults to 0
+    :type seed: int, optional
+    :return: int array with the fold number of every record
+    :rtype: numpy.ndarray
+    :raise ValueError: if there are fewer records or groups than folds, or
+                       a fold gets no records because a few groups hold
+                       most of the records
+    """
+    rng = np.random.default_rng(seed)
+    if groups is None:
+        if n_records < folds:
+            raise ValueError(
+                "cannot split {} records into {} folds".format(n_records, folds)
+            )
+        fold_ids = np.arange(n_records) * folds // n_records
+        return rng.permutation(fold_ids) if shuffle else fold_ids
+
+    codes, uniques = pd.factorize(pd.Series(groups).to_numpy())
+    if len(uniques) < folds:
+        raise ValueError(
+            "cannot split {} groups into {} folds".format(len(uniques), folds)
+        )
+    sizes = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    order = rng.permutation(len(uniques)) if shuffle else np.arange(len(uniques))
+    # cut the cumulative record count of the ordered groups into equal runs
+    ends = np.cumsum(sizes[order])
+    group_folds = np.empty(len(uniques), dtype=np.int64)
+    group_folds[order] = np.minimum(
+        (ends - sizes[order]) * folds // max(ends[-1], 1), folds - 1
+    )
+    # records without a group are all assigned to the first fold
+    fold_ids = np.where(codes >= 0, group_folds[codes], 0)
+    counts = np.bincount(fold_ids, minlength=folds)
+    if not counts.all():
+        raise ValueError(
+            "fold {} has no records: the largest group holds {} of {} records, "
+            "use fewer folds".format(
+                int(np.flatnonzero(counts == 0)[0]), sizes.max(), n_records
+            )
+        )
+    return fold_ids
+
+
+class _SharedData(object):
+    """Feature, target and fold arrays saved for memory-mapped loading"""
+
+    def __init__(self, X, y, fold_ids, dir=None):
+        self.tmpdir = tempfile.TemporaryDirectory(prefix="caproj-cv-", dir=dir)
+        self.dirname = self.tmpdir.name
+        for name, array in [("X", X), ("y", y), ("folds", fold_ids)]:
+            np.save(os.path.join(self.dirname, "{}.npy".format(name)), array)
+
+    def cleanup(self):
+        """Remove the saved arrays"""
+        self.tmpdir.cleanup()
+
+
+def _load_shared(dirname):
+    """Load shared arrays read-only and memory-mapped"""
+    return [
+        np.load(os.path.join(dirname, "{}.npy".format(name)), mmap_mode="r")
+        for name in ["X", "y", "folds"]
+    ]
+
+
+def _run_fold(dirname, fold, model, params, metrics, max_train=None, seed=0):
+    """Fit and score a model on one fold, capturing any exception
+
+    :param dirname: directory of the shared arrays
+    :type dirname: str
+    :param fold: number of the fold used as test set
+    :type fold: int
+    :param model: model class or import path
+    :param params: keyword arguments of the model class
+    :type params: dict
+    :param metrics: names of :data:`METRICS` to compute
+    :type metrics: list of str
+    :param max_train: maximum number of training records, if smaller than
+                      the training fold a random subset is used, defaults
+                      to None
+    :type max_train: int, optional
+    :param seed: random seed of the training subset, defaults to 0
+    :type seed: int, optional
+    :return: result dictionary with ``fold``, ``status``, ``n_train``,
+             ``n_test``, ``fit_seconds``, ``predict_seconds``, ``seconds``,
+             ``metrics`` and ``error`` keys
+    :rtype: dict
+    """
+    t1 = time.perf_counter()
+    result = {
+        "fold": fold,
+        "status": "ok",
+        "n_train": 0,
+        "n_test": 0,
+        "fit_seconds": 0.0,
+        "predict_seconds": 0.0,
+        "metrics": dict(),
+        "error": None,
+    }
+    try:
+        X, y, fold_ids = _load_shared(dirname)
+        test = fold_ids == fold
+        train = np.flatnonzero(~test)
+        if max_train is not None and max_train < len(train):
+            rng = np.random.default_rng(seed)
+            train = np.sort(train[rng.choice(len(train), max_train, replace=False)])
+        result["n_train"], result["n_test"] = len(train), int(test.sum())
+        estimator = resolve_model(model)(**params)
+        t2 = time.perf_counter()
+        estimator.fit(X[train], y[train])
+        t3 = time.perf_counter()
+        y_pred = np.asarray(estimator.predict(X[test]))
+        result["fit_seconds"] = t3 - t2
+        result["predict_seconds"] = time.perf_counter() - t3
+        result["metrics"] = {
+            name: METRICS[name](y[test], y_pred) for name in metrics
+        }
+    except Exception as error:
+        log.exception("cross-validation fold {} failed".format(fold))
+        result["status"] = "failed"
+        result["error"] = "{}: {}".format(type(error).__name__, error)
+    result["seconds"] = time.perf_counter() - t1
+    log.info(
+        "fold {} {} in {:.3f} sec".format(fold, result["status"], result["seconds"]),
+        extra={"duration": result["seconds"], "rows": result["n_train"]},
+    )
+    return result
+
+
+def _prepare(features, target, dropna):
+    """Return float feature and target arrays and the kept record mask"""
+    if isinstance(target, str):
+        y = features[target]
+        features = features.drop(columns=[target])
+    else:
+        y = target
+    X = np.asarray(features, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if X.ndim == 1:
+        X = X.reshape(-1, 1)
+    keep = np.ones(len(X), dtype=bool)
+    if dropna:
+        keep = ~np.isnan(X).any(axis=1) & ~np.isnan(y)
+    return X[keep], y[keep], keep
+
+
+def cross_validate(
+    features,
+    target,
+    model,
+    params=None,
+    folds=5,
+    groups=None,
+    metrics=("rmse", "mae", "r2"),
+    workers=None,
+    shuffle=True,
+    seed=0,
+    dropna=True,
+    tmpdir=None,
+):
+    """Fit and score a model on every cross-validation fold in parallel
+
+    The feature, target and fold arrays are saved once to a temporary
+    directory and memory-mapped by each worker, so tasks only pass the
+    directory name and fold number instead of pickling the data per fold.
+    Failures are isolated per fold and recorded in its result. If
+    queue-based logging was started with a multiprocessing queue (see
+    :func:`caproj.logger.start_logging`), worker processes forward their log
+    records to it.
+
+    Models are created with ``model(**params)`` and must provide ``fit(X,
+    y)`` and ``predict(X)`` methods, as do the models of
+    :mod:`caproj.models.estimators` and ``scikit-learn`` estimators.
+    Passing the model as an import path keeps task payloads small.
+
+    :param features: numeric feature table, e.g. from
+                     :class:`~caproj.features.engine.FeatureEngine`
+    :type features: pandas.DataFrame or numpy.ndarray
+    :param target: name of the target column of ``features``, which is
+                   excluded from the model inputs, or array of targets
+    :type target: str or array-like
+    :param model: model class or import path, see :func:`resolve_model`
+    :type model: type or str
+    :param params: keyword arguments of the model class, defaults to None
+    :type params: dict, optional
+    :param folds: number of folds, defaults to 5
+    :type folds: int, optional
+    :param groups: group label of every record, e.g. the "PID" column, to
+                   keep all records of a project in one fold, defaults to
+                   None
+    :type groups: array-like, optional
+    :param metrics: names of :data:`METRICS` to compute, defaults to
+                    ("rmse", "mae", "r2")
+    :type metrics: list of str, optional
+    :param workers: number of worker processes, if 1 folds are run in the
+                    calling process, if None ``os.cpu_count()`` is used,
+                    defaults to None
+    :type workers: int, optional
+    :param shuffle: whether records or groups are shuffled before they are
+                    assigned to folds, defaults to True
+    :type shuffle: bool, optional
+    :param seed: random seed used when shuffling, defaults to 0
+    :type seed: int, optional
+    :param dropna: whether records with a missing feature or target value
+                   are dropped, defaults to True
+    :type dropna: bool, optional
+    :param tmpdir: directory in which the shared arrays are saved, defaults
+                   to the system temporary directory
+    :type tmpdir: str, optional
+    :return: summary dictionary with the ``model`` name, ``params``, counts
+             of ``folds``, ``succeeded`` and ``failed`` folds, ``records``
+             used, wall ``seconds``, mean and standard deviation of each
+             metric over succeeded folds in ``metrics`` and ``metrics_std``,
+             and per-fold ``results``
+    :rtype: dict
+    :raise ValueError: if a metric is unknown or the records cannot be split
+                       into folds, see :func:`assign_folds`
+    """
+    unknown = [name for name in metrics if name not in METRICS]
+    if unknown:
+        raise ValueError(
+            "unknown metrics {}, valid metrics are {}".format(
+                unknown, list(METRICS)
+            )
+        )
+    params = params or dict()
+    workers = workers or os.cpu_count() or 1
+    t1 = time.perf_counter()
+
+    X, y, keep = _prepare(features, target, dropna)
+    if groups is not None:
+        groups = pd.Series(groups).to_numpy()[keep]
+    fold_ids = assign_folds(len(X), folds, groups=groups, shuffle=shuffle, seed=seed)
+    shared = _SharedData(X, y, fold_ids, dir=tmpdir)
+    try:
+        results = sorted(
+            run_in_pool(
+                _run_fold,
+                [
+                    (shared.dirname, fold, model, params, metrics)
+                    for fold in range(folds)
+                ],
+                workers,
+                on_error=_failed_fold,
+            ),
+            key=lambda result: result["fold"],
+        )
+    finally:
+        shared.cleanup()
+
+    seconds = time.perf_counter() - t1
+    ok = [result for result in results if result["status"] == "ok"]
+    scores = {
+        name: [result["metrics"][name] for result in ok] for name in metrics
+    }
+    summary = {
+        "model": model if isinstance(model, str) else model.__name__,
+        "params": params,
+        "folds": len(results),
+        "succeeded": len(ok),
+        "failed": len(results) - len(ok),
+        "records": len(X),
+        "seconds": seconds,
+        "metrics": {
+            name: float(np.mean(values)) if values else float("nan")
+            for name, values in scores.items()
+        },
+        "metrics_std": {
+            name: float(np.std(values)) if values else float("nan")
+            for name, values in scores.items()
+        },
+        "results": results,
+    }
+    log.info(
+        "cross-validated {} on {} folds ({} failed) in {:.3f} sec".format(
+            summary["model"], summary["folds"], summary["failed"], seconds
+        ),
+        extra={"rows": len(X), "duration": seconds, "errors": summary["failed"]},
+    )
+    return summary
+
+
+def _failed_fold(args, error):
+    """Return result of a fold whose worker process died"""
+    return {
+        "fold": args[1],
+        "status": "failed",
+        "n_train": 0,
+        "n_test": 0,
+        "fit_seconds": 0.0,
+        "predict_seconds": 0.0,
+        "seconds": 0.0,
+        "metrics": dict(),
+        "error": "{}: {}".format(type(error).__name__, error),
+    }
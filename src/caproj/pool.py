@@ -0,0 +1,162 @@
+"""
+caproj.pool
+~~~~~~~~~~~
+
+This module contains the process pool helpers shared by the parallel
+``caproj`` operations, such as batch pipelines, plot rendering, text
+hashing and model validation
+
+**Module functions:**
+
+.. autosummary::
+
+   worker_pool
+   run_in_pool
+
+|
+"""
+import collections
+import concurrent.futures
+import sys
+
+from caproj.logger import worker_initializer
+
+# ProcessPoolExecutor accepts an initializer from Python 3.7 on
+_POOL_INITIALIZER = sys.version_info >= (3, 7)
+
+_worker_ready = False
+
+
+def worker_pool(workers):
+    """Return a process pool whose workers forward logging to the parent
+
+    Before Python 3.7 the pool has no initializer, and tasks submitted by
+    :func:`run_in_pool` set up worker logging themselves instead.
+
+    :param workers: number of worker processes
+    :type workers: int
+    :return: ``concurrent.futures.ProcessPoolExecutor`` object
+    """
+    if not _POOL_INITIALIZER:
+        return concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    initializer, initargs = worker_initializer()
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=initializer, initargs=initargs
+    )
+
+
+def _call(func, *args):
+    """Call a function in a worker, setting up its logging on first use
+
+    A multiprocessing queue cannot be pickled with a task, so the queue
+    the worker inherited from its parent when it was forked is used.
+    """
+    global _worker_ready
+    if not _worker_ready:
+        initializer, initargs = worker_initializer()
+        if initializer is not None:
+            initializer(*initargs)
+        _worker_ready = True
+    return func(*args)
+
+
+def _submit(executor, func, args):
+    """Submit a task, wrapped in :func:`_call` if pools lack initializers"""
+    if _POOL_INITIALIZER:
+        return executor.submit(func, *args)
+    return executor.submit(_call, func, *args)
+
+
+def _result(args, future, on_error):
+    """Return result of a future, or ``on_error`` result if it raised"""
+    try:
+        return future.result()
+    except Exception as error:
+        if on_error is None:
+            raise
+        return on_error(args, error)
+
+
+def _completed(executor, func, items, on_error):
+    """Yield results of all items as they complete"""
+    futures = {_submit(executor, func, args): args for args in items}
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            yield _result(futures[future], future, on_error)
+    finally:
+        # on interruption, drop items that have not started yet
+        for future in futures:
+            future.cancel()
+
+
+def _ordered(executor, func, items, on_error, window):
+    """Yield results in item order with at most ``window`` items in flight"""
+    pending = collections.deque()
+    try:
+        for args in items:
+            pending.append((args, _submit(executor, func, args)))
+            if window is not None and len(pending) >= window:
+                yield _result(*pending.popleft(), on_error)
+        while pending:
+            yield _result(*pending.popleft(), on_error)
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def run_in_pool(
+    func,
+    items,
+    workers,
+    on_error=None,
+    ordered=False,
+    window=None,
+    executor=None,
+):
+    """Yield results of calling a function on items in worker processes
+
+    With ``workers=1`` and no ``executor`` the items are processed one by
+    one in the calling process. Otherwise they are submitted to
+    :func:`worker_pool`, which is shut down once all results are yielded
+    or the generator is closed.
+
+    ``func`` should catch its own errors and return them as a result. An
+    exception raised by a future means the worker process itself died,
+    e.g. out of memory; it is passed to ``on_error``, whose return value is
+    yielded in place of the result.
+
+    :param func: picklable function called as ``func(*args)``
+    :param items: iterable of argument tuples, consumed lazily if
+                  ``ordered`` is True
+    :param workers: number of worker processes
+    :type workers: int
+    :param on_error: function called as ``on_error(args, error)`` when a
+                     worker died, if None the error is raised, defaults to
+                     None
+    :type on_error: callable, optional
+    :param ordered: whether results are yielded in item order rather than as
+                    they complete, defaults to False
+    :type ordered: bool, optional
+    :param window: with ``ordered``, the maximum number of items submitted
+                   ahead of the next result to bound memory, if None all
+                   items are submitted at once, defaults to None
+    :type window: int, optional
+    :param executor: existing pool to submit to, e.g. to reuse workers
+                     across calls, it is not shut down, defaults to None
+    :type executor: concurrent.futures.Executor, optional
+    :return: generator of results
+    """
+    if executor is None and workers == 1:
+        for args in items:
+            yield func(*args)
+        return
+    if executor is None:
+        with worker_pool(workers) as executor:
+            yield from run_in_pool(
+                func, items, workers, on_error, ordered, window, executor
+            )
+        return
+    if ordered:
+        yield from _ordered(executor, func, items, on_error, window)
+    else:
+        yield from _completed(executor, func, items, on_error)
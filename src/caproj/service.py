@@ -0,0 +1,301 @@
+"""
+caproj.service
+~~~~~~~~~~~~~~
+
+This module contains a long-running query service that keeps the cleaned
+dataset resident in memory and answers queries over local HTTP
+
+**Module classes:**
+
+.. autosummary::
+
+   DataService
+   DataRequestHandler
+
+**Module functions:**
+
+.. autosummary::
+
+   make_server
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+
+|
+"""
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+
+class DataService(object):
+    """Load and clean a dataset once and answer queries from memory
+
+    The dataset is produced by running a
+    :class:`~caproj.data.pipeline.Pipeline`. Record lookups by ID use a
+    precomputed index of row positions and ``value_counts`` results are
+    cached, so repeated queries do not rescan the data. The pipeline's input
+    and schema files are polled for changes, and when one changes the
+    pipeline is rerun and the new data swapped in atomically; queries keep
+    being answered from the previous data while the reload runs.
+
+    :param pipeline: :class:`~caproj.data.pipeline.Pipeline` producing the
+                     data to serve
+    :param id_col: name of the project ID column, defaults to "PID"
+    :type id_col: str, optional
+    :param reload_interval: seconds between checks for changed source files,
+                            defaults to 2.0
+    :type reload_interval: float, optional
+
+    **Class methods:**
+
+    .. autosummary::
+
+       DataService.load
+       DataService.check_reload
+       DataService.start_watching
+       DataService.stop_watching
+       DataService.records
+       DataService.value_counts
+       DataService.summary
+    """
+
+    def __init__(self, pipeline, id_col="PID", reload_interval=2.0):
+        self.pipeline = pipeline
+        self.id_col = id_col
+        self.reload_interval = reload_interval
+        self.data = None
+        self.loaded_at = None
+        self._index = dict()
+        self._value_counts = dict()
+        self._mtimes = dict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.load()
+
+    def _source_mtimes(self):
+        """Return modification times of the pipeline's source files"""
+        return {
+            filename: os.path.getmtime(filename)
+            for filename in self.pipeline.source_files()
+            if os.path.exists(filename)
+        }
+
+    def load(self):
+        """Run the pipeline and swap the resulting data in for queries"""
+        t1 = time.perf_counter()
+        mtimes = self._source_mtimes()
+        self.pipeline.clear_schemas()
+        data = self.pipeline.run()
+        index = dict()
+        if self.id_col in data.df.columns:
+            index = data.df.groupby(self.id_col, sort=False).indices
+        with self._lock:
+            self.data = data
+            self._index = index
+            self._value_counts = dict()
+            self._mtimes = mtimes
+            self.loaded_at = time.time()
+        t2 = time.perf_counter() - t1
+        log.info(
+            "service data loaded in {:.3f} sec".format(t2),
+            extra={"rows": len(data.df), "duration": t2},
+        )
+
+    def check_reload(self):
+        """Reload data if any source file changed since the last load
+
+        :return: True if data was reloaded
+        :rtype: bool
+        """
+        if self._source_mtimes() == self._mtimes:
+            return False
+        log.info("service source files changed, reloading data")
+        try:
+            self.load()
+        except Exception:
+            log.exception("service reload failed, keeping previous data")
+            return False
+        return True
+
+    def _watch(self):
+        """Poll source files until :meth:`DataService.stop_watching` is called
+        """
+        while not self._stop.wait(self.reload_interval):
+            self.check_reload()
+
+    def start_watching(self):
+        """Start background thread that hot-reloads changed source files"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, daemon=True)
+            self._thread.start()
+
+    def stop_watching(self):
+        """Stop background reload thread"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    @staticmethod
+    def _coerce_value(series, value):
+        """Convert a query string to the dtype of the queried column"""
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            return float(value)
+        return value
+
+    def records(self, value, column=None):
+        """Return all records with a given value in a column
+
+        Lookups on the ID column use the precomputed row index; other columns
+        are filtered with a vectorized comparison.
+
+        :param value: value to look up, converted to the column's dtype
+        :type value: str
+        :param column: column name, defaults to the service's ``id_col``
+        :type column: str, optional
+        :return: matching records
+        :rtype: pandas.DataFrame
+        :raise KeyError: if ``column`` does not exist
+        """
+        column = column or self.id_col
+        with self._lock:
+            df, index = self.data.df, self._index
+        value = self._coerce_value(df[column], value)
+        if column == self.id_col and index:
+            return df.iloc[index.get(value, [])]
+        return df[df[column] == value]
+
+    def value_counts(self, column, top=None):
+        """Return cached value counts of a column
+
+        :param column: column name
+        :type column: str
+        :param top: number of most frequent values to return, if None all are
+                    returned, defaults to None
+        :type top: int, optional
+        :return: value counts
+        :rtype: pandas.Series
+        :raise KeyError: if ``column`` does not exist
+        """
+        with self._lock:
+            df, cache = self.data.df, self._value_counts
+        if column not in cache:
+            cache[column] = df[column].value_counts(dropna=False)
+        counts = cache[column]
+        return counts if top is None else counts.head(top)
+
+    def summary(self):
+        """Return summary information about the loaded data
+
+        :return: dictionary of record counts, columns and load time
+        :rtype: dict
+        """
+        with self._lock:
+            data, index, loaded_at = self.data, self._index, self.loaded_at
+        return {
+            "n_records": data.stats.n_records,
+            "n_unique": len(index),
+            "columns": [str(col) for col in data.df.columns],
+            "loaded_at": loaded_at,
+        }
+
+
+class DataRequestHandler(BaseHTTPRequestHandler):
+    """Answer json queries against the server's :class:`DataService`
+
+    Supported ``GET`` endpoints:
+
+    * ``/records?value=X[&column=C]`` -- records with value X in column C
+      (defaults to the ID column)
+    * ``/value_counts?column=C[&top=N]`` -- value counts of column C
+    * ``/summary`` -- record counts, columns and load time
+    * ``/health`` -- liveness check
+    """
+
+    def _send_json(self, status, body):
+        """Write a json response body"""
+        if not isinstance(body, str):
+            body = json.dumps(body, default=str)
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        """Route ``GET`` requests to :class:`DataService` queries"""
+        service = self.server.service
+        url = urlparse(self.path)
+        params = {key: val[0] for key, val in parse_qs(url.query).items()}
+        try:
+            if url.path == "/records":
+                records = service.records(
+                    params["value"], column=params.get("column")
+                )
+                self._send_json(
+                    200, records.to_json(orient="records", date_format="iso")
+                )
+            elif url.path == "/value_counts":
+                top = int(params["top"]) if "top" in params else None
+                counts = service.value_counts(params["column"], top=top)
+                self._send_json(
+                    200,
+                    [[str(key), int(val)] for key, val in counts.items()],
+                )
+            elif url.path == "/summary":
+                self._send_json(200, service.summary())
+            elif url.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": "unknown path " + url.path})
+        except KeyError as error:
+            self._send_json(400, {"error": "missing or invalid {}".format(error)})
+        except ValueError as error:
+            self._send_json(400, {"error": str(error)})
+
+    def log_message(self, format, *args):
+        """Log requests through the module logger instead of stderr"""
+        log.debug(format % args)
+
+
+class _Server(socketserver.ThreadingMixIn, HTTPServer):
+    """HTTP server handling each request in a daemon thread
+
+    Equivalent to ``http.server.ThreadingHTTPServer``, which requires
+    Python 3.7.
+    """
+
+    daemon_threads = True
+
+
+def make_server(service, host="127.0.0.1", port=8000):
+    """Create a threaded HTTP server answering queries for a service
+
+    :param service: :class:`DataService` to query
+    :param host: host address to bind, defaults to "127.0.0.1"
+    :type host: str, optional
+    :param port: port to bind, 0 selects a free port, defaults to 8000
+    :type port: int, optional
+    :return: server object, run with ``serve_forever()``
+    :rtype: http.server.HTTPServer
+    """
+    server = _Server((host, port), DataRequestHandler)
+    server.service = service
+    return server
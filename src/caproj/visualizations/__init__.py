@@ -9,77 +9,620 @@ FUNCTIONS
     save_plot()
         Save a matplotlib plot to file
 
+    plot_cache_key()
+        Hash plot input data and parameters for the plot cache
+
+    is_plot_cached()
+        Check whether a saved plot is up to date with a cache key
+
+    make_barplot()
+        Create a horizontal barplot figure without pyplot global state
+
     plot_barplot()
         Generate a horizontal barplot from a pandas value_counts series
+
+    bin_2d()
+        Count paired values in a regular 2D grid of bins
+
+    make_hist2d()
+        Create a 2D histogram figure of paired values
+
+    make_hexbin()
+        Create a hexagonal bin figure of paired values
+
+SUBMODULES
+
+    caproj.visualizations.batch
+        Render many plots to file in parallel worker processes
+
+    caproj.visualizations.report
+        Render many plots in parallel into one PDF or HTML report
 """
+import hashlib
+import json
+import os
+import sys
+
+_AUTO_TOP = 50
+"""Number of most frequent values plotted when barplot height is automatic"""
+
+_MAX_AUTO_HEIGHT = 30
+"""Largest automatic barplot height in inches"""
+
+_MAX_LABELED_BARS = 100
+"""Number of bars above which barplot bars are drawn without labels"""
+
+
+def __getattr__(name):
+    """Import ``matplotlib.pyplot`` on first access of ``plt`` attribute
+
+    ``matplotlib`` is slow to import, so it is only loaded once a plotting
+    function runs or ``caproj.visualizations.plt`` is accessed.
+    """
+    if name == "plt":
+        import matplotlib.pyplot as plt
+
+        return plt
+    raise AttributeError(
+        "module '{}' has no attribute '{}'".format(__name__, name)
+    )
 
-import matplotlib.pyplot as plt
 
+if sys.version_info < (3, 7):
+    # module __getattr__ (PEP 562) is ignored before python 3.7, so pyplot
+    # is imported eagerly
+    plt = __getattr__("plt")
 
-def save_plot(plt_object, savepath=None):
+
+def _cache_keypath(savepath):
+    """Return path of the file storing the cache key of a saved plot"""
+    return savepath + '.hash'
+
+
+def plot_cache_key(data, **params):
+    """Hash plot input data and parameters for the plot cache
+
+    The hash covers the values, index, dtypes and names of ``data`` and the
+    json representation of ``params``, so it changes whenever either the
+    data or the way it is plotted changes.
+
+    :param data: pd.Series or pd.DataFrame object that is plotted
+    :param params: plot parameters, e.g. the keyword arguments of the
+                   plotting function
+    :return: string hex digest
+    """
+    import pandas as pd
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(
+        pd.util.hash_pandas_object(data, index=True).values.tobytes()
+    )
+    names = list(data.columns) if hasattr(data, 'columns') else [data.name]
+    digest.update(
+        json.dumps(
+            [str(data.dtypes), names, params], sort_keys=True, default=str
+        ).encode()
+    )
+    return digest.hexdigest()
+
+
+def is_plot_cached(savepath, cache_key):
+    """Check whether a saved plot is up to date with a cache key
+
+    :param savepath: string, filepath of the saved plot
+    :param cache_key: string, key returned by :func:`plot_cache_key` for the
+                      plot that would be rendered
+    :return: True if the plot file exists and was saved with ``cache_key``
+    """
+    keypath = _cache_keypath(savepath)
+    if not (os.path.exists(savepath) and os.path.exists(keypath)):
+        return False
+    with open(keypath, 'rt') as f:
+        return f.read().strip() == cache_key
+
+
+def save_plot(plt_object, savepath=None, cache_key=None):
     """Save a matplotlib plot to file
 
-    :param plt_object: matplotlib.pyplot plot object
+    :param plt_object: matplotlib.pyplot module or matplotlib.figure.Figure
+                       object
     :param savepath: string or None, specifies filepath at which to save the
                      matplotlib plot. If None, nothing is saved. (Default is
                      None)
+    :param cache_key: string or None, key from :func:`plot_cache_key`
+                      recorded next to the saved plot so later runs can skip
+                      rendering with :func:`is_plot_cached`. If None, any
+                      recorded key is removed. (Default is None)
     :return: No objects are returned
     """
     if savepath:
+        keypath = _cache_keypath(savepath)
+        if os.path.exists(keypath):
+            os.remove(keypath)
         plt_object.savefig(savepath)
+        if cache_key:
+            # the key is written after the plot, so an interrupted save is
+            # never mistaken for an up-to-date plot
+            with open(keypath, 'wt') as f:
+                f.write(cache_key)
     else:
         pass
 
 
+def _top_n(value_counts, top=None, other_label='other'):
+    """Keep the most frequent values and sum the rest into one bucket
+
+    :param value_counts: pd.Series object generated by pandas value_counts()
+                         method
+    :param top: integer or None, the number of most frequent values to keep.
+                If None, all values are kept. (Default is None)
+    :param other_label: string, the index label of the bucket summing all
+                        other values (default is 'other')
+    :return: pd.Series object with at most ``top + 1`` values
+    """
+    if top is None or len(value_counts) <= top:
+        return value_counts
+
+    import pandas as pd
+
+    kept = value_counts.nlargest(top)
+    other = value_counts.sum() - kept.sum()
+    return pd.concat([kept, pd.Series([other], index=[other_label])])
+
+
+def _auto_height(n_bars, min_height=3, bar_height=0.3, padding=1.5,
+                 max_height=_MAX_AUTO_HEIGHT):
+    """Return a figure height in inches that fits a number of bars
+
+    :param n_bars: integer, the number of bars to plot
+    :param min_height: float, the minimum figure height (default is 3)
+    :param bar_height: float, the height per bar (default is 0.3)
+    :param padding: float, the height added for title and x-axis labels
+                    (default is 1.5)
+    :param max_height: float, the maximum figure height (default is 30)
+    :return: float figure height
+    """
+    return min(max(min_height, n_bars * bar_height + padding), max_height)
+
+
+def _barplot_layout(value_counts, height, top, other_label):
+    """Return the values to plot and the figure height of a barplot
+
+    If ``height`` is None the height is chosen from the number of bars, and
+    unless ``top`` is given only the ``_AUTO_TOP`` most frequent values are
+    kept, so the figure stays a readable size.
+
+    :return: tuple of pd.Series object and float figure height
+    """
+    if height is None and top is None:
+        top = _AUTO_TOP
+    value_counts = _top_n(value_counts, top=top, other_label=other_label)
+    if height is None:
+        height = _auto_height(len(value_counts))
+    return value_counts, height
+
+
+def _draw_barplot(ax, value_counts, title, varname=None, color='k',
+                  label_space=0.01, max_label_length=40):
+    """Draw a horizontal barplot of a value_counts series on matplotlib axes
+
+    Count labels are offset from the bar ends in points, so their spacing
+    does not depend on the largest count. Above ``_MAX_LABELED_BARS`` bars,
+    which are too thin to be labeled legibly, neither count nor category
+    labels are drawn and the bars are drawn as one collection, which keeps
+    plotting thousands of values fast.
+
+    :param ax: matplotlib.axes.Axes object on which to draw
+    :param value_counts: pd.Series object generated by pandas value_counts()
+                         method
+    :param title: string, the printed title of the plot
+    :param varname: string or None, the y-axis label (default is None)
+    :param color: string, the matplotlib color name of the bars (default is
+                  'k' or black)
+    :param label_space: float, a coefficient used to space the count label
+                        an appropriate distance from the plotted bar, as a
+                        fraction of the axes width (default is 0.01)
+    :param max_label_length: integer or None, the number of characters after
+                             which category labels are truncated. If None,
+                             labels are not truncated. (Default is 40)
+    :return: No objects are returned
+    :raise ValueError: if ``value_counts`` is empty
+    """
+    if len(value_counts) == 0:
+        raise ValueError("value_counts must contain at least one value")
+
+    import numpy as np
+
+    positions = np.arange(len(value_counts))
+    labeled = len(value_counts) <= _MAX_LABELED_BARS
+    if labeled:
+        bars = ax.barh(positions, value_counts.values, color=color, alpha=1)
+    else:
+        # one collection of all bars avoids creating a patch per bar
+        from matplotlib.collections import PolyCollection
+
+        values = np.asarray(value_counts.values, dtype=float)
+        bottom, top = positions - 0.4, positions + 0.4
+        zeros = np.zeros(len(values))
+        verts = np.stack(
+            [
+                np.column_stack([zeros, bottom]),
+                np.column_stack([values, bottom]),
+                np.column_stack([values, top]),
+                np.column_stack([zeros, top]),
+            ],
+            axis=1,
+        )
+        collection = PolyCollection(verts, facecolors=color)
+        # bars start at zero, so no margin is added left of them
+        collection.sticky_edges.x.append(0)
+        ax.add_collection(collection)
+        ax.autoscale_view()
+
+    if labeled:
+        padding = (
+            label_space * ax.get_window_extent().width * 72 / ax.figure.dpi
+        )
+        for bar, y in zip(bars, value_counts.values):
+            ax.annotate(
+                '{:,}'.format(y),
+                xy=(bar.get_width(), bar.get_y() + bar.get_height() / 2),
+                xytext=(padding, 0),
+                textcoords='offset points',
+                color='k',
+                fontsize=12,
+                verticalalignment='center'
+            )
+    ax.margins(x=0.08, y=0.01)
+
+    ax.set_title(title, fontsize=18)
+    if labeled:
+        labels = value_counts.index.astype(str)
+        if max_label_length:
+            too_long = labels.str.len() > max_label_length
+            labels = labels.where(
+                ~too_long, labels.str.slice(0, max_label_length - 3) + '...'
+            )
+        ax.set_yticks(positions)
+        ax.set_yticklabels(labels, fontsize=12)
+    else:
+        ax.set_yticks([])
+    ax.set_xlabel('count', fontsize=14)
+    if varname:
+        ax.set_ylabel(varname, fontsize=14)
+
+    ax.grid(':', alpha=0.5)
+
+
+def make_barplot(value_counts, title, height=6, varname=None,
+                 color='k', label_space=0.01, top=None, other_label='other',
+                 max_label_length=40):
+    """Create a horizontal barplot figure without pyplot global state
+
+    The figure is attached to a non-interactive Agg canvas, so it can be
+    created on headless servers and in worker processes, and it is freed as
+    soon as it is no longer referenced rather than being kept alive by
+    pyplot's figure registry.
+
+    :param value_counts: pd.Series object generated by pandas value_counts()
+                         method
+    :param title: string, the printed title of the plot
+    :param height: float or None, the desired height of the plot. If None,
+                   the height is chosen from the number of bars, up to 30
+                   inches, and unless ``top`` is given only the 50 most
+                   frequent values are plotted. (Default is 6)
+    :param varname: string or None, the y-axis label (default is None)
+    :param color: string, the matplotlib color name for the color you would
+                  like for the plotted bars (default is 'k' or black)
+    :param label_space: float, a coefficient used to space the count label
+                        an appropriate distance from the plotted bar
+                        (default is 0.01)
+    :param top: integer or None, the number of most frequent values plotted,
+                all remaining values are summed into one ``other_label`` bar.
+                If None, all values are plotted, or the 50 most frequent if
+                ``height`` is None. Above 100 bars, bars are not labeled.
+                (Default is None)
+    :param other_label: string, the label of the bar summing values outside
+                        the top values (default is 'other')
+    :param max_label_length: integer or None, the number of characters after
+                             which category labels are truncated (default
+                             is 40)
+    :return: matplotlib.figure.Figure object, save with :func:`save_plot`
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    value_counts, height = _barplot_layout(
+        value_counts, height, top, other_label
+    )
+    fig = Figure(figsize=(12, height))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    _draw_barplot(
+        ax, value_counts, title, varname=varname, color=color,
+        label_space=label_space, max_label_length=max_label_length
+    )
+    fig.tight_layout()
+    return fig
+
+
+def _barplot_cache_key(**kwargs):
+    """Return the plot cache key of :func:`make_barplot` keyword arguments
+
+    Omitted arguments are filled in with their defaults, so the same plot
+    gets the same key however it was requested.
+
+    :param kwargs: keyword arguments to :func:`make_barplot`
+    :return: string hex digest
+    """
+    import inspect
+
+    bound = inspect.signature(make_barplot).bind(**kwargs)
+    bound.apply_defaults()
+    params = dict(bound.arguments)
+    value_counts = params.pop('value_counts')
+    return plot_cache_key(value_counts, plot='barplot', **params)
+
+
 def plot_barplot(value_counts, title, height=6, varname=None,
-                 color='k', label_space=0.01, savepath=None):
+                 color='k', label_space=0.01, top=None, other_label='other',
+                 max_label_length=40, savepath=None, cache=False):
     """Generate a horizontal barplot from a pandas value_counts series
 
+    This function displays the plot with ``plt.show()``. Use
+    :func:`make_barplot` or :func:`caproj.visualizations.batch.render_barplots`
+    to write plots to file without displaying them.
+
     :param value_counts: pd.Series object generated by pandas value_counts()
                          method
     :param title: string, the printed title of the plot
-    :param height: integer, the desired height of the plot (default is 6)
+    :param height: float or None, the desired height of the plot. If None,
+                   the height is chosen from the number of bars, up to 30
+                   inches, and unless ``top`` is given only the 50 most
+                   frequent values are plotted. (Default is 6)
     :param color: string, the matplotlib color name for the color you would
                   like for the plotted bars (default is 'k' or black)
     :param label_space: float, a coefficient used to space the count label
                         an appropriate distance from the plotted bar
                         (default is 0.01)
+    :param top: integer or None, the number of most frequent values plotted,
+                all remaining values are summed into one ``other_label`` bar.
+                If None, all values are plotted, or the 50 most frequent if
+                ``height`` is None. Above 100 bars, bars are not labeled.
+                (Default is None)
+    :param other_label: string, the label of the bar summing values outside
+                        the top values (default is 'other')
+    :param max_label_length: integer or None, the number of characters after
+                             which category labels are truncated (default
+                             is 40)
     :param savepath: string or none, specifies filepath at which to save the
                      resulting barplot. If None, nothing is saved. (Default
                      is None)
+    :param cache: boolean, if True and ``savepath`` already holds a plot of
+                  the same data and parameters, nothing is rendered or shown
+                  (default is False)
     :return: a matplotlib plot is generated; no objects are returned
     """
-    fig, ax = plt.subplots(figsize=(12, height))
+    cache_key = None
+    if cache and savepath:
+        cache_key = _barplot_cache_key(
+            value_counts=value_counts, title=title, height=height,
+            varname=varname, color=color, label_space=label_space, top=top,
+            other_label=other_label, max_label_length=max_label_length
+        )
+        if is_plot_cached(savepath, cache_key):
+            return
 
-    max_y = max(value_counts.values)
-    n_cats = len(value_counts)
+    import matplotlib.pyplot as plt
 
-    ax.barh(
-        range(n_cats), value_counts.values,
-        color=color, alpha=1
+    value_counts, height = _barplot_layout(
+        value_counts, height, top, other_label
+    )
+    fig, ax = plt.subplots(figsize=(12, height))
+    _draw_barplot(
+        ax, value_counts, title, varname=varname, color=color,
+        label_space=label_space, max_label_length=max_label_length
     )
+    fig.tight_layout()
+
+    save_plot(plt_object=fig, savepath=savepath, cache_key=cache_key)
+
+    plt.show()
+
+
+def _finite_xy(x, y):
+    """Return float arrays of the pairs in which both values are finite"""
+    import numpy as np
 
-    [
-        ax.text(
-            y+max_y*label_space, x,
-            '{:,}'.format(y),
-            color='k',
-            fontsize=12,
-            verticalalignment='center'
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.shape != y.shape:
+        raise ValueError(
+            "x and y must have the same length, got {} and {}".format(
+                len(x), len(y)
+            )
         )
-        for x, y
-        in enumerate(value_counts)
-    ]
+    finite = np.isfinite(x) & np.isfinite(y)
+    return x[finite], y[finite]
 
-    plt.title(title, fontsize=18)
-    plt.yticks(range(n_cats), value_counts.index, fontsize=12)
-    plt.xlabel('count', fontsize=14)
-    if varname:
-        plt.ylabel(varname, fontsize=14)
 
-    plt.grid(':', alpha=0.5)
-    plt.tight_layout()
+def _bin_range(values, quantiles=None):
+    """Return (min, max) of values, or of the given quantiles of values"""
+    import numpy as np
 
-    save_plot(plt_object=plt, savepath=savepath)
+    if len(values) == 0:
+        return 0.0, 1.0
+    if quantiles is None:
+        low, high = values.min(), values.max()
+    else:
+        low, high = np.quantile(values, quantiles)
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return float(low), float(high)
 
-    plt.show()
+
+def bin_2d(x, y, bins=100, range=None, quantiles=None):
+    """Count paired values in a regular 2D grid of bins
+
+    Bin indices are computed arithmetically and counted with a single
+    ``np.bincount`` call, which is faster than ``np.histogram2d`` on large
+    inputs. Pairs with a missing or infinite value, and pairs outside
+    ``range``, are not counted.
+
+    :param x: array-like of x values, e.g. a pd.Series of budget changes
+    :param y: array-like of y values with the same length as ``x``
+    :param bins: integer or (integer, integer), the number of bins along
+                 each axis (default is 100)
+    :param range: ((xmin, xmax), (ymin, ymax)) or None, the binned area. If
+                  None, it is taken from ``quantiles``. (Default is None)
+    :param quantiles: (float, float) or None, the lower and upper quantiles
+                      of each variable bounding the binned area when
+                      ``range`` is None, e.g. (0.01, 0.99) to leave out
+                      outliers. If None, the full range is used. (Default is
+                      None)
+    :return: tuple of the counts array with shape (x bins, y bins), the x bin
+             edges and the y bin edges
+    :raise ValueError: if ``x`` and ``y`` have different lengths
+    """
+    import numpy as np
+
+    x, y = _finite_xy(x, y)
+    nx, ny = (bins, bins) if np.isscalar(bins) else bins
+    if range is None:
+        range = (_bin_range(x, quantiles), _bin_range(y, quantiles))
+    (xmin, xmax), (ymin, ymax) = range
+
+    inside = (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
+    x, y = x[inside], y[inside]
+    ix = ((x - xmin) * (nx / (xmax - xmin))).astype(np.int64)
+    iy = ((y - ymin) * (ny / (ymax - ymin))).astype(np.int64)
+    # values equal to the upper edge belong to the last bin
+    np.minimum(ix, nx - 1, out=ix)
+    np.minimum(iy, ny - 1, out=iy)
+
+    counts = np.bincount(ix * ny + iy, minlength=nx * ny).reshape(nx, ny)
+    xedges = np.linspace(xmin, xmax, nx + 1)
+    yedges = np.linspace(ymin, ymax, ny + 1)
+    return counts, xedges, yedges
+
+
+def _binned_figure(x, y, title, xlabel, ylabel, height):
+    """Create an Agg figure with one axes labelled for paired values"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(height * 1.25, height))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    if title:
+        ax.set_title(title, fontsize=18)
+    ax.set_xlabel(xlabel or getattr(x, 'name', None) or 'x', fontsize=14)
+    ax.set_ylabel(ylabel or getattr(y, 'name', None) or 'y', fontsize=14)
+    return fig, ax
+
+
+def _count_norm(log):
+    """Return a log color scale for counts, or None for a linear scale"""
+    if not log:
+        return None
+
+    from matplotlib.colors import LogNorm
+
+    return LogNorm()
+
+
+def make_hist2d(x, y, bins=100, range=None, quantiles=None, title=None,
+                xlabel=None, ylabel=None, log=True, cmap='viridis',
+                height=8):
+    """Create a 2D histogram figure of paired values
+
+    Values are counted with :func:`bin_2d` before anything is drawn, so the
+    render time depends on the number of bins rather than the number of
+    records. Empty bins are left blank.
+
+    :param x: array-like of x values, e.g. a pd.Series of budget changes
+    :param y: array-like of y values with the same length as ``x``
+    :param bins: integer or (integer, integer), the number of bins along
+                 each axis (default is 100)
+    :param range: ((xmin, xmax), (ymin, ymax)) or None, the plotted area
+                  (default is None)
+    :param quantiles: (float, float) or None, the quantiles bounding the
+                      plotted area when ``range`` is None (default is None)
+    :param title: string or None, the printed title of the plot (default is
+                  None)
+    :param xlabel: string or None, the x-axis label. If None, the name of
+                   ``x`` is used. (Default is None)
+    :param ylabel: string or None, the y-axis label. If None, the name of
+                   ``y`` is used. (Default is None)
+    :param log: boolean, whether counts are colored on a log scale (default
+                is True)
+    :param cmap: string, the matplotlib colormap name (default is 'viridis')
+    :param height: float, the height of the plot (default is 8)
+    :return: matplotlib.figure.Figure object, save with :func:`save_plot`
+    """
+    import numpy as np
+
+    counts, xedges, yedges = bin_2d(
+        x, y, bins=bins, range=range, quantiles=quantiles
+    )
+    fig, ax = _binned_figure(x, y, title, xlabel, ylabel, height)
+    mesh = ax.pcolormesh(
+        xedges, yedges, np.ma.masked_equal(counts.T, 0), cmap=cmap,
+        norm=_count_norm(log and counts.any())
+    )
+    fig.colorbar(mesh, ax=ax, label='count')
+    fig.tight_layout()
+    return fig
+
+
+def make_hexbin(x, y, gridsize=50, range=None, quantiles=None, title=None,
+                xlabel=None, ylabel=None, log=True, cmap='viridis',
+                height=8, oversample=4):
+    """Create a hexagonal bin figure of paired values
+
+    Values are first counted with :func:`bin_2d` in a square grid
+    ``oversample`` times finer than the hexagons, and only the occupied grid
+    cells are passed to ``ax.hexbin`` as weighted points. The render time
+    therefore depends on ``gridsize`` rather than the number of records.
+
+    :param x: array-like of x values, e.g. a pd.Series of budget changes
+    :param y: array-like of y values with the same length as ``x``
+    :param gridsize: integer, the number of hexagons along the x-axis
+                     (default is 50)
+    :param range: ((xmin, xmax), (ymin, ymax)) or None, the plotted area
+                  (default is None)
+    :param quantiles: (float, float) or None, the quantiles bounding the
+                      plotted area when ``range`` is None (default is None)
+    :param title: string or None, the printed title of the plot (default is
+                  None)
+    :param xlabel: string or None, the x-axis label. If None, the name of
+                   ``x`` is used. (Default is None)
+    :param ylabel: string or None, the y-axis label. If None, the name of
+                   ``y`` is used. (Default is None)
+    :param log: boolean, whether counts are colored on a log scale (default
+                is True)
+    :param cmap: string, the matplotlib colormap name (default is 'viridis')
+    :param height: float, the height of the plot (default is 8)
+    :param oversample: integer, the number of grid cells per hexagon width
+                       used for pre-aggregation (default is 4)
+    :return: matplotlib.figure.Figure object, save with :func:`save_plot`
+    """
+    import numpy as np
+
+    counts, xedges, yedges = bin_2d(
+        x, y, bins=gridsize * oversample, range=range, quantiles=quantiles
+    )
+    ix, iy = np.nonzero(counts)
+    xcenters = (xedges[:-1] + xedges[1:]) / 2
+    ycenters = (yedges[:-1] + yedges[1:]) / 2
+
+    fig, ax = _binned_figure(x, y, title, xlabel, ylabel, height)
+    hexes = ax.hexbin(
+        xcenters[ix], ycenters[iy], C=counts[ix, iy],
+        reduce_C_function=np.sum, gridsize=gridsize, cmap=cmap,
+        norm=_count_norm(log and len(ix) > 0),
+        extent=(xedges[0], xedges[-1], yedges[0], yedges[-1])
+    )
+    fig.colorbar(hexes, ax=ax, label='count')
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,175 @@
+"""
+caproj.visualizations.batch
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains functionality for rendering many plots to file in
+parallel worker processes without a display
+
+**Module functions:**
+
+.. autosummary::
+
+   render_barplots
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+
+|
+"""
+import logging
+import os
+import time
+
+from caproj.pool import run_in_pool
+from caproj.visualizations import (
+    _barplot_cache_key,
+    is_plot_cached,
+    make_barplot,
+    save_plot,
+)
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+
+def _render_barplot(index, spec, cache=False):
+    """Render one barplot spec to file, capturing any exception
+
+    The figure is cleared once saved so its memory is released before the
+    worker renders the next spec. Errors computing the cache key, e.g. from
+    an invalid spec argument, are captured the same way.
+
+    :param index: position of the spec in the submitted list
+    :type index: int
+    :param spec: keyword arguments to
+                 :func:`~caproj.visualizations.make_barplot` plus
+                 ``savepath``
+    :type spec: dict
+    :param cache: whether to skip the spec if its saved plot is up to date,
+                  defaults to False
+    :type cache: bool, optional
+    :return: result dictionary with ``index``, ``savepath``, ``status``,
+             ``seconds`` and ``error`` keys
+    :rtype: dict
+    """
+    t1 = time.perf_counter()
+    kwargs = {key: val for key, val in spec.items() if key != "savepath"}
+    try:
+        cache_key = None
+        if cache:
+            cache_key = _barplot_cache_key(**kwargs)
+            if is_plot_cached(spec["savepath"], cache_key):
+                return _result(
+                    index,
+                    spec["savepath"],
+                    "cached",
+                    seconds=time.perf_counter() - t1,
+                )
+        fig = make_barplot(**kwargs)
+        save_plot(
+            plt_object=fig, savepath=spec["savepath"], cache_key=cache_key
+        )
+        fig.clear()
+    except Exception as error:
+        log.exception("rendering {} failed".format(spec["savepath"]))
+        return _result(
+            index,
+            spec["savepath"],
+            "failed",
+            seconds=time.perf_counter() - t1,
+            error="{}: {}".format(type(error).__name__, error),
+        )
+    return _result(
+        index, spec["savepath"], "ok", seconds=time.perf_counter() - t1
+    )
+
+
+def _result(index, savepath, status, seconds=0.0, error=None):
+    """Return a render result dictionary"""
+    return {
+        "index": index,
+        "savepath": savepath,
+        "status": status,
+        "seconds": seconds,
+        "error": error,
+    }
+
+
+def _failed(args, error):
+    """Return result of a spec whose worker process died"""
+    index, spec = args[:2]
+    return _result(
+        index,
+        spec["savepath"],
+        "failed",
+        error="{}: {}".format(type(error).__name__, error),
+    )
+
+
+def render_barplots(specs, workers=None, cache=False):
+    """Render barplots to file using a process pool
+
+    Each spec is a dictionary of keyword arguments to
+    :func:`~caproj.visualizations.make_barplot` with an additional
+    ``savepath`` key, e.g.::
+
+        {"value_counts": df["Borough"].value_counts(), "title": "Borough",
+         "savepath": "reports/figures/borough.png"}
+
+    Figures are drawn with the Agg backend and never registered with pyplot,
+    so rendering works without a display and each figure is freed once
+    written. Failures are isolated per spec.
+
+    With ``cache`` enabled, each spec's data and parameters are hashed with
+    :func:`~caproj.visualizations.plot_cache_key` by the worker rendering
+    it, and specs whose ``savepath`` already holds a plot with the same hash
+    are skipped.
+
+    If queue-based logging was started with a multiprocessing queue (see
+    :func:`caproj.logger.start_logging`), worker processes forward their log
+    records to it.
+
+    :param specs: plot specification dictionaries
+    :type specs: list of dict
+    :param workers: number of worker processes, if 1 plots are rendered in
+                    the calling process, if None ``os.cpu_count()`` is used,
+                    defaults to None
+    :type workers: int, optional
+    :param cache: whether to skip specs whose saved plot is up to date,
+                  defaults to False
+    :type cache: bool, optional
+    :return: list of result dictionaries in the order of ``specs``, each with
+             ``index``, ``savepath``, ``status`` ("ok", "cached" or
+             "failed"), ``seconds`` and ``error`` keys
+    :rtype: list of dict
+    :raise ValueError: if a spec has no ``savepath``
+    """
+    for i, spec in enumerate(specs):
+        if not spec.get("savepath"):
+            raise ValueError("plot spec {} has no 'savepath'".format(i))
+
+    workers = workers or os.cpu_count() or 1
+    t1 = time.perf_counter()
+    results = list(
+        run_in_pool(
+            _render_barplot,
+            [(i, spec, cache) for i, spec in enumerate(specs)],
+            1 if len(specs) <= 1 else workers,
+            on_error=_failed,
+        )
+    )
+    results.sort(key=lambda result: result["index"])
+
+    seconds = time.perf_counter() - t1
+    cached = sum(result["status"] == "cached" for result in results)
+    failed = sum(result["status"] == "failed" for result in results)
+    log.info(
+        "rendered {} of {} plots ({} failed) in {:.3f} sec".format(
+            len(results) - cached, len(results), failed, seconds
+        ),
+        extra={"duration": seconds, "errors": failed},
+    )
+    return results
@@ -0,0 +1,274 @@
+"""
+caproj.visualizations.report
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the report builder that renders many plots in parallel
+worker processes and streams them into a single multi-page PDF or
+self-contained HTML file
+
+**Module functions:**
+
+.. autosummary::
+
+   build_report
+
+**Module variables:**
+
+.. autosummary::
+
+   log
+   PLOT_KINDS
+   REPORT_FORMATS
+
+|
+"""
+import base64
+import html
+import io
+import logging
+import os
+import time
+
+from caproj.pool import run_in_pool
+from caproj.visualizations import make_barplot, make_hexbin, make_hist2d
+
+log = logging.getLogger(__name__)
+"""``logging.getLogger`` instance for module"""
+
+PLOT_KINDS = {
+    "barplot": make_barplot,
+    "hist2d": make_hist2d,
+    "hexbin": make_hexbin,
+}
+"""Plot spec kinds mapped to the functions creating their figures"""
+
+REPORT_FORMATS = (".pdf", ".html")
+"""File extensions of supported report formats"""
+
+
+def _render_png(index, spec, dpi):
+    """Render one plot spec to PNG bytes, capturing any exception
+
+    :param index: position of the spec in the report
+    :type index: int
+    :param spec: keyword arguments to the :data:`PLOT_KINDS` function named
+                 by the optional ``kind`` key, which defaults to "barplot"
+    :type spec: dict
+    :param dpi: resolution of the rendered image
+    :type dpi: int
+    :return: result dictionary with ``index``, ``title``, ``status``,
+             ``seconds``, ``error`` and ``png`` keys
+    :rtype: dict
+    """
+    t1 = time.perf_counter()
+    kwargs = {key: val for key, val in spec.items() if key != "kind"}
+    result = {
+        "index": index,
+        "title": spec.get("title"),
+        "status": "ok",
+        "error": None,
+        "png": None,
+    }
+    try:
+        fig = PLOT_KINDS[spec.get("kind", "barplot")](**kwargs)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=dpi)
+        fig.clear()
+        result["png"] = buffer.getvalue()
+    except Exception as error:
+        log.exception("rendering report plot {} failed".format(index))
+        result["status"] = "failed"
+        result["error"] = "{}: {}".format(type(error).__name__, error)
+    result["seconds"] = time.perf_counter() - t1
+    return result
+
+
+def _failed(args, error):
+    """Return result of a spec whose worker process died"""
+    index, spec = args[:2]
+    return {
+        "index": index,
+        "title": spec.get("title"),
+        "status": "failed",
+        "seconds": 0.0,
+        "error": "{}: {}".format(type(error).__name__, error),
+        "png": None,
+    }
+
+
+class _PdfReport(object):
+    """Write rendered images as the pages of a multi-page PDF"""
+
+    def __init__(self, filepath, title, dpi):
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        self.dpi = dpi
+        self.pdf = PdfPages(filepath, metadata={"Title": title or ""})
+
+    def add(self, png, title):
+        """Add one page showing a PNG image"""
+        from matplotlib.figure import Figure
+        from matplotlib.image import imread
+
+        image = imread(io.BytesIO(png), format="png")
+        height, width = image.shape[:2]
+        fig = Figure(figsize=(width / self.dpi, height / self.dpi))
+        fig.figimage(image, 0, 0)
+        self.pdf.savefig(fig, dpi=self.dpi)
+        fig.clear()
+
+    def close(self):
+        """Finish the PDF file, with a notice page if no plot was added"""
+        if self.pdf.get_pagecount() == 0:
+            from matplotlib.figure import Figure
+
+            fig = Figure()
+            fig.text(0.5, 0.5, "no plots rendered", ha="center")
+            self.pdf.savefig(fig)
+        self.pdf.close()
+
+
+class _HtmlReport(object):
+    """Write rendered images inline into a self-contained HTML file"""
+
+    def __init__(self, filepath, title, dpi):
+        self.file = open(filepath, "wt")
+        title = html.escape(title or "caproj report")
+        self.file.write(
+            "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+            "<title>{0}</title>\n</head>\n<body>\n<h1>{0}</h1>\n".format(title)
+        )
+
+    def add(self, png, title):
+        """Add one figure with an embedded PNG image"""
+        self.file.write(
+            "<figure>\n<img src=\"data:image/png;base64,{}\" alt=\"{}\">\n"
+            "</figure>\n".format(
+                base64.b64encode(png).decode("ascii"),
+                html.escape(title or ""),
+            )
+        )
+
+    def close(self):
+        """Finish the HTML file"""
+        self.file.write("</body>\n</html>\n")
+        self.file.close()
+
+
+def _ordered_results(specs, dpi, workers):
+    """Return generator of render results in spec order with bounded work
+
+    At most ``2 * workers`` specs are submitted ahead of the next result to
+    be written, so the number of rendered images held in memory does not
+    grow with the number of specs.
+    """
+    return run_in_pool(
+        _render_png,
+        ((index, spec, dpi) for index, spec in enumerate(specs)),
+        workers,
+        on_error=_failed,
+        ordered=True,
+        window=2 * workers,
+    )
+
+
+def build_report(
+    specs,
+    filepath=os.path.join("reports", "report.pdf"),
+    title=None,
+    workers=None,
+    dpi=100,
+):
+    """Render plot specs in parallel and stream them into one report file
+
+    Each spec is a dictionary of keyword arguments to one of the
+    :data:`PLOT_KINDS` functions, selected by an optional ``kind`` key that
+    defaults to "barplot", e.g.::
+
+        [
+            {"value_counts": df["Borough"].value_counts(), "title": "Borough"},
+            {"kind": "hexbin", "x": df["Budget Change"],
+             "y": df["Schedule Change"], "title": "Budget vs schedule"},
+        ]
+
+    Plots are rendered to PNG images in worker processes and written to the
+    report in spec order as they complete, one page per plot in a PDF or one
+    inline image per plot in HTML. Only a bounded number of rendered images
+    is held in memory at any time. Failed specs are logged and left out of
+    the report. The report is written to a temporary file and moved into
+    place once complete.
+
+    :param specs: plot specification dictionaries
+    :type specs: list of dict
+    :param filepath: report file path ending in one of
+                     :data:`REPORT_FORMATS`, defaults to "reports/report.pdf"
+    :type filepath: str, optional
+    :param title: report title, defaults to None
+    :type title: str, optional
+    :param workers: number of worker processes, if 1 plots are rendered in
+                    the calling process, if None ``os.cpu_count()`` is used,
+                    defaults to None
+    :type workers: int, optional
+    :param dpi: resolution of rendered plots, defaults to 100
+    :type dpi: int, optional
+    :return: summary dictionary with the report ``filepath``, counts of
+             ``plots``, ``succeeded`` and ``failed`` specs, wall ``seconds``
+             and per-spec ``results``
+    :rtype: dict
+    :raise ValueError: if the report format or a spec's ``kind`` is unknown
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext not in REPORT_FORMATS:
+        raise ValueError(
+            "report file must end in one of {}, got '{}'".format(
+                REPORT_FORMATS, filepath
+            )
+        )
+    for i, spec in enumerate(specs):
+        if spec.get("kind", "barplot") not in PLOT_KINDS:
+            raise ValueError(
+                "plot spec {} has invalid kind '{}', valid kinds are "
+                "{}".format(i, spec.get("kind"), list(PLOT_KINDS))
+            )
+
+    workers = workers or os.cpu_count() or 1
+    t1 = time.perf_counter()
+    dirname = os.path.dirname(filepath)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    tmp_filepath = "{}.tmp{}".format(os.path.splitext(filepath)[0], ext)
+    report_cls = _PdfReport if ext == ".pdf" else _HtmlReport
+
+    results = list()
+    report = report_cls(tmp_filepath, title, dpi)
+    try:
+        for result in _ordered_results(specs, dpi, workers):
+            png = result.pop("png")
+            if png is not None:
+                report.add(png, result["title"])
+            results.append(result)
+    except BaseException:
+        report.close()
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+        raise
+    report.close()
+    os.replace(tmp_filepath, filepath)
+
+    seconds = time.perf_counter() - t1
+    failed = sum(result["status"] != "ok" for result in results)
+    summary = {
+        "filepath": filepath,
+        "plots": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "seconds": seconds,
+        "results": results,
+    }
+    log.info(
+        "report {} built from {} plots ({} failed) in {:.3f} sec".format(
+            filepath, len(results), failed, seconds
+        ),
+        extra={"duration": seconds, "errors": failed},
+    )
+    return summary
@@ -104,14 +104,21 @@ class BaseDataOpsIOTests(unittest.TestCase):
                 "Number of project change records" in "".join(logmsg.output)
             )
 
-    def test_log_record_count_init_fails(self):
-        """Ensure BaseDataOps init log_record_count fails elegantly"""
+    def test_log_record_count_init_no_id_scan(self):
+        """Ensure BaseDataOps init does not require or scan the id column"""
         with self.assertLogs("BaseDataOps", level="INFO") as logmsg:
             Base = BaseDataOps(pd.DataFrame(columns=["a", "b"]), copy_input=False)
             self.assertListEqual(["a", "b"], list(Base.df.columns))
-            self.assertTrue(
-                "unable to log record count" in "".join(logmsg.output)
+            self.assertFalse(
+                "unique projects" in "".join(logmsg.output)
             )
+        self.assertIsNone(Base._stats)
+
+    def test_log_record_count_fails_no_id_col(self):
+        """Ensure log_record_count raises KeyError for a missing id column"""
+        Base = BaseDataOps(pd.DataFrame(columns=["a", "b"]), copy_input=False)
+        with self.assertRaises(KeyError):
+            Base.log_record_count(id_col="PID")
 
 
 class BaseDataOpsReadJsonMapDictTests(unittest.TestCase):
@@ -328,6 +335,15 @@ class BaseDataOpsColDtypeTests(unittest.TestCase):
         for val in error_dict.values():
             self.assertFalse(math.isnan(val))
 
+    def test_to_datetime_errors_string_values(self):
+        """Ensure _to_datetime keeps non-date strings in error_dict"""
+        Base = BaseDataOps(
+            pd.DataFrame().from_dict({"c": ["unknown", np.nan, "2020-01-01"]}),
+            copy_input=False,
+        )
+        _, _, error_dict = Base._to_datetime(colname="c")
+        self.assertDictEqual(error_dict, {0: "unknown"})
+
     def test_set_dtypes_dict_failure(self):
         """Ensure set_dtypes fails to set dtype_errors when no map_dict returned"""
         self.Base.set_dtypes(json_path="nonexistent path")
@@ -418,6 +434,19 @@ class BaseDataOpsColDtypeTests(unittest.TestCase):
                 )
                 self.assertTrue(is_log in "".join(logmsg.output))
 
+    def test_set_dtypes_log_structured_errors(self):
+        """Ensure set_dtypes attaches column and error count to log records"""
+        with self.assertLogs("BaseDataOps", level="INFO") as logmsg:
+            self.Base.set_dtypes(map_dict=self.map_dict)
+            errors = {
+                record.column: record.errors
+                for record in logmsg.records
+                if hasattr(record, "errors")
+            }
+            self.assertDictEqual(
+                errors, dict(zip(self.map_dict, self.expected_error_counts))
+            )
+
     def test_set_dtypes_ignore_changes_df(self):
         """Ensure resulting dataframe has no NaN values if coerce set to False"""
         self.Base.set_dtypes(map_dict=self.map_dict, coerce=False)
@@ -0,0 +1,134 @@
+"""
+Unit tests for caproj.data.batch submodule
+"""
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from caproj.data.batch import check_targets, expand_inputs, read_manifest, run_batch
+from caproj.data.pipeline import Pipeline
+
+
+class BatchTests(unittest.TestCase):
+    """Tests to ensure caproj.data.batch functions properly"""
+
+    def setUp(self):
+        """Set up input files and pipeline for tests"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.filenames = list()
+        for i in range(3):
+            fp = os.path.join(self.tmpdir.name, "agency{}.csv".format(i))
+            pd.DataFrame({"PID": range(i + 1), "a": ["1"] * (i + 1)}).to_csv(
+                fp, index=False
+            )
+            self.filenames.append(fp)
+        self.bad_fp = os.path.join(self.tmpdir.name, "bad.csv")
+        pd.DataFrame({"ID": [1]}).to_csv(self.bad_fp, index=False)
+        self.pipeline = Pipeline(
+            [
+                {"step": "from_file", "filename": "placeholder.csv"},
+                {"step": "set_dtypes", "map_dict": {"a": "float"}},
+                {"step": "sort_values", "by": "PID"},
+                {
+                    "step": "to_file",
+                    "target_filename": os.path.join(
+                        self.tmpdir.name, "{stem}_clean.csv"
+                    ),
+                },
+            ]
+        )
+
+    def test_expand_inputs_glob(self):
+        """Ensure glob patterns expand to sorted unique files"""
+        pattern = os.path.join(self.tmpdir.name, "agency*.csv")
+        self.assertListEqual(
+            expand_inputs(patterns=[pattern, pattern]), self.filenames
+        )
+
+    def test_read_manifest(self):
+        """Ensure manifest skips comments and resolves relative paths"""
+        fp = os.path.join(self.tmpdir.name, "manifest.txt")
+        with open(fp, "w") as f:
+            f.write("# inputs\nagency0.csv\n\nagency1.csv\n")
+        self.assertListEqual(read_manifest(fp), self.filenames[:2])
+        self.assertListEqual(
+            expand_inputs(manifest=fp, patterns=self.filenames[2]),
+            self.filenames,
+        )
+
+    def test_for_input(self):
+        """Ensure for_input replaces input file and output stem"""
+        pipeline = self.pipeline.for_input(self.filenames[0])
+        self.assertEqual(pipeline.steps[0]["filename"], self.filenames[0])
+        self.assertTrue(
+            pipeline.steps[-1]["target_filename"].endswith("agency0_clean.csv")
+        )
+        self.assertEqual(pipeline.name, "pipeline_agency0")
+        self.assertIs(pipeline._schemas, self.pipeline._schemas)
+
+    def test_check_targets_without_stem(self):
+        """Ensure several inputs cannot write a target without {stem}"""
+        self.pipeline.steps[-1]["target_filename"] = os.path.join(
+            self.tmpdir.name, "clean.csv"
+        )
+        check_targets(self.pipeline, self.filenames[:1])
+        with self.assertRaisesRegex(ValueError, "stem"):
+            run_batch(self.pipeline, self.filenames, workers=1)
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, "clean.csv")))
+
+    def test_check_targets_same_stem(self):
+        """Ensure inputs resolving to the same target are rejected"""
+        os.mkdir(os.path.join(self.tmpdir.name, "other"))
+        fp = os.path.join(self.tmpdir.name, "other", "agency0.csv")
+        pd.DataFrame({"PID": [0], "a": ["1"]}).to_csv(fp, index=False)
+        with self.assertRaisesRegex(ValueError, "both write"):
+            check_targets(self.pipeline, [self.filenames[0], fp])
+        self.pipeline.steps.pop()
+        check_targets(self.pipeline, [self.filenames[0], fp])
+        self.pipeline.checkpoint_dir = self.tmpdir.name
+        with self.assertRaisesRegex(ValueError, "checkpoint name"):
+            check_targets(self.pipeline, [self.filenames[0], fp])
+
+    def test_run_batch_loads_schemas(self):
+        """Ensure schema files are read before inputs are processed"""
+        json_path = os.path.join(self.tmpdir.name, "dtypes.json")
+        with open(json_path, "w") as f:
+            json.dump({"a": "float"}, f)
+        self.pipeline.steps[1] = {"step": "set_dtypes", "json_path": json_path}
+        self.pipeline.load_schemas()
+        self.assertIn(json_path, self.pipeline._schemas)
+        self.pipeline.clear_schemas()
+        summary = run_batch(self.pipeline, self.filenames, workers=2)
+        self.assertEqual(summary["succeeded"], 3)
+        self.assertIn(json_path, self.pipeline._schemas)
+
+    def test_run_batch_serial(self):
+        """Ensure every file is processed in-process with workers=1"""
+        summary = run_batch(self.pipeline, self.filenames, workers=1)
+        self.assertEqual(summary["succeeded"], 3)
+        self.assertEqual(summary["rows"], 6)
+        for fp in self.filenames:
+            stem = os.path.splitext(fp)[0]
+            self.assertTrue(os.path.exists(stem + "_clean.csv"))
+
+    def test_run_batch_pool_isolates_failures(self):
+        """Ensure a failing file does not stop other files in the pool"""
+        filenames = self.filenames + [self.bad_fp]
+        summary = run_batch(self.pipeline, filenames, workers=2)
+        self.assertEqual(summary["files"], 4)
+        self.assertEqual(summary["failed"], 1)
+        self.assertListEqual(
+            [result["filename"] for result in summary["results"]], filenames
+        )
+        self.assertTrue("KeyError" in summary["results"][-1]["error"])
+
+    def test_run_batch_summary(self):
+        """Ensure summary reports throughput"""
+        summary = run_batch(self.pipeline, self.filenames, workers=1)
+        self.assertTrue(summary["rows_per_sec"] > 0)
+        self.assertTrue(summary["files_per_sec"] > 0)
+        json.dumps(summary)
@@ -26,6 +26,11 @@ class CleanMixinTests(unittest.TestCase):
         self.Base.remove_missing_records(columns="a")
         self.assertEqual(len(self.Base.df), 2)
 
+    def test_remove_missing_records_multi_char_col(self):
+        """Ensure a multi-character column name string is not split"""
+        self.Base.remove_missing_records(columns="PID")
+        self.assertEqual(len(self.Base.df), 2)
+
     def test_remove_missing_records_multi_col(self):
         """Ensure remove_missing_records works with multi-column input list"""
         self.Base.remove_missing_records(columns=["a", "PID"])
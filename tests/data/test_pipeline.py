@@ -0,0 +1,259 @@
+"""
+Unit tests for caproj.data.pipeline submodule
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+import numpy as np
+
+from caproj.data import BaseData
+from caproj.data.pipeline import Pipeline
+
+
+class PipelineTests(unittest.TestCase):
+    """Tests to ensure caproj.data.pipeline.Pipeline functions properly"""
+
+    def setUp(self):
+        """Set up data and pipeline files for tests"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.input_fp = os.path.join(self.tmpdir.name, "input.csv")
+        self.output_fp = os.path.join(self.tmpdir.name, "output.csv")
+        self.schema_fp = os.path.join(self.tmpdir.name, "dtypes.json")
+        pd.DataFrame(
+            {
+                "PID": [2, 1, np.nan],
+                "Budget Amt": ["10", "x", "30"],
+                "Date": ["2020-01-01", "2020-02-01", "2020-03-01"],
+            }
+        ).to_csv(self.input_fp, index=False)
+        with open(self.schema_fp, "w") as f:
+            json.dump({"Budget_Amt": "float"}, f)
+        self.steps = [
+            {"step": "from_file", "filename": self.input_fp},
+            {"step": "lint_colnames"},
+            {"step": "set_dtypes", "json_path": self.schema_fp, "coerce": True},
+            {"step": "remove_missing_records", "columns": "PID"},
+            {"step": "concat_values", "columns": ["PID", "Date"], "to_colname": "ID"},
+            {"step": "sort_values", "by": "PID"},
+            {"step": "to_file", "target_filename": self.output_fp},
+        ]
+
+    def test_pipeline_run(self):
+        """Ensure pipeline applies all steps and writes output"""
+        data = Pipeline(self.steps).run()
+        self.assertIsInstance(data, BaseData)
+        self.assertListEqual(list(data.df["PID"]), [1.0, 2.0])
+        self.assertTrue(np.isnan(data.df["Budget_Amt"].iloc[0]))
+        self.assertTrue(os.path.exists(self.output_fp))
+
+    def test_pipeline_timings(self):
+        """Ensure pipeline records run time of every step"""
+        pipeline = Pipeline(self.steps)
+        pipeline.run()
+        self.assertListEqual(
+            [step for step, _ in pipeline.timings],
+            [step["step"] for step in self.steps],
+        )
+
+    def test_pipeline_from_json(self):
+        """Ensure pipeline is read from json list or steps object"""
+        fp = os.path.join(self.tmpdir.name, "pipeline.json")
+        for config in [self.steps, {"steps": self.steps}]:
+            with open(fp, "w") as f:
+                json.dump(config, f)
+            pipeline = Pipeline.from_json(fp)
+            self.assertEqual(pipeline.name, "pipeline")
+            self.assertEqual(len(pipeline.steps), len(self.steps))
+
+    def test_pipeline_schema_read_once(self):
+        """Ensure schema json files are reused across steps and runs"""
+        self.steps.insert(3, dict(self.steps[2]))
+        pipeline = Pipeline(self.steps)
+        with mock.patch(
+            "caproj.data.pipeline.json.load", wraps=json.load
+        ) as load_patch:
+            pipeline.run()
+            pipeline.run()
+            self.assertEqual(load_patch.call_count, 1)
+
+    def test_pipeline_schema_reread_when_changed(self):
+        """Ensure an edited schema file is read again on the next run"""
+        pipeline = Pipeline(self.steps)
+        pipeline.run()
+        with open(self.schema_fp, "w") as f:
+            json.dump({"Budget_Amt": "str"}, f)
+        stat = os.stat(self.schema_fp)
+        os.utime(self.schema_fp, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        data = pipeline.run()
+        self.assertEqual(data.df["Budget_Amt"].iloc[0], "x")
+
+    def test_pipeline_step_kwargs(self):
+        """Ensure step kwargs drop step keys and resolve schema files"""
+        pipeline = Pipeline(self.steps)
+        self.assertDictEqual(
+            pipeline.step_kwargs(dict(self.steps[2], checkpoint=False)),
+            {"map_dict": {"Budget_Amt": "float"}, "coerce": True},
+        )
+        self.assertDictEqual(pipeline.step_kwargs(self.steps[1]), {})
+
+    def test_pipeline_is_checkpointed(self):
+        """Ensure to_file and opted out steps are not checkpointed"""
+        self.steps[1]["checkpoint"] = False
+        pipeline = Pipeline(self.steps)
+        self.assertListEqual(
+            [pipeline.is_checkpointed(i) for i in range(len(self.steps))],
+            [True, False, True, True, True, True, False],
+        )
+
+    def test_pipeline_invalid_step(self):
+        """Ensure unknown step names raise ValueError"""
+        with self.assertRaises(ValueError):
+            Pipeline(self.steps + [{"step": "foo"}])
+
+    def test_pipeline_must_start_from_file(self):
+        """Ensure pipeline not starting with from_file raises ValueError"""
+        with self.assertRaises(ValueError):
+            Pipeline(self.steps[1:])
+
+
+class PipelineCheckpointTests(unittest.TestCase):
+    """Tests to ensure Pipeline checkpointing and resume function properly"""
+
+    def setUp(self):
+        """Set up data and pipeline for tests"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.checkpoint_dir = os.path.join(self.tmpdir.name, "interim")
+        self.input_fp = os.path.join(self.tmpdir.name, "input.csv")
+        self.output_fp = os.path.join(self.tmpdir.name, "output.csv")
+        pd.DataFrame({"PID": [2, 1], "a": ["1", "x"]}).to_csv(
+            self.input_fp, index=False
+        )
+        self.steps = [
+            {"step": "from_file", "filename": self.input_fp},
+            {"step": "set_dtypes", "map_dict": {"a": "float"}, "coerce": True},
+            {"step": "sort_values", "by": "PID", "checkpoint": False},
+            {"step": "to_file", "target_filename": self.output_fp},
+        ]
+
+    def make_pipeline(self):
+        """Return pipeline with checkpointing enabled"""
+        return Pipeline(self.steps, checkpoint_dir=self.checkpoint_dir)
+
+    def test_checkpoints_written(self):
+        """Ensure only checkpointed steps write checkpoint and state files"""
+        self.make_pipeline().run()
+        files = sorted(os.listdir(self.checkpoint_dir))
+        self.assertEqual(len(files), 4)
+        self.assertTrue(files[0].startswith("pipeline_00_from_file_"))
+        self.assertEqual(files[1], files[0] + ".state")
+        self.assertTrue(files[2].startswith("pipeline_01_set_dtypes_"))
+        self.assertEqual(files[3], files[2] + ".state")
+
+    def test_resume_skips_unchanged_steps(self):
+        """Ensure rerun resumes after the last valid checkpoint"""
+        self.make_pipeline().run()
+        pipeline = self.make_pipeline()
+        with mock.patch.object(BaseData, "from_file") as from_file_patch:
+            data = pipeline.run()
+            self.assertFalse(from_file_patch.called)
+        self.assertListEqual(
+            [step for step, _ in pipeline.timings], ["sort_values", "to_file"]
+        )
+        self.assertListEqual(list(data.df["PID"]), [1, 2])
+        self.assertTrue(np.isnan(data.df["a"].iloc[0]))
+
+    def assert_same_data(self, cold, resumed):
+        """Assert two BaseData objects have equal attributes"""
+        cold_vars, resumed_vars = vars(cold), vars(resumed)
+        self.assertListEqual(sorted(cold_vars), sorted(resumed_vars))
+        for name, value in cold_vars.items():
+            with self.subTest(attribute=name):
+                if isinstance(value, pd.DataFrame):
+                    pd.testing.assert_frame_equal(resumed_vars[name], value)
+                else:
+                    self.assertEqual(resumed_vars[name], value)
+
+    def test_resume_restores_attributes(self):
+        """Ensure resumed runs return the same attributes as cold runs"""
+        self.steps[0]["copy_input"] = True
+        for checkpoint_input in [True, False]:
+            with self.subTest(checkpoint_input=checkpoint_input):
+                self.steps[0]["checkpoint"] = checkpoint_input
+                cold = self.make_pipeline().run(resume=False)
+                self.assertIn("df_input", vars(cold))
+                self.assertIn("dtype_errors", vars(cold))
+                pipeline = self.make_pipeline()
+                resumed = pipeline.run()
+                self.assertEqual(pipeline.timings[0][0], "sort_values")
+                self.assert_same_data(cold, resumed)
+
+    def test_resume_after_changed_params(self):
+        """Ensure changed step parameters invalidate that step onwards"""
+        self.make_pipeline().run()
+        self.steps[1]["coerce"] = False
+        pipeline = self.make_pipeline()
+        pipeline.run()
+        self.assertListEqual(
+            [step for step, _ in pipeline.timings],
+            ["set_dtypes", "sort_values", "to_file"],
+        )
+
+    def test_resume_after_changed_input(self):
+        """Ensure changed input file invalidates all checkpoints"""
+        self.make_pipeline().run()
+        pd.DataFrame({"PID": [3], "a": ["1"]}).to_csv(
+            self.input_fp, index=False
+        )
+        pipeline = self.make_pipeline()
+        data = pipeline.run()
+        self.assertEqual(pipeline.timings[0][0], "from_file")
+        self.assertListEqual(list(data.df["PID"]), [3])
+
+    def test_checkpoint_keys_chained(self):
+        """Ensure a changed step changes its own and all following keys"""
+        pipeline = self.make_pipeline()
+        keys = pipeline.checkpoint_keys(
+            [pipeline.step_kwargs(step) for step in self.steps]
+        )
+        self.assertEqual(len(set(keys)), len(self.steps))
+        self.steps[2]["by"] = "a"
+        pipeline = self.make_pipeline()
+        changed = pipeline.checkpoint_keys(
+            [pipeline.step_kwargs(step) for step in self.steps]
+        )
+        self.assertListEqual(changed[:2], keys[:2])
+        self.assertTrue(all(a != b for a, b in zip(changed[2:], keys[2:])))
+
+    def test_no_resume(self):
+        """Ensure resume=False reruns every step"""
+        self.make_pipeline().run()
+        pipeline = self.make_pipeline()
+        pipeline.run(resume=False)
+        self.assertEqual(len(pipeline.timings), len(self.steps))
+
+    def test_prune_checkpoints(self):
+        """Ensure only stale checkpoints of this pipeline are removed"""
+        self.make_pipeline().run()
+        self.steps[1]["coerce"] = False
+        pipeline = self.make_pipeline()
+        pipeline.run()
+        other = os.path.join(self.checkpoint_dir, "other_00_from_file_x.pkl")
+        open(other, "w").close()
+        self.assertEqual(len(os.listdir(self.checkpoint_dir)), 7)
+        removed = pipeline.prune_checkpoints()
+        self.assertEqual(len(removed), 2)
+        self.assertTrue(all("_01_set_dtypes_" in fp for fp in removed))
+        self.assertEqual(len(os.listdir(self.checkpoint_dir)), 5)
+        self.assertListEqual(pipeline.prune_checkpoints(), [])
+        self.assertListEqual(Pipeline(self.steps).prune_checkpoints(), [])
+
+    def test_invalid_checkpoint_format(self):
+        """Ensure invalid checkpoint_format raises ValueError"""
+        with self.assertRaises(ValueError):
+            Pipeline(self.steps, checkpoint_format="foo")
@@ -0,0 +1,119 @@
+"""
+Unit tests for caproj.data.stats submodule
+"""
+import unittest
+from unittest import mock
+
+import pandas as pd
+import numpy as np
+
+from caproj.data import BaseData
+from caproj.data.stats import DataStats
+
+
+class DataStatsTests(unittest.TestCase):
+    """Tests to ensure caproj.data.stats.DataStats functions properly"""
+
+    def setUp(self):
+        """Set up data for tests"""
+        self.data = pd.DataFrame(
+            {"PID": [1, 1, 2, np.nan], "a": [np.nan, "x", "y", np.nan]}
+        )
+        self.stats = DataStats(self.data)
+
+    def test_n_records(self):
+        """Ensure n_records returns number of rows"""
+        self.assertEqual(self.stats.n_records, 4)
+
+    def test_n_unique_cached(self):
+        """Ensure n_unique is computed once and then read from cache"""
+        self.assertEqual(self.stats.n_unique("PID"), 2)
+        with mock.patch.object(pd.Series, "nunique") as nunique_patch:
+            self.assertEqual(self.stats.n_unique("PID"), 2)
+            self.assertFalse(nunique_patch.called)
+
+    def test_null_counts(self):
+        """Ensure null_counts returns per-column missing value counts"""
+        self.assertDictEqual(
+            self.stats.null_counts.to_dict(), {"PID": 1, "a": 2}
+        )
+
+    def test_memory_usage(self):
+        """Ensure memory_usage matches pandas deep memory usage"""
+        self.assertEqual(
+            self.stats.memory_usage,
+            self.data.memory_usage(index=True, deep=True).sum(),
+        )
+
+    def test_invalidate_columns(self):
+        """Ensure invalidate drops only the specified column caches"""
+        _ = self.stats.null_counts
+        self.data["a"] = "z"
+        self.stats.invalidate(columns="a")
+        self.assertDictEqual(
+            self.stats.null_counts.to_dict(), {"PID": 1, "a": 0}
+        )
+
+    def test_invalidate_all(self):
+        """Ensure invalidate without columns drops all caches"""
+        self.stats.n_unique("PID")
+        self.data.dropna(subset=["PID"], inplace=True)
+        self.data.loc[0, "PID"] = 5
+        self.stats.invalidate()
+        self.assertEqual(self.stats.n_unique("PID"), 3)
+
+    def test_rename(self):
+        """Ensure rename carries cached statistics over to new names"""
+        self.stats.n_unique("PID")
+        self.data.rename(columns={"PID": "ID"}, inplace=True)
+        self.stats.rename({"PID": "ID"})
+        with mock.patch.object(pd.Series, "nunique") as nunique_patch:
+            self.assertEqual(self.stats.n_unique("ID"), 2)
+            self.assertFalse(nunique_patch.called)
+
+    def test_to_dict(self):
+        """Ensure to_dict returns all statistics"""
+        self.assertListEqual(
+            list(self.stats.to_dict().keys()),
+            ["n_records", "n_unique", "null_counts", "memory_usage"],
+        )
+
+
+class BaseDataStatsTests(unittest.TestCase):
+    """Tests to ensure BaseData methods keep cached statistics current"""
+
+    def setUp(self):
+        """Set up data for tests"""
+        self.Base = BaseData(
+            pd.DataFrame({"PID": [1, 2, np.nan], "a": ["1", "x", "2"]}),
+            copy_input=False,
+        )
+
+    def test_stats_lazy(self):
+        """Ensure stats object is only created on first access"""
+        self.assertIsNone(self.Base._stats)
+        self.assertIsInstance(self.Base.stats, DataStats)
+
+    def test_stats_rebuilt_on_new_df(self):
+        """Ensure stats are rebuilt when self.df is replaced"""
+        stats = self.Base.stats
+        self.Base.df = self.Base.df.copy()
+        self.assertIsNot(self.Base.stats, stats)
+
+    def test_stats_remove_missing_records(self):
+        """Ensure remove_missing_records invalidates cached statistics"""
+        self.assertEqual(self.Base.stats.null_counts["PID"], 1)
+        self.Base.remove_missing_records(columns="PID")
+        self.assertEqual(self.Base.stats.null_counts["PID"], 0)
+
+    def test_stats_set_dtypes(self):
+        """Ensure set_dtypes invalidates converted column statistics"""
+        self.assertEqual(self.Base.stats.null_counts["a"], 0)
+        self.Base.set_dtypes(map_dict={"a": "integer"}, coerce=True)
+        self.assertEqual(self.Base.stats.null_counts["a"], 1)
+
+    def test_stats_rename_columns(self):
+        """Ensure rename_columns keeps cached statistics under new names"""
+        self.Base.stats.n_unique("PID")
+        self.Base.rename_columns(map_dict={"PID": "ID"})
+        self.assertEqual(self.Base.stats.n_unique("ID"), 2)
@@ -0,0 +1,113 @@
+"""
+Unit tests for caproj.data.synthetic submodule
+"""
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+import numpy as np
+
+from caproj.data import BaseData
+from caproj.data.synthetic import SyntheticDataGenerator
+
+
+class SyntheticDataGeneratorTests(unittest.TestCase):
+    """Tests to ensure SyntheticDataGenerator functions properly"""
+
+    def setUp(self):
+        """Set up generator for tests"""
+        self.generator = SyntheticDataGenerator(seed=1)
+
+    def test_generate_n_rows(self):
+        """Ensure generate returns requested number of rows over chunks"""
+        df = self.generator.generate(1050, chunksize=100)
+        self.assertEqual(len(df), 1050)
+
+    def test_generate_reproducible(self):
+        """Ensure same seed and chunksize reproduce identical data"""
+        df1 = self.generator.generate(500, chunksize=200)
+        df2 = SyntheticDataGenerator(seed=1).generate(500, chunksize=200)
+        pd.testing.assert_frame_equal(df1, df2)
+        df3 = SyntheticDataGenerator(seed=2).generate(500, chunksize=200)
+        self.assertFalse(df1.equals(df3))
+
+    def test_generate_multiple_records_per_pid(self):
+        """Ensure projects have multiple change records and unique PIDs"""
+        df = SyntheticDataGenerator(
+            seed=1, missing_rates={"PID": 0}
+        ).generate(1000, chunksize=300)
+        counts = df["PID"].value_counts()
+        self.assertTrue(counts.max() > 1)
+        self.assertTrue(counts.max() <= 12)
+        self.assertEqual(df["PID"].is_monotonic_increasing, True)
+
+    def test_error_and_missing_rates(self):
+        """Ensure configured error and missing rates are applied"""
+        generator = SyntheticDataGenerator(
+            seed=1,
+            error_rates={"Budget Forecast": 0.5},
+            missing_rates={"Budget Forecast": 0, "Borough": 0},
+        )
+        df = generator.generate(2000)
+        numeric = pd.to_numeric(df["Budget Forecast"], errors="coerce")
+        self.assertAlmostEqual(numeric.isnull().mean(), 0.5, delta=0.05)
+        self.assertEqual(df["Borough"].isnull().sum(), 0)
+
+    def test_no_errors(self):
+        """Ensure zero rates produce clean, convertible data"""
+        generator = SyntheticDataGenerator(
+            seed=1,
+            error_rates={col: 0 for col in ["Budget Forecast", "Design Start"]},
+            missing_rates={"Design Start": 0, "Budget Forecast": 0},
+        )
+        Base = BaseData(generator.generate(300), copy_input=False)
+        Base.set_dtypes(
+            map_dict={"Budget Forecast": "integer", "Design Start": "datetime"}
+        )
+        self.assertEqual(len(Base.dtype_errors["Budget Forecast"]), 0)
+        self.assertEqual(len(Base.dtype_errors["Design Start"]), 0)
+
+    def test_dirty_dates_set_dtypes(self):
+        """Ensure default dirty data converts with set_dtypes errors logged"""
+        Base = BaseData(self.generator.generate(2000), copy_input=False)
+        Base.set_dtypes(map_dict={"Date Reported As Of": "datetime"})
+        self.assertTrue(len(Base.dtype_errors["Date Reported As Of"]) > 0)
+
+    def test_to_file_csv(self):
+        """Ensure to_file streams chunks to a single csv"""
+        with tempfile.TemporaryDirectory() as tmp:
+            fp = os.path.join(tmp, "synthetic.csv")
+            self.generator.to_file(fp, 250, chunksize=100)
+            df = pd.read_csv(fp)
+            self.assertEqual(len(df), 250)
+            self.assertEqual(df["PID"].dropna().duplicated().any(), True)
+
+    def test_generate_zero_rows(self):
+        """Ensure zero rows give an empty dataframe with all columns"""
+        df = self.generator.generate_chunk(0)
+        self.assertEqual(len(df), 0)
+        self.assertListEqual(
+            list(df.columns), list(self.generator.generate(10).columns)
+        )
+        self.assertEqual(len(self.generator.generate(0)), 0)
+
+    def test_to_file_zero_rows(self):
+        """Ensure to_file writes only the header for zero rows"""
+        with tempfile.TemporaryDirectory() as tmp:
+            fp = os.path.join(tmp, "synthetic.csv")
+            self.generator.to_file(fp, 0)
+            df = pd.read_csv(fp)
+            self.assertEqual(len(df), 0)
+            self.assertIn("PID", df.columns)
+
+    def test_to_file_fail(self):
+        """Ensure to_file fails with unsupported filetype"""
+        with self.assertRaises(TypeError):
+            self.generator.to_file("synthetic.txt", 10)
+
+    def test_schedule_trajectory(self):
+        """Ensure total schedule changes start at zero for each project"""
+        df = self.generator.generate(500)
+        first = df.groupby("PID", sort=False).head(1)
+        self.assertTrue(np.all(first["Total Schedule Changes"] == 0))
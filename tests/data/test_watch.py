@@ -0,0 +1,141 @@
+"""
+Unit tests for caproj.data.watch module
+"""
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from caproj.data import BaseData
+from caproj.data.pipeline import Pipeline
+from caproj.data.watch import PipelineWatcher
+
+
+class PipelineWatcherTests(unittest.TestCase):
+    """Tests to ensure caproj.data.watch.PipelineWatcher functions properly"""
+
+    def setUp(self):
+        """Set up input, schema files and watcher for tests"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.fp = os.path.join(self.tmpdir.name, "input.csv")
+        pd.DataFrame(
+            {"PID": [2, 1], "a": ["1", "2"], "b": ["3", "4"]}
+        ).to_csv(self.fp, index=False)
+        self.dtypes_fp = os.path.join(self.tmpdir.name, "dtypes.json")
+        self.write_json(self.dtypes_fp, {"a": "float"})
+        self.out_fp = os.path.join(self.tmpdir.name, "out.csv")
+        self.pipeline = Pipeline(
+            [
+                {"step": "from_file", "filename": self.fp},
+                {"step": "rename_columns", "map_dict": {"b": "c"}},
+                {"step": "set_dtypes", "json_path": self.dtypes_fp},
+                {"step": "sort_values", "by": "PID"},
+                {"step": "to_file", "target_filename": self.out_fp},
+            ]
+        )
+        self.watcher = PipelineWatcher(self.pipeline, interval=0.01)
+
+    @staticmethod
+    def write_json(filepath, obj):
+        """Write json file and move its modification time forward"""
+        mtime = os.path.getmtime(filepath) + 10 if os.path.exists(filepath) \
+            else None
+        with open(filepath, "w") as f:
+            json.dump(obj, f)
+        if mtime is not None:
+            os.utime(filepath, (mtime, mtime))
+
+    def step_labels(self):
+        """Return labels of steps executed by the last update"""
+        return [label for label, _ in self.watcher.timings]
+
+    def test_first_update_runs_all_steps(self):
+        """Ensure the first update runs every step and writes output"""
+        data = self.watcher.update()
+        self.assertEqual(len(self.watcher.timings), 5)
+        self.assertEqual(data.df["a"].dtype.kind, "f")
+        self.assertListEqual(data.df["PID"].tolist(), [1, 2])
+        self.assertTrue(os.path.exists(self.out_fp))
+
+    def test_unchanged_update_only_writes(self):
+        """Ensure an update without changes only reruns to_file"""
+        self.watcher.update()
+        self.watcher.update()
+        self.assertListEqual(self.step_labels(), ["to_file"])
+
+    def test_schema_change_reconverts_changed_columns(self):
+        """Ensure a dtype schema change reconverts only changed columns"""
+        self.watcher.update()
+        self.write_json(self.dtypes_fp, {"a": "float", "c": "float"})
+        with mock.patch.object(
+            BaseData, "from_file", side_effect=AssertionError
+        ), mock.patch.object(
+            BaseData, "rename_columns", side_effect=AssertionError
+        ):
+            data = self.watcher.update()
+        self.assertListEqual(
+            self.step_labels(), ["set_dtypes[c]", "sort_values", "to_file"]
+        )
+        self.assertEqual(data.df["a"].dtype.kind, "f")
+        self.assertEqual(data.df["c"].dtype.kind, "f")
+
+    def test_schema_entry_removed_restores_input_column(self):
+        """Ensure a removed dtype entry restores the step's input column"""
+        self.watcher.update()
+        self.write_json(self.dtypes_fp, {})
+        data = self.watcher.update()
+        self.assertListEqual(
+            self.step_labels(), ["set_dtypes[a]", "sort_values", "to_file"]
+        )
+        self.assertListEqual(data.df["a"].tolist(), [2, 1])
+
+    def test_matches_full_run(self):
+        """Ensure incremental results match a full pipeline run"""
+        self.watcher.update()
+        self.write_json(self.dtypes_fp, {"c": "string"})
+        data = self.watcher.update()
+        expected = self.pipeline.run()
+        pd.testing.assert_frame_equal(data.df, expected.df)
+
+    def test_input_change_reruns_all_steps(self):
+        """Ensure an input file change reruns every step"""
+        self.watcher.update()
+        pd.DataFrame({"PID": [3], "a": ["5"], "b": ["6"]}).to_csv(
+            self.fp, index=False
+        )
+        data = self.watcher.update()
+        self.assertEqual(len(self.watcher.timings), 5)
+        self.assertListEqual(data.df["PID"].tolist(), [3])
+
+    def test_check(self):
+        """Ensure check updates only after source files change"""
+        self.assertTrue(self.watcher.check())
+        self.assertFalse(self.watcher.check())
+        self.write_json(self.dtypes_fp, {"a": "float"})
+        self.assertTrue(self.watcher.check())
+
+    def test_check_failed_update(self):
+        """Ensure a failed update is logged and waits for the next change"""
+        self.watcher.update()
+        with open(self.dtypes_fp, "w") as f:
+            f.write("{invalid")
+        mtime = os.path.getmtime(self.dtypes_fp) + 10
+        os.utime(self.dtypes_fp, (mtime, mtime))
+        self.assertFalse(self.watcher.check())
+        self.assertFalse(self.watcher.check())
+
+    def test_watch_stop(self):
+        """Ensure watch loop runs the pipeline and stops"""
+        thread = threading.Thread(target=self.watcher.watch)
+        thread.start()
+        while self.watcher.data is None and thread.is_alive():
+            thread.join(0.01)
+        self.watcher.stop()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertIsNotNone(self.watcher.data)
@@ -0,0 +1,120 @@
+"""
+Unit tests for caproj.features.engine module
+"""
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from caproj.data import BaseData
+from caproj.features import FEATURES, FeatureEngine, register_feature
+
+
+class FeatureEngineTests(unittest.TestCase):
+    """Tests to ensure caproj.features.engine functions properly"""
+
+    def setUp(self):
+        """Set up unsorted change records of two projects"""
+        self.df = pd.DataFrame(
+            {
+                "PID": [2, 1, 1, 2, 1],
+                "Date Reported As Of": [
+                    "2020-03-01", "2020-02-01", "2020-01-01", "2020-01-01",
+                    "2020-03-01",
+                ],
+                "Design Start": ["2019-01-01"] * 5,
+                "Budget Forecast": ["200", "150", "100", "100", "n/a"],
+                "Forecast Completion": [
+                    "2021-03-01", "2021-01-11", "2021-01-01", "2021-01-01",
+                    "2021-01-31",
+                ],
+            },
+            index=[10, 11, 12, 13, 14],
+        )
+        self.engine = FeatureEngine(BaseData(self.df, copy_input=False))
+
+    def test_budget_features(self):
+        """Ensure budget features follow report order within projects"""
+        features = self.engine.compute(
+            ["budget_growth_ratio", "budget_change"]
+        )
+        self.assertListEqual(list(features.index), [10, 11, 12, 13, 14])
+        np.testing.assert_allclose(
+            features["budget_growth_ratio"], [1.0, 0.5, 0.0, 0.0, np.nan]
+        )
+        np.testing.assert_allclose(
+            features["budget_change"], [100.0, 50.0, np.nan, np.nan, np.nan]
+        )
+
+    def test_schedule_and_count_features(self):
+        """Ensure schedule slip, change count and age are computed"""
+        features = self.engine.compute(
+            ["schedule_slip_days", "change_count", "project_age_days"]
+        )
+        self.assertListEqual(
+            features["schedule_slip_days"].tolist(), [59, 10, 0, 0, 30]
+        )
+        self.assertListEqual(features["change_count"].tolist(), [2, 2, 1, 1, 3])
+        self.assertEqual(features.loc[12, "project_age_days"], 365)
+
+    def test_missing_ids_grouped(self):
+        """Ensure records with a missing ID form one group"""
+        df = self.df.assign(PID=[2, np.nan, 1, 2, np.nan])
+        features = FeatureEngine(df).compute(["change_count"])
+        self.assertListEqual(features["change_count"].tolist(), [2, 1, 1, 1, 2])
+
+    def test_only_requirements_computed(self):
+        """Ensure only requested features and their requirements are computed"""
+        self.engine.compute(["budget_growth_ratio"])
+        self.assertSetEqual(
+            set(self.engine._values),
+            {"budget", "initial_budget", "budget_growth_ratio"},
+        )
+
+    def test_linted_column_names(self):
+        """Ensure input columns are found after lint_colnames"""
+        data = BaseData(self.df.copy(), copy_input=False)
+        data.lint_colnames()
+        features = FeatureEngine(data).compute(["change_frequency"])
+        self.assertEqual(features.shape, (5, 1))
+
+    def test_missing_column(self):
+        """Ensure a missing input column raises KeyError"""
+        engine = FeatureEngine(self.df.drop(columns="Budget Forecast"))
+        with self.assertRaises(KeyError):
+            engine.compute(["budget"])
+
+    def test_resolve(self):
+        """Ensure dependency order, unknown features and cycles"""
+        order = self.engine.resolve(["change_frequency"])
+        self.assertLess(order.index("change_count"), order.index("change_frequency"))
+        self.assertLess(order.index("report_date"), order.index("project_age_days"))
+        with self.assertRaises(KeyError):
+            self.engine.resolve(["unknown"])
+
+        registry = OrderedDict()
+        register_feature("a", requires=["b"], registry=registry)(lambda e: 0)
+        register_feature("b", requires=["a"], registry=registry)(lambda e: 0)
+        with self.assertRaises(ValueError):
+            FeatureEngine(self.df, registry=registry).resolve(["a"])
+
+    def test_custom_feature(self):
+        """Ensure registered custom features can read other features"""
+        registry = OrderedDict(FEATURES)
+
+        @register_feature("budget_millions", requires=["budget"], registry=registry)
+        def budget_millions(engine):
+            return engine["budget"] / 1e6
+
+        engine = FeatureEngine(self.df, registry=registry)
+        features = engine.compute(["budget_millions"])
+        self.assertAlmostEqual(features.loc[10, "budget_millions"], 0.0002)
+        self.assertNotIn("budget_millions", FEATURES)
+
+    def test_wrong_length(self):
+        """Ensure features of the wrong length raise ValueError"""
+        registry = OrderedDict()
+        register_feature("bad", registry=registry)(lambda e: [1])
+        with self.assertRaises(ValueError):
+            FeatureEngine(self.df, registry=registry).compute()
@@ -0,0 +1,79 @@
+"""
+Unit tests for caproj.features.incremental module
+"""
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from caproj.data.synthetic import SyntheticDataGenerator
+from caproj.features import (
+    FeatureEngine,
+    IncrementalFeatures,
+    project_signatures,
+)
+
+
+class IncrementalFeaturesTests(unittest.TestCase):
+    """Tests to ensure caproj.features.incremental functions properly"""
+
+    def setUp(self):
+        """Set up synthetic records and an updated copy"""
+        self.df = SyntheticDataGenerator(seed=3).generate(500)
+        self.df = self.df[self.df["PID"].notnull()].reset_index(drop=True)
+        pids = self.df["PID"].unique()
+        self.pid_changed, self.pid_removed = pids[0], pids[1]
+
+        new = self.df[self.df["PID"] != self.pid_removed].copy()
+        row = new.index[new["PID"] == self.pid_changed][0]
+        new.loc[row, "Budget Forecast"] = "123"
+        added = new[new["PID"] == self.pid_changed].iloc[:1].copy()
+        added["Date Reported As Of"] = "2030-01-01"
+        new_project = added.assign(PID=-1.0)
+        # shuffle and reindex to ensure records are matched by content
+        self.new_df = (
+            pd.concat([new, added, new_project])
+            .sample(frac=1, random_state=0)
+            .set_axis(range(1000, 1000 + len(new) + 2), axis=0)
+        )
+
+    def test_project_signatures(self):
+        """Ensure signatures ignore record order and detect changes"""
+        sig = project_signatures(self.df)
+        shuffled = project_signatures(self.df.sample(frac=1, random_state=1))
+        pd.testing.assert_series_equal(sig, shuffled.loc[sig.index])
+        self.assertEqual(sig.dtype, "uint64")
+        self.assertEqual(len(sig), self.df["PID"].nunique())
+
+    def test_update_matches_full_compute(self):
+        """Ensure incremental features equal a full recomputation"""
+        features = IncrementalFeatures()
+        first = features.update(self.df)
+        pd.testing.assert_frame_equal(first, FeatureEngine(self.df).compute())
+
+        updated = features.update(self.new_df)
+        self.assertSetEqual(
+            set(features.changed_ids), {self.pid_changed, -1.0}
+        )
+        expected = FeatureEngine(self.new_df).compute()
+        pd.testing.assert_frame_equal(updated, expected)
+
+    def test_update_unchanged(self):
+        """Ensure an update without changes recomputes nothing"""
+        features = IncrementalFeatures(names=["budget", "change_count"])
+        first = features.update(self.df)
+        second = features.update(self.df.iloc[::-1])
+        self.assertEqual(len(features.changed_ids), 0)
+        pd.testing.assert_frame_equal(second, first.iloc[::-1])
+
+    def test_pickle(self):
+        """Ensure state persists across processes via pickle"""
+        features = IncrementalFeatures(names=["change_count"])
+        features.update(self.df)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = os.path.join(tmpdir, "features.pkl")
+            features.to_pickle(fp)
+            loaded = IncrementalFeatures.read_pickle(fp)
+        loaded.update(self.new_df)
+        self.assertEqual(len(loaded.changed_ids), 2)
@@ -0,0 +1,110 @@
+"""
+Unit tests for caproj.features.store module
+"""
+import os
+import tempfile
+import unittest
+from collections import OrderedDict
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from caproj.features import FEATURES, FeatureStore, register_feature
+
+
+class FeatureStoreTests(unittest.TestCase):
+    """Tests to ensure caproj.features.store functions properly"""
+
+    def setUp(self):
+        """Set up records, registry and store for tests"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.df = pd.DataFrame(
+            {
+                "PID": [1, 1, 2],
+                "Date Reported As Of": ["2020-01-01", "2020-02-01", "2020-01-01"],
+                "Budget Forecast": [100, 150, 200],
+            },
+            index=[5, 6, 7],
+        )
+        self.registry = OrderedDict(FEATURES)
+        self.store = FeatureStore(self.tmpdir.name, registry=self.registry)
+        self.names = ["budget", "budget_growth_ratio", "change_count"]
+
+    def compute_calls(self, func):
+        """Return names of features computed while running func"""
+        from caproj.features.engine import FeatureEngine
+
+        with mock.patch.object(
+            FeatureEngine, "compute", autospec=True,
+            side_effect=FeatureEngine.compute,
+        ) as compute_patch:
+            result = func()
+        names = [name for call in compute_patch.call_args_list
+                 for name in call[0][1]]
+        return result, names
+
+    def test_load_computes_then_reuses(self):
+        """Ensure features are computed once and then memory-mapped"""
+        first, computed = self.compute_calls(
+            lambda: self.store.load(self.df, self.names)
+        )
+        self.assertListEqual(computed, self.names)
+        second, computed = self.compute_calls(
+            lambda: self.store.load(self.df, self.names)
+        )
+        self.assertListEqual(computed, [])
+        pd.testing.assert_frame_equal(first, second)
+        self.assertListEqual(list(second.index), [5, 6, 7])
+
+    def test_load_arrays_memory_mapped(self):
+        """Ensure stored arrays are returned memory-mapped, not copied"""
+        self.store.load(self.df, self.names)
+        arrays, index = self.store.load_arrays(self.df, self.names)
+        self.assertListEqual(list(arrays), self.names)
+        for array in arrays.values():
+            self.assertIsInstance(array, np.memmap)
+        self.assertListEqual(list(index), [5, 6, 7])
+        arrays, _ = self.store.load_arrays(self.df, ["budget"], mmap=False)
+        self.assertNotIsInstance(arrays["budget"], np.memmap)
+
+    def test_only_stale_features_computed(self):
+        """Ensure a version bump recomputes the feature and its dependents"""
+        self.store.load(self.df, self.names)
+        feature = self.registry["budget"]
+        self.registry["budget"] = feature._replace(version=feature.version + 1)
+        store = FeatureStore(self.tmpdir.name, registry=self.registry)
+        _, computed = self.compute_calls(lambda: store.load(self.df, self.names))
+        self.assertListEqual(computed, ["budget", "budget_growth_ratio"])
+        removed = store.prune()
+        self.assertEqual(len(removed), 2)
+
+    def test_changed_data_recomputes(self):
+        """Ensure changed input records use a different dataset key"""
+        self.store.load(self.df, ["budget"])
+        df = self.df.copy()
+        df.loc[7, "Budget Forecast"] = 300
+        features, computed = self.compute_calls(
+            lambda: self.store.load(df, ["budget"])
+        )
+        self.assertListEqual(computed, ["budget"])
+        self.assertEqual(features.loc[7, "budget"], 300)
+
+    def test_data_key_and_object_features(self):
+        """Ensure explicit data keys and object dtype features load"""
+        register_feature("label", registry=self.registry)(
+            lambda engine: engine.ids.astype(str) + "x"
+        )
+        features = self.store.load(self.df, ["label"], data_key="run1")
+        self.assertTrue(
+            os.path.exists(self.store.path("run1", "label"))
+        )
+        features = self.store.load(self.df, ["label"], data_key="run1")
+        self.assertListEqual(features["label"].tolist(), ["1x", "1x", "2x"])
+
+    def test_stored_length_mismatch(self):
+        """Ensure stored features of a different length raise ValueError"""
+        self.store.load(self.df, ["budget"], data_key="run1")
+        with self.assertRaises(ValueError):
+            self.store.load(self.df.iloc[:2], ["budget"], data_key="run1")
@@ -0,0 +1,141 @@
+"""
+Unit tests for caproj.features.text module
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from caproj.features import HashingVectorizer
+from caproj.features.text import iter_text_chunks
+
+try:
+    import scipy.sparse  # noqa: F401
+
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+
+def dense(arrays):
+    """Return dense array of CSR arrays"""
+    data, indices, indptr, shape = arrays
+    out = np.zeros(shape)
+    for row in range(shape[0]):
+        start, end = indptr[row], indptr[row + 1]
+        out[row, indices[start:end]] = data[start:end]
+    return out
+
+
+class HashingVectorizerTests(unittest.TestCase):
+    """Tests to ensure caproj.features.text functions properly"""
+
+    def setUp(self):
+        """Set up texts for tests"""
+        self.texts = pd.Series(
+            ["Bridge repair Bronx", None, "bridge BRIDGE", "a", "new school"]
+        )
+
+    def test_transform_arrays_counts(self):
+        """Ensure token counts land in hashed columns of the right rows"""
+        vec = HashingVectorizer(
+            n_features=2 ** 10, alternate_sign=False, norm=None
+        )
+        data, indices, indptr, shape = vec.transform_arrays(self.texts)
+        self.assertEqual(shape, (5, 2 ** 10))
+        self.assertListEqual(list(np.diff(indptr)), [3, 0, 1, 0, 2])
+        self.assertEqual(data[indptr[2]], 2)
+        row0 = dict(zip(indices[:3], data[:3]))
+        bridge = indices[indptr[2]]
+        self.assertEqual(row0[bridge], 1)
+        self.assertTrue(all(np.diff(indices[:3]) > 0))
+
+    def test_norm(self):
+        """Ensure rows are l2 or l1 normalized"""
+        for norm, ord in [("l2", 2), ("l1", 1)]:
+            matrix = dense(HashingVectorizer(norm=norm).transform_arrays(
+                self.texts
+            ))
+            norms = np.linalg.norm(matrix, ord=ord, axis=1)
+            np.testing.assert_allclose(norms, [1, 0, 1, 0, 1], rtol=1e-6)
+        with self.assertRaises(ValueError):
+            HashingVectorizer(norm="max")
+
+    def test_ngrams(self):
+        """Ensure bigrams do not cross text boundaries"""
+        vec = HashingVectorizer(ngram_range=(1, 2), norm=None)
+        _, _, indptr, _ = vec.transform_arrays(["a bb cc", "dd ee"])
+        self.assertListEqual(list(np.diff(indptr)), [3, 3])
+        _, _, indptr, _ = HashingVectorizer(ngram_range=(2, 2)).transform_arrays(
+            ["bb", "cc dd"]
+        )
+        self.assertListEqual(list(np.diff(indptr)), [0, 1])
+
+    def test_empty(self):
+        """Ensure texts without tokens give an empty matrix"""
+        data, indices, indptr, shape = HashingVectorizer().transform_arrays(
+            ["", None]
+        )
+        self.assertEqual(len(data), 0)
+        self.assertListEqual(list(indptr), [0, 0, 0])
+
+    def test_hash_stable_across_processes(self):
+        """Ensure columns do not depend on the process hash seed"""
+        code = (
+            "from caproj.features import HashingVectorizer; "
+            "print(list(HashingVectorizer().transform_arrays(['bridge'])[1]))"
+        )
+        outputs = {
+            subprocess.run(
+                [sys.executable, "-c", code],
+                env=dict(os.environ, PYTHONHASHSEED=seed),
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+                check=True,
+            ).stdout.strip()
+            for seed in ["1", "2"]
+        }
+        self.assertEqual(len(outputs), 1)
+        self.assertRegex(outputs.pop(), r"^\[\d+\]$")
+
+    def test_chunks_match_full(self):
+        """Ensure chunked arrays equal the arrays of all texts"""
+        vec = HashingVectorizer(n_features=64)
+        full = dense(vec.transform_arrays(self.texts))
+        chunks = [
+            dense(vec.transform_arrays(chunk))
+            for chunk in iter_text_chunks(self.texts, chunksize=2)
+        ]
+        np.testing.assert_allclose(np.vstack(chunks), full)
+
+    def test_transform_chunk_arrays_pool(self):
+        """Ensure chunks transformed in a pool stack to the full arrays"""
+        vec = HashingVectorizer(n_features=64)
+        full = dense(vec.transform_arrays(self.texts))
+        for workers in [1, 2]:
+            chunks = list(
+                vec.transform_chunk_arrays(self.texts, chunksize=2, workers=workers)
+            )
+            self.assertEqual(len(chunks), 3)
+            np.testing.assert_allclose(
+                np.vstack([dense(arrays) for arrays in chunks]), full
+            )
+
+    @unittest.skipIf(HAS_SCIPY, "scipy is installed")
+    def test_transform_requires_scipy(self):
+        """Ensure sparse matrix output raises ImportError without scipy"""
+        with self.assertRaises(ImportError):
+            HashingVectorizer().transform(self.texts)
+
+    @unittest.skipUnless(HAS_SCIPY, "scipy is not installed")
+    def test_transform_chunks_pool(self):
+        """Ensure chunks transformed in a pool stack to the full matrix"""
+        vec = HashingVectorizer(n_features=64)
+        full = vec.transform(self.texts)
+        chunks = list(vec.transform_chunks(self.texts, chunksize=2, workers=2))
+        self.assertEqual(len(chunks), 3)
+        stacked = scipy.sparse.vstack(chunks)
+        np.testing.assert_allclose(stacked.toarray(), full.toarray())
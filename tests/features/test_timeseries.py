@@ -0,0 +1,76 @@
+"""
+Unit tests for caproj.features.timeseries module
+"""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from caproj.data import BaseData
+from caproj.features import resample_projects
+
+
+class ResampleProjectsTests(unittest.TestCase):
+    """Tests to ensure caproj.features.timeseries functions properly"""
+
+    def setUp(self):
+        """Set up unsorted change records of two projects"""
+        self.df = pd.DataFrame(
+            {
+                "PID": [2, 1, 1, 2, 1, None],
+                "Date Reported As Of": [
+                    "2020-03-15", "2020-02-01", "2020-01-10", "2020-01-01",
+                    "2020-04-01", "2020-01-01",
+                ],
+                "Design Start": ["2019-01-01"] * 6,
+                "Budget Forecast": ["200", "150", "100", "100", "n/a", "5"],
+                "Forecast Completion": [
+                    "2021-03-01", "2021-01-11", "2021-01-01", "2021-01-01",
+                    "2021-01-31", "2021-01-01",
+                ],
+            }
+        )
+        self.data = BaseData(self.df, copy_input=False)
+
+    def test_ffill(self):
+        """Ensure months hold the last value reported by the month's end"""
+        series = resample_projects(self.data)
+        self.assertListEqual(list(series.ids), [1, 2])
+        self.assertListEqual(
+            [str(month) for month in series.months],
+            ["2020-01", "2020-02", "2020-03", "2020-04"],
+        )
+        np.testing.assert_array_equal(
+            series["budget"], [[100, 150, 150, 150], [100, 100, 200, 200]]
+        )
+        completion = series.to_frame("forecast_completion")
+        self.assertEqual(completion.iloc[0, 3], pd.Timestamp("2021-01-31"))
+        self.assertEqual(completion.iloc[1, 1], pd.Timestamp("2021-01-01"))
+        self.assertEqual(series["forecast_completion"].dtype, "datetime64[ns]")
+
+    def test_interpolate(self):
+        """Ensure months are interpolated in time between records"""
+        series = resample_projects(self.data, method="interpolate")
+        budget = series["budget"]
+        # end of January is 31 of the 74 days between the records of PID 2
+        self.assertAlmostEqual(budget[1, 0], 100 + 100 * 31 / 74, places=3)
+        np.testing.assert_allclose(budget[1, 2:], [200, 200])
+        np.testing.assert_allclose(budget[0, 1:], [150, 150, 150])
+
+    def test_grid_bounds(self):
+        """Ensure months before a project's first record are missing"""
+        series = resample_projects(
+            self.df, names=["budget"], start="2019-12", end="2020-02"
+        )
+        self.assertListEqual(list(series.arrays), ["budget"])
+        self.assertEqual(series["budget"].shape, (2, 3))
+        self.assertTrue(np.isnan(series["budget"][:, 0]).all())
+        np.testing.assert_array_equal(series["budget"][:, 2], [150, 100])
+
+    def test_invalid(self):
+        """Ensure an invalid method or missing dates raise ValueError"""
+        with self.assertRaises(ValueError):
+            resample_projects(self.df, method="nearest")
+        self.df["Date Reported As Of"] = None
+        with self.assertRaises(ValueError):
+            resample_projects(self.df)
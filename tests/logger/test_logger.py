@@ -1,5 +1,11 @@
+import json
 import logging
+import logging.config
 import os
+import pstats
+import queue
+import threading
+import time
 from unittest import TestCase, mock
 from tempfile import TemporaryDirectory
 
@@ -63,3 +69,339 @@ class TestLogFunc(TestCase):
         with self.assertLogs('test', level='INFO') as logmsg:
             self.test_func_no_docstring()
             self.assertTrue("No docstring provided" in logmsg.output[1])
+
+
+class TestQueueLogging(TestCase):
+    """Test queue-based start_logging configuration"""
+
+    def setUp(self):
+        """Preserve root logger handlers and stop any listener after tests"""
+        root = logging.getLogger()
+        self.root_handlers = list(root.handlers)
+        self.addCleanup(self.restore_root_handlers)
+
+    def restore_root_handlers(self):
+        """Stop listener and restore original root logger handlers"""
+        logger.stop_logging()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in self.root_handlers:
+            root.addHandler(handler)
+
+    def test_start_logging_queue_param(self):
+        """Ensure use_queue parameter installs BoundedQueueHandler on root"""
+        logger.start_logging(
+            default_path='foo.json', env_key='foo', use_queue=True
+        )
+        handlers = logging.getLogger().handlers
+        self.assertEqual(len(handlers), 1)
+        self.assertIsInstance(handlers[0], logger.BoundedQueueHandler)
+        self.assertIsNotNone(logger.get_log_queue())
+
+    def test_start_logging_queue_json(self):
+        """Ensure queue mode is selectable from json configuration"""
+        config = {
+            'version': 1,
+            'disable_existing_loggers': False,
+            'handlers': {'null': {'class': 'logging.NullHandler'}},
+            'root': {'level': 'INFO', 'handlers': ['null']},
+            'queue': {'enabled': True, 'maxsize': 5, 'overflow': 'block'},
+        }
+        with TemporaryDirectory() as tmp:
+            fp = os.path.join(tmp, 'foo.json')
+            with open(fp, 'w') as f:
+                json.dump(config, f)
+            logger.start_logging(default_path=fp, env_key='foo')
+        handler = logging.getLogger().handlers[0]
+        self.assertIsInstance(handler, logger.BoundedQueueHandler)
+        self.assertEqual(handler.overflow, 'block')
+        self.assertEqual(handler.queue.maxsize, 5)
+
+    def test_start_logging_queue_params_override_json(self):
+        """Ensure explicit queue parameters take precedence over json"""
+        config = {
+            'version': 1,
+            'disable_existing_loggers': False,
+            'handlers': {'null': {'class': 'logging.NullHandler'}},
+            'root': {'level': 'INFO', 'handlers': ['null']},
+            'queue': {'enabled': True, 'maxsize': 5, 'overflow': 'block'},
+        }
+        with TemporaryDirectory() as tmp:
+            fp = os.path.join(tmp, 'foo.json')
+            with open(fp, 'w') as f:
+                json.dump(config, f)
+            logger.start_logging(
+                default_path=fp, env_key='foo', queue_overflow='drop'
+            )
+        handler = logging.getLogger().handlers[0]
+        self.assertEqual(handler.overflow, 'drop')
+        self.assertEqual(handler.queue.maxsize, 5)
+
+    def test_worker_initializer(self):
+        """Ensure workers forward records only to a multiprocessing queue"""
+        self.assertEqual(logger.worker_initializer(), (None, ()))
+        logger.start_logging(
+            default_path='foo.json', env_key='foo', use_queue=True
+        )
+        self.assertEqual(logger.worker_initializer(), (None, ()))
+        logger.stop_logging()
+        logger.start_logging(
+            default_path='foo.json',
+            env_key='foo',
+            use_queue=True,
+            queue_multiprocess=True,
+        )
+        initializer, initargs = logger.worker_initializer()
+        self.assertIs(initializer, logger.start_worker_logging)
+        self.assertEqual(initargs, (logger.get_log_queue(),))
+
+    def test_stop_logging_restores_handlers(self):
+        """Ensure stop_logging flushes queue and restores target handlers"""
+        logger.start_logging(
+            default_path='foo.json', env_key='foo', use_queue=True
+        )
+        logger.stop_logging()
+        handlers = logging.getLogger().handlers
+        self.assertFalse(
+            any(isinstance(h, logger.BoundedQueueHandler) for h in handlers)
+        )
+        self.assertIsNone(logger.get_log_queue())
+
+    def test_bounded_queue_handler_drops(self):
+        """Ensure records are dropped and counted when the queue is full"""
+        handler = logger.BoundedQueueHandler(queue.Queue(1), overflow='drop')
+        record = logging.makeLogRecord({'msg': 'foo', 'levelno': logging.INFO})
+        handler.emit(record)
+        handler.emit(record)
+        self.assertEqual(handler.dropped, 1)
+        self.assertEqual(handler.queue.qsize(), 1)
+
+    def test_bounded_queue_handler_invalid_overflow(self):
+        """Ensure invalid overflow policy raises ValueError"""
+        with self.assertRaises(ValueError):
+            logger.BoundedQueueHandler(queue.Queue(1), overflow='foo')
+
+    def test_bounded_queue_handler_forked_process(self):
+        """Ensure records bypass the local queue in a different process"""
+        target = mock.Mock(level=logging.NOTSET)
+        handler = logger.BoundedQueueHandler(queue.Queue(1), handlers=[target])
+        handler._pid = -1
+        handler.emit(logging.makeLogRecord({'msg': 'foo', 'levelno': logging.INFO}))
+        self.assertTrue(target.handle.called)
+        self.assertTrue(handler.queue.empty())
+
+
+class TestLogFuncProfile(TestCase):
+    """Test logfunc profiling hooks"""
+    log = logging.getLogger('test')
+
+    @logger.logfunc(log=log, profile=True)
+    def profiled_func(self, value):
+        """Decorated test function with profiling enabled"""
+        return value
+
+    @logger.logfunc(log=log)
+    def unprofiled_func(self, value):
+        """Decorated test function without profiling enabled"""
+        return value
+
+    def test_logfunc_profile_saves_pstats(self):
+        """Ensure profile option writes a loadable pstats file per call"""
+        with TemporaryDirectory() as tmp:
+            with mock.patch.dict(os.environ, {'CAPROJ_PROFILE_DIR': tmp}):
+                self.assertEqual(self.profiled_func('foo'), 'foo')
+                self.profiled_func('bar')
+            files = os.listdir(tmp)
+            self.assertEqual(len(files), 2)
+            self.assertTrue(all(f.startswith('profiled_func_') for f in files))
+            pstats.Stats(os.path.join(tmp, files[0]))
+
+    def test_logfunc_profile_env_key(self):
+        """Ensure profiling is enabled per function name via environment"""
+        with TemporaryDirectory() as tmp:
+            env = {'CAPROJ_PROFILE_DIR': tmp, 'CAPROJ_PROFILE': 'foo, unprofiled_func'}
+            with mock.patch.dict(os.environ, env):
+                self.unprofiled_func('foo')
+            self.assertEqual(len(os.listdir(tmp)), 1)
+
+    def test_profile_call_nested(self):
+        """Ensure nested profiled calls are captured by the outer profile"""
+        with TemporaryDirectory() as tmp:
+            with mock.patch.dict(os.environ, {'CAPROJ_PROFILE_DIR': tmp}):
+                self.assertEqual(
+                    logger.profile_call(self.profiled_func, 'foo'), 'foo'
+                )
+            self.assertEqual(len(os.listdir(tmp)), 1)
+
+    def test_profile_call_threads(self):
+        """Ensure concurrent profiled calls from threads do not interfere"""
+        started, release = threading.Event(), threading.Event()
+        results, errors = list(), list()
+
+        def slow(value):
+            started.set()
+            release.wait(10)
+            return value
+
+        def run(func, value, tmp):
+            try:
+                results.append(logger.profile_call(func, value, profile_dir=tmp))
+            except Exception as error:
+                errors.append(error)
+
+        with TemporaryDirectory() as tmp:
+            first = threading.Thread(target=run, args=(slow, 'foo', tmp))
+            first.start()
+            started.wait(10)
+            second = threading.Thread(target=run, args=(str, 'bar', tmp))
+            second.start()
+            second.join(10)
+            release.set()
+            first.join(10)
+            self.assertListEqual(errors, [])
+            self.assertListEqual(results, ['bar', 'foo'])
+            self.assertEqual(len(os.listdir(tmp)), 1)
+            self.assertEqual(
+                logger.profile_call(str, 'baz', profile_dir=tmp), 'baz'
+            )
+            self.assertEqual(len(os.listdir(tmp)), 2)
+
+    def test_logfunc_profile_not_requested(self):
+        """Ensure no profile is written when profiling is not requested"""
+        with TemporaryDirectory() as tmp:
+            env = {'CAPROJ_PROFILE_DIR': tmp, 'CAPROJ_PROFILE': 'foo'}
+            with mock.patch.dict(os.environ, env):
+                self.unprofiled_func('foo')
+            self.assertEqual(len(os.listdir(tmp)), 0)
+
+
+class TestJsonFormatter(TestCase):
+    """Test JsonFormatter structured log output"""
+
+    def test_json_formatter_fields(self):
+        """Ensure structured extra fields are emitted as JSON fields"""
+        record = logging.makeLogRecord(
+            {
+                'msg': 'foo', 'levelno': logging.INFO, 'levelname': 'INFO',
+                'name': 'test', 'function': 'bar', 'duration': 0.5,
+            }
+        )
+        entry = json.loads(logger.JsonFormatter().format(record))
+        self.assertEqual(entry['message'], 'foo')
+        self.assertEqual(entry['function'], 'bar')
+        self.assertEqual(entry['duration'], 0.5)
+        self.assertFalse('rows' in entry)
+
+    def test_json_formatter_truncates(self):
+        """Ensure long messages are truncated to max_message_length"""
+        record = logging.makeLogRecord({'msg': 'x' * 100})
+        entry = json.loads(
+            logger.JsonFormatter(max_message_length=10).format(record)
+        )
+        self.assertEqual(len(entry['message']), 10)
+        self.assertEqual(entry['truncated'], 100)
+
+    def test_logfunc_extra_fields(self):
+        """Ensure logfunc attaches function and duration to records"""
+        log = logging.getLogger('test')
+
+        @logger.logfunc(log=log, funcname=True, runtime=True)
+        def foo():
+            pass
+
+        with self.assertLogs('test', level='INFO') as logmsg:
+            foo()
+        self.assertEqual(logmsg.records[0].function, 'foo')
+        self.assertTrue(hasattr(logmsg.records[-1], 'duration'))
+
+    def test_logging_json_config(self):
+        """Ensure repo logging.json with json formatter loads via dictConfig"""
+        fp = os.path.join(
+            os.path.dirname(__file__), '..', '..', 'logging.json'
+        )
+        with open(fp) as f:
+            config = json.load(f)
+        config.pop('queue')
+        config['handlers']['console']['formatter'] = 'json'
+        config['handlers']['console']['filters'] = ['sampling']
+        root = logging.getLogger()
+        root_handlers, root_level = list(root.handlers), root.level
+        try:
+            logging.config.dictConfig(config)
+            handler = root.handlers[0]
+            self.assertIsInstance(handler.formatter, logger.JsonFormatter)
+            self.assertIsInstance(handler.filters[0], logger.SamplingFilter)
+        finally:
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            for handler in root_handlers:
+                root.addHandler(handler)
+            root.setLevel(root_level)
+
+
+class TestSamplingFilter(TestCase):
+    """Test SamplingFilter rate limiting and sampling"""
+
+    def make_record(self, level=logging.INFO):
+        """Return a record from a fixed source location"""
+        return logging.makeLogRecord(
+            {'msg': 'foo', 'levelno': level, 'name': 'test', 'lineno': 1}
+        )
+
+    def test_sampling_filter_rate_limit(self):
+        """Ensure at most max_per_interval records pass per event"""
+        sampler = logger.SamplingFilter(max_per_interval=3, interval=60)
+        passed = [sampler.filter(self.make_record()) for _ in range(10)]
+        self.assertEqual(sum(passed), 3)
+
+    def test_sampling_filter_logfunc_functions(self):
+        """Ensure functions decorated by logfunc are rate-limited apart"""
+        log = logging.getLogger('test.sampling')
+        sampler = logger.SamplingFilter(max_per_interval=3, interval=60)
+        log.addFilter(sampler)
+        self.addCleanup(log.removeFilter, sampler)
+
+        @logger.logfunc(log=log, funcname=True)
+        def func_a():
+            pass
+
+        @logger.logfunc(log=log, funcname=True)
+        def func_b():
+            pass
+
+        with self.assertLogs('test.sampling', level='INFO') as logmsg:
+            for _ in range(5):
+                func_a()
+            func_b()
+        self.assertEqual(len(logmsg.records), 4)
+        self.assertEqual(logmsg.records[-1].function, 'func_b')
+
+    def test_sampling_filter_sample_rate(self):
+        """Ensure sample_rate keeps every n-th record"""
+        sampler = logger.SamplingFilter(max_per_interval=None, sample_rate=0.25)
+        passed = [sampler.filter(self.make_record()) for _ in range(100)]
+        self.assertEqual(sum(passed), 25)
+
+    def test_sampling_filter_always_level(self):
+        """Ensure records at always_level are never dropped"""
+        sampler = logger.SamplingFilter(max_per_interval=1)
+        passed = [
+            sampler.filter(self.make_record(logging.WARNING)) for _ in range(5)
+        ]
+        self.assertTrue(all(passed))
+
+    def test_sampling_filter_reports_suppressed(self):
+        """Ensure suppressed count is attached to next passing record"""
+        sampler = logger.SamplingFilter(max_per_interval=1, interval=0.05)
+        for _ in range(4):
+            sampler.filter(self.make_record())
+        time.sleep(0.06)
+        record = self.make_record()
+        self.assertTrue(sampler.filter(record))
+        self.assertEqual(record.suppressed, 3)
+
+    def test_sampling_filter_invalid_rate(self):
+        """Ensure invalid sample_rate raises ValueError"""
+        with self.assertRaises(ValueError):
+            logger.SamplingFilter(sample_rate=0)
@@ -0,0 +1,40 @@
+"""
+Unit tests for caproj.models.estimators module
+"""
+import unittest
+
+import numpy as np
+
+from caproj.models import MeanRegressor, RidgeRegression
+
+
+class EstimatorTests(unittest.TestCase):
+    """Tests to ensure caproj.models.estimators functions properly"""
+
+    def setUp(self):
+        """Set up linear data for tests"""
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(200, 3))
+        self.y = self.X @ np.array([1.0, -2.0, 0.5]) + 3.0
+
+    def test_mean_regressor(self):
+        """Ensure the baseline predicts the training mean"""
+        model = MeanRegressor().fit(self.X, self.y)
+        np.testing.assert_allclose(model.predict(self.X[:2]), [self.y.mean()] * 2)
+        self.assertDictEqual(model.get_params(), {})
+
+    def test_ridge_regression(self):
+        """Ensure unregularized fit recovers coefficients and intercept"""
+        model = RidgeRegression(alpha=0.0).fit(self.X, self.y)
+        np.testing.assert_allclose(model.coef_, [1.0, -2.0, 0.5])
+        self.assertAlmostEqual(model.intercept_, 3.0)
+        np.testing.assert_allclose(model.predict(self.X), self.y)
+
+    def test_ridge_shrinkage(self):
+        """Ensure regularization shrinks the coefficients"""
+        coef = RidgeRegression(alpha=1e4).fit(self.X, self.y).coef_
+        self.assertLess(np.abs(coef).sum(), 0.5)
+        self.assertDictEqual(
+            RidgeRegression(alpha=2).get_params(),
+            {"alpha": 2, "fit_intercept": True},
+        )
@@ -0,0 +1,117 @@
+"""
+Unit tests for caproj.models.registry module
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from caproj.features.store import FeatureStore
+from caproj.models import MeanRegressor, ModelRegistry, RidgeRegression
+from caproj.models.registry import data_hash
+
+
+class ModelRegistryTests(unittest.TestCase):
+    """Tests to ensure caproj.models.registry functions properly"""
+
+    def setUp(self):
+        """Set up a registry and a fitted model"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.registry = ModelRegistry(self.tmpdir.name, cache_size=2)
+        self.X = pd.DataFrame({"a": [0.0, 1.0, 2.0, 3.0], "b": [1.0, 0.0, 1.0, 0.0]})
+        self.y = 2 * self.X["a"] + 1
+        self.model = RidgeRegression(alpha=0.0).fit(self.X, self.y)
+
+    def test_save_metadata(self):
+        """Ensure models are saved as increasing versions with metadata"""
+        version = self.registry.save(
+            self.model,
+            "budget",
+            data=self.X,
+            features=["budget_growth_ratio"],
+            metrics={"rmse": 0.0},
+            metadata={"target": "budget"},
+        )
+        self.assertEqual(version, 1)
+        mean_model = MeanRegressor().fit(self.X, self.y)
+        self.assertEqual(self.registry.save(mean_model, "budget"), 2)
+        self.assertListEqual(self.registry.versions("budget"), [1, 2])
+        self.assertListEqual(self.registry.names(), ["budget"])
+
+        info = self.registry.metadata("budget", 1)
+        self.assertEqual(info["model"], "caproj.models.estimators.RidgeRegression")
+        self.assertDictEqual(info["params"], {"alpha": 0.0, "fit_intercept": True})
+        self.assertEqual(info["data_hash"], data_hash(self.X))
+        self.assertDictEqual(
+            info["features"],
+            {"budget_growth_ratio": FeatureStore().feature_key("budget_growth_ratio")},
+        )
+        self.assertDictEqual(info["metrics"], {"rmse": 0.0})
+        self.assertListEqual(info["arrays"], ["coef_"])
+        self.assertEqual(info["target"], "budget")
+        self.assertEqual(self.registry.metadata("budget")["version"], 2)
+        dirname = os.path.join(self.tmpdir.name, "budget", "1")
+        self.assertListEqual(
+            sorted(os.listdir(dirname)), ["coef_.npy", "metadata.json", "model.pkl"]
+        )
+        with self.assertRaises(KeyError):
+            self.registry.metadata("budget", 3)
+
+    def test_load_mmap(self):
+        """Ensure array attributes are memory-mapped on load"""
+        self.registry.save(self.model, "budget")
+        model = self.registry.load("budget")
+        self.assertIsInstance(model.coef_, np.memmap)
+        np.testing.assert_allclose(model.predict(self.X), self.y)
+        self.assertIsInstance(self.model.coef_, np.ndarray)
+        self.assertNotIsInstance(
+            self.registry.load("budget", mmap=False).coef_, np.memmap
+        )
+        with self.assertRaises(KeyError):
+            self.registry.load("schedule")
+
+    def test_lru_cache(self):
+        """Ensure recently used models are cached and old ones evicted"""
+        for _ in range(3):
+            self.registry.save(self.model, "budget")
+        first = self.registry.load("budget", 1)
+        self.assertIs(self.registry.load("budget", 1), first)
+        self.registry.load("budget", 2)
+        self.registry.load("budget", 1)
+        self.registry.load("budget", 3)
+        # version 2 was least recently used and evicted
+        self.assertIs(self.registry.load("budget", 1), first)
+        self.assertEqual(len(self.registry._cache), 2)
+        self.registry.clear_cache()
+        self.assertIsNot(self.registry.load("budget", 1), first)
+
+    def test_save_version_taken(self):
+        """Ensure a version saved concurrently is skipped, not overwritten"""
+        self.registry.save(self.model, "budget", metadata={"run": 1})
+        # a stale listing, as if another process saved version 1 meanwhile
+        with mock.patch.object(self.registry, "versions", return_value=[]):
+            version = self.registry.save(self.model, "budget", metadata={"run": 2})
+        self.assertEqual(version, 2)
+        self.assertEqual(self.registry.metadata("budget", 1)["run"], 1)
+        self.assertEqual(self.registry.metadata("budget", 2)["version"], 2)
+        self.assertListEqual(
+            sorted(os.listdir(os.path.join(self.tmpdir.name, "budget"))), ["1", "2"]
+        )
+
+    def test_save_failure_cleans_up(self):
+        """Ensure a failed save leaves no temporary directory behind"""
+        self.model.unpicklable = lambda: None
+        with self.assertRaises(Exception):
+            self.registry.save(self.model, "budget")
+        self.assertListEqual(os.listdir(os.path.join(self.tmpdir.name, "budget")), [])
+        self.assertListEqual(self.registry.versions("budget"), [])
+
+    def test_data_hash(self):
+        """Ensure data hash changes with the data"""
+        self.assertEqual(data_hash(self.X), data_hash(self.X.copy()))
+        self.assertNotEqual(data_hash(self.X), data_hash(self.X * 2))
+        self.assertNotEqual(data_hash(self.X.values), data_hash(self.X))
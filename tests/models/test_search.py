@@ -0,0 +1,118 @@
+"""
+Unit tests for caproj.models.search module
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from caproj.models import expand_grid, successive_halving
+from caproj.models.search import _rank_trials
+from caproj.models.validation import _run_fold
+
+
+class SuccessiveHalvingTests(unittest.TestCase):
+    """Tests to ensure caproj.models.search functions properly"""
+
+    def setUp(self):
+        """Set up linear data and a ridge regression grid"""
+        rng = np.random.default_rng(0)
+        self.X = pd.DataFrame(rng.normal(size=(900, 3)), columns=list("abc"))
+        self.y = self.X @ np.array([1.0, -2.0, 0.5]) + rng.normal(size=900)
+        self.grid = {"alpha": [0.0, 1.0, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9]}
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.checkpoint = os.path.join(self.tmpdir.name, "search", "trials.jsonl")
+
+    def search(self, **kwargs):
+        """Run the search of the test grid"""
+        return successive_halving(
+            self.X,
+            self.y,
+            "caproj.models.estimators.RidgeRegression",
+            self.grid,
+            **dict({"workers": 1, "checkpoint": self.checkpoint}, **kwargs)
+        )
+
+    def test_expand_grid(self):
+        """Ensure grids expand to every combination"""
+        configs = expand_grid([{"b": [1, 2], "a": [3]}, {"c": [4]}])
+        self.assertListEqual(
+            configs, [{"a": 3, "b": 1}, {"a": 3, "b": 2}, {"c": 4}]
+        )
+
+    def test_rungs(self):
+        """Ensure configurations are cut and records grow by eta per rung"""
+        summary = self.search()
+        self.assertListEqual(
+            [rung["trials"] for rung in summary["rungs"]], [9, 3, 1]
+        )
+        self.assertListEqual(
+            [rung["resource"] for rung in summary["rungs"]], [66, 200, 600]
+        )
+        self.assertLess(summary["best_params"]["alpha"], 1e4)
+        self.assertEqual(summary["resumed"], 0)
+
+        summary = self.search(metric="r2", checkpoint=None, min_resource=300)
+        self.assertListEqual(
+            [rung["resource"] for rung in summary["rungs"]], [300, 600]
+        )
+        self.assertGreater(summary["best_score"], 0.8)
+
+    def test_resume(self):
+        """Ensure an interrupted search resumes from its checkpoint"""
+        best = self.search()["best_params"]
+        with open(self.checkpoint) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 14)
+        with open(self.checkpoint, "w") as f:
+            f.write("\n".join(lines[:5]) + "\n" + lines[5][:10])
+        summary = self.search(workers=2)
+        self.assertEqual(summary["resumed"], 4)
+        with open(self.checkpoint) as f:
+            self.assertEqual(len(f.read().splitlines()), 14)
+        self.assertDictEqual(summary["best_params"], best)
+        self.assertEqual(self.search()["resumed"], 13)
+
+        with self.assertRaises(ValueError):
+            self.search(metric="mae")
+
+    def test_last_rung_uncapped(self):
+        """Ensure only rungs before the last cap the training records"""
+        with mock.patch(
+            "caproj.models.search._run_fold", wraps=_run_fold
+        ) as run_fold_patch:
+            summary = self.search(checkpoint=None)
+        max_train = [call[0][5] for call in run_fold_patch.call_args_list]
+        # 9 + 3 trials of 3 folds are capped, the final trial is not
+        self.assertListEqual(max_train[-3:], [None] * 3)
+        self.assertNotIn(None, max_train[:-3])
+        self.assertEqual(len(max_train), 3 * sum(
+            rung["trials"] for rung in summary["rungs"]
+        ))
+
+    def test_rank_trials_nan_last(self):
+        """Ensure trials with a NaN score rank after all scored trials"""
+        trials = [
+            {"status": "ok", "score": score, "id": i}
+            for i, score in enumerate([2.0, float("nan"), 1.0, 3.0])
+        ]
+        trials.append({"status": "failed", "score": None, "id": 4})
+        for sign, expected in [(1, [2, 0, 3, 1]), (-1, [3, 0, 2, 1])]:
+            ranked = _rank_trials(trials, sign)
+            self.assertListEqual([trial["id"] for trial in ranked], expected)
+
+    def test_failed_trials(self):
+        """Ensure failed trials are never promoted"""
+        self.grid = [{"alpha": ["bad", "worse"]}, {"alpha": [1.0]}]
+        summary = self.search(checkpoint=None, eta=2)
+        self.assertEqual(summary["rungs"][0]["failed"], 2)
+        self.assertDictEqual(summary["best_params"], {"alpha": 1.0})
+        statuses = [trial["status"] for trial in summary["trials"]]
+        self.assertListEqual(statuses[3:], ["ok"])
+
+        with self.assertRaises(ValueError):
+            self.search(eta=1)
@@ -0,0 +1,105 @@
+"""
+Unit tests for caproj.models.validation module
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from caproj.models import RidgeRegression, assign_folds, cross_validate
+from caproj.models.validation import resolve_model
+
+
+class CrossValidationTests(unittest.TestCase):
+    """Tests to ensure caproj.models.validation functions properly"""
+
+    def setUp(self):
+        """Set up feature table of linear data with project IDs"""
+        rng = np.random.default_rng(0)
+        n = 120
+        self.df = pd.DataFrame(
+            {
+                "a": rng.normal(size=n),
+                "b": rng.normal(size=n),
+                "PID": np.repeat(np.arange(20), 6),
+            }
+        )
+        self.df["target"] = 2 * self.df["a"] - self.df["b"]
+        self.df.loc[0, "a"] = np.nan
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_assign_folds(self):
+        """Ensure folds are balanced and groups stay in one fold"""
+        fold_ids = assign_folds(10, folds=3, shuffle=False)
+        self.assertListEqual(list(np.bincount(fold_ids)), [4, 3, 3])
+        groups = self.df["PID"]
+        fold_ids = assign_folds(len(groups), folds=4, groups=groups)
+        per_group = pd.Series(fold_ids).groupby(groups).nunique()
+        self.assertTrue((per_group == 1).all())
+        self.assertListEqual(list(np.bincount(fold_ids)), [30] * 4)
+        with self.assertRaises(ValueError):
+            assign_folds(10, folds=4, groups=[1, 2, 3] * 3 + [1])
+        with self.assertRaisesRegex(ValueError, "no records"):
+            assign_folds(10, folds=3, groups=[1] * 8 + [2, 3], shuffle=False)
+
+    def test_resolve_model(self):
+        """Ensure models resolve from import paths"""
+        self.assertIs(
+            resolve_model("caproj.models.estimators.RidgeRegression"),
+            RidgeRegression,
+        )
+        with self.assertRaises(ImportError):
+            resolve_model("caproj.models.estimators.Missing")
+
+    def test_cross_validate(self):
+        """Ensure folds are scored and missing records are dropped"""
+        features = self.df[["a", "b", "target"]]
+        summary = cross_validate(
+            features,
+            "target",
+            "caproj.models.estimators.RidgeRegression",
+            params={"alpha": 0.0},
+            folds=4,
+            groups=self.df["PID"],
+            workers=1,
+            tmpdir=self.tmpdir.name,
+        )
+        self.assertEqual(summary["succeeded"], 4)
+        self.assertEqual(summary["records"], 119)
+        self.assertAlmostEqual(summary["metrics"]["r2"], 1.0)
+        self.assertLess(summary["metrics"]["rmse"], 1e-8)
+        result = summary["results"][0]
+        self.assertEqual(result["n_train"] + result["n_test"], 119)
+        self.assertGreaterEqual(result["fit_seconds"], 0)
+        self.assertListEqual(os.listdir(self.tmpdir.name), [])
+
+    def test_cross_validate_pool(self):
+        """Ensure folds run in a process pool and failures are isolated"""
+        summary = cross_validate(
+            self.df[["a", "b"]],
+            self.df["target"],
+            RidgeRegression,
+            params={"alpha": "bad"},
+            folds=3,
+            workers=2,
+        )
+        self.assertEqual(summary["model"], "RidgeRegression")
+        self.assertEqual(summary["failed"], 3)
+        self.assertListEqual(
+            [result["fold"] for result in summary["results"]], [0, 1, 2]
+        )
+        self.assertTrue(np.isnan(summary["metrics"]["mae"]))
+
+        summary = cross_validate(
+            self.df[["a", "b"]], self.df["target"], RidgeRegression, workers=2
+        )
+        self.assertEqual(summary["succeeded"], 5)
+        self.assertGreater(summary["metrics"]["r2"], 0.99)
+
+    def test_unknown_metric(self):
+        """Ensure unknown metrics raise ValueError"""
+        with self.assertRaises(ValueError):
+            cross_validate(self.df, "target", RidgeRegression, metrics=["auc"])
@@ -0,0 +1,103 @@
+import os
+from unittest import TestCase, mock
+from tempfile import TemporaryDirectory
+
+import pandas as pd
+
+from caproj import bench
+from caproj.cli import main
+
+
+class TestBench(TestCase):
+    """Test caproj.bench benchmark suite"""
+
+    def test_make_bench_data(self):
+        """Ensure generated data has requested rows and is reproducible"""
+        df = bench.make_bench_data(100, seed=1)
+        self.assertEqual(len(df), 100)
+        self.assertTrue(df.equals(bench.make_bench_data(100, seed=1)))
+
+    def test_run_benchmarks(self):
+        """Ensure every benchmark reports time and memory per size"""
+        results = bench.run_benchmarks(sizes=[50, 100], repeat=1)
+        records = results['results']
+        self.assertEqual(len(records), 2 * len(bench.BENCHMARKS))
+        for record in records:
+            self.assertTrue(record['seconds'] >= 0)
+            self.assertTrue(record['peak_memory'] >= 0)
+
+    def test_from_file_written_once_per_size(self):
+        """Ensure the from_file csv is written once per size, not per run"""
+        with mock.patch.object(
+            pd.DataFrame, 'to_csv', autospec=True,
+            side_effect=pd.DataFrame.to_csv,
+        ) as to_csv_patch:
+            results = bench.run_benchmarks(
+                sizes=[50, 100], names=['from_file'], repeat=3
+            )
+        self.assertEqual(to_csv_patch.call_count, 2)
+        self.assertListEqual(
+            [record['rows'] for record in results['results']], [50, 100]
+        )
+
+    def test_run_benchmarks_unknown(self):
+        """Ensure unknown benchmark names raise KeyError"""
+        with self.assertRaises(KeyError):
+            bench.run_benchmarks(sizes=[10], names=['foo'])
+
+    def test_compare_results(self):
+        """Ensure regressions above threshold are flagged"""
+        baseline = {
+            'results': [
+                {'benchmark': 'a', 'rows': 10, 'seconds': 1.0,
+                 'peak_memory': 100},
+            ]
+        }
+        results = {
+            'results': [
+                {'benchmark': 'a', 'rows': 10, 'seconds': 1.05,
+                 'peak_memory': 200},
+                {'benchmark': 'b', 'rows': 10, 'seconds': 1.0,
+                 'peak_memory': 100},
+            ]
+        }
+        regressions = bench.compare_results(results, baseline, threshold=0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions[0]['metric'], 'peak_memory')
+
+    def test_save_load_results(self):
+        """Ensure results round trip through json"""
+        results = {'results': [{'benchmark': 'a', 'rows': 1}]}
+        with TemporaryDirectory() as tmp:
+            fp = os.path.join(tmp, 'sub', 'bench.json')
+            bench.save_results(results, fp)
+            self.assertDictEqual(bench.load_results(fp), results)
+
+
+class TestMainBench(TestCase):
+    """Test 'caproj bench' command"""
+
+    def test_main_bench_regression(self):
+        """Ensure bench command saves results and exits 1 on regression"""
+        with TemporaryDirectory() as tmp:
+            fp = os.path.join(tmp, 'bench.json')
+            baseline_fp = os.path.join(tmp, 'baseline.json')
+            bench.save_results(
+                {
+                    'results': [
+                        {'benchmark': 'lint_colnames', 'rows': 10,
+                         'seconds': 1e-12, 'peak_memory': 1},
+                    ]
+                },
+                baseline_fp,
+            )
+            with self.assertRaises(SystemExit) as cm:
+                main(
+                    [
+                        'bench', '--sizes', '10', '--benchmarks',
+                        'lint_colnames', '--repeat', '1', '--output', fp,
+                        '--baseline', baseline_fp,
+                    ]
+                )
+            self.assertEqual(cm.exception.code, 1)
+            self.assertTrue(os.path.exists(fp))
@@ -1,6 +1,10 @@
-from unittest import TestCase
+from unittest import TestCase, mock, skipIf
 
 import logging
+import subprocess
+import sys
+
+import pytest
 
 from caproj.cli import main
 
@@ -9,6 +13,20 @@ def test_main():
     main([])
 
 
+def test_main_run():
+    """Ensure run command executes pipeline json file"""
+    with mock.patch("caproj.data.pipeline.Pipeline") as pipeline_patch, \
+            mock.patch("caproj.logger.start_logging"):
+        pipeline_patch.from_json.return_value.timings = [("from_file", 0.1)]
+        main(["run", "pipeline.json"])
+        pipeline_patch.from_json.assert_called_once_with(
+            "pipeline.json", checkpoint_dir=None
+        )
+        pipeline_patch.from_json.return_value.run.assert_called_once_with(
+            resume=True
+        )
+
+
 class TestNullHandler(TestCase):
     """Test default logger is initialized with module"""
 
@@ -21,3 +39,128 @@ class TestNullHandler(TestCase):
         """Ensure logging.nullHandler is initialized with module"""
         logger = logging.getLogger('caproj')
         self.assertIsInstance(logger.handlers[0], logging.NullHandler)
+
+
+def test_main_batch_no_inputs():
+    """Ensure batch command errors when no input files are found"""
+    with pytest.raises(SystemExit):
+        main(["batch", "pipeline.json", "--inputs", "nonexistent*.csv"])
+
+
+def test_main_batch():
+    """Ensure batch command runs pipeline over expanded inputs"""
+    summary = {
+        "files": 1, "succeeded": 1, "failed": 0, "rows": 2, "seconds": 0.1,
+        "rows_per_sec": 20.0, "files_per_sec": 10.0,
+        "results": [
+            {"filename": "a.csv", "status": "ok", "seconds": 0.1, "rows": 2,
+             "error": None},
+        ],
+    }
+    with mock.patch("caproj.data.pipeline.Pipeline"), \
+            mock.patch("caproj.logger.start_logging"), \
+            mock.patch(
+                "caproj.data.batch.expand_inputs", return_value=["a.csv"]
+            ), \
+            mock.patch(
+                "caproj.data.batch.run_batch", return_value=summary
+            ) as run_batch_patch:
+        main(["batch", "pipeline.json", "--inputs", "*.csv", "--workers", "2"])
+        assert run_batch_patch.call_args[1]["workers"] == 2
+
+
+def test_main_serve():
+    """Ensure serve command starts and stops the service on interrupt"""
+    with mock.patch("caproj.data.pipeline.Pipeline"), \
+            mock.patch("caproj.logger.start_logging"), \
+            mock.patch("caproj.service.DataService") as service_patch, \
+            mock.patch("caproj.service.make_server") as server_patch:
+        server = server_patch.return_value
+        server.server_address = ("127.0.0.1", 8001)
+        server.serve_forever.side_effect = KeyboardInterrupt
+        main(["serve", "pipeline.json", "--port", "8001"])
+        assert server_patch.call_args[1]["port"] == 8001
+        service_patch.return_value.start_watching.assert_called_once_with()
+        service_patch.return_value.stop_watching.assert_called_once_with()
+        server.server_close.assert_called_once_with()
+
+
+def test_main_watch():
+    """Ensure watch command runs watcher until interrupted"""
+    with mock.patch("caproj.data.pipeline.Pipeline"), \
+            mock.patch("caproj.logger.start_logging"), \
+            mock.patch("caproj.data.watch.PipelineWatcher") as watcher_patch:
+        watcher = watcher_patch.return_value
+        watcher.pipeline.source_files.return_value = ["a.csv"]
+        watcher.watch.side_effect = KeyboardInterrupt
+        main(["watch", "pipeline.json", "--interval", "0.5"])
+        assert watcher_patch.call_args[1]["interval"] == 0.5
+        watcher.stop.assert_called_once_with()
+
+
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'pkg_resources']
+"""Modules that must not be imported by ``caproj`` or ``caproj.cli``"""
+
+
+class TestImportTime(TestCase):
+    """Test caproj package and cli import without heavy dependencies"""
+
+    def run_python(self, code):
+        """Run code in a fresh interpreter and return completed process"""
+        return subprocess.run(
+            [sys.executable, '-c', code],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+
+    @skipIf(sys.version_info < (3, 7), "lazy imports need PEP 562")
+    def test_import_no_heavy_modules(self):
+        """Ensure importing caproj modules does not import heavy dependencies"""
+        code = (
+            'import sys, caproj, caproj.cli, caproj.logger, '
+            'caproj.visualizations; '
+            'print(",".join(m for m in {} if m in sys.modules))'
+        ).format(HEAVY_MODULES)
+        self.assertEqual(self.run_python(code).stdout.strip(), '')
+
+    @skipIf(sys.version_info < (3, 7), "lazy imports need PEP 562")
+    def test_cli_import_no_heavy_modules(self):
+        """Ensure importing caproj.cli alone leaves slow imports out"""
+        code = (
+            'import sys, caproj.cli; '
+            'print(",".join(m for m in {} if m in sys.modules))'
+        ).format(HEAVY_MODULES)
+        self.assertEqual(self.run_python(code).stdout.strip(), '')
+
+    def test_eager_attributes_before_python37(self):
+        """Ensure lazy attributes are set eagerly where PEP 562 is missing"""
+        code = (
+            'import sys; sys.version_info = (3, 6, 9, "final", 0); '
+            'import caproj, caproj.visualizations; '
+            'print("plt" in vars(caproj.visualizations), '
+            '"matplotlib" in sys.modules)'
+        )
+        self.assertEqual(self.run_python(code).stdout.strip(), 'True True')
+
+    @skipIf(sys.version_info < (3, 8), "importlib.metadata needs Python 3.8")
+    def test_lazy_version(self):
+        """Ensure __version__ resolves lazily and unknown attributes raise"""
+        import importlib.metadata
+
+        import caproj
+
+        with mock.patch(
+            'importlib.metadata.version', return_value='1.2.3'
+        ) as version_patch:
+            self.assertEqual(caproj.__version__, '1.2.3')
+        version_patch.assert_called_once_with('caproj')
+        with mock.patch(
+            'importlib.metadata.version',
+            side_effect=importlib.metadata.PackageNotFoundError('caproj'),
+        ):
+            with self.assertRaises(AttributeError):
+                caproj.__version__
+        with self.assertRaises(AttributeError):
+            caproj.foo
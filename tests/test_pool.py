@@ -0,0 +1,97 @@
+"""
+Unit tests for caproj.pool module
+"""
+import logging
+import os
+import unittest
+from unittest import mock
+
+import caproj.pool
+from caproj import logger
+from caproj.pool import run_in_pool, worker_pool
+
+
+def _square(value):
+    """Return square of value, exiting the worker process on -1"""
+    if value == -1:
+        os._exit(1)
+    return value * value
+
+
+def _worker_logging(value):
+    """Return whether the worker set up logging and its root handlers"""
+    handlers = logging.getLogger().handlers
+    return caproj.pool._worker_ready, [type(handler).__name__ for handler in handlers]
+
+
+def _failed(args, error):
+    """Return failure marker of an item"""
+    return ("failed", args[0])
+
+
+class RunInPoolTests(unittest.TestCase):
+    """Tests to ensure caproj.pool.run_in_pool functions properly"""
+
+    def test_in_process(self):
+        """Ensure one worker processes items lazily in the calling process"""
+        items = ((value,) for value in range(4))
+        results = run_in_pool(_square, items, 1)
+        self.assertEqual(next(results), 0)
+        self.assertEqual(list(results), [1, 4, 9])
+
+    def test_completed(self):
+        """Ensure every item's result is yielded with a pool"""
+        results = run_in_pool(_square, [(value,) for value in range(6)], 2)
+        self.assertListEqual(sorted(results), [0, 1, 4, 9, 16, 25])
+
+    def test_ordered_window(self):
+        """Ensure ordered results follow the items with a bounded window"""
+        consumed = list()
+
+        def items():
+            for value in range(6):
+                consumed.append(value)
+                yield (value,)
+
+        results = run_in_pool(_square, items(), 2, ordered=True, window=2)
+        self.assertEqual(next(results), 0)
+        self.assertListEqual(consumed, [0, 1])
+        self.assertListEqual(list(results), [1, 4, 9, 16, 25])
+
+    def test_worker_died(self):
+        """Ensure a dead worker is passed to on_error or raised"""
+        results = list(
+            run_in_pool(_square, [(-1,)], 2, on_error=_failed, ordered=True)
+        )
+        self.assertListEqual(results, [("failed", -1)])
+        with self.assertRaises(Exception):
+            list(run_in_pool(_square, [(-1,)], 2))
+
+    def test_executor_reused(self):
+        """Ensure a given executor is used and left running"""
+        with worker_pool(2) as executor:
+            for _ in range(2):
+                results = run_in_pool(
+                    _square, [(2,), (3,)], 1, executor=executor, ordered=True
+                )
+                self.assertListEqual(list(results), [4, 9])
+
+    def test_without_pool_initializer(self):
+        """Ensure tasks set up worker logging where pools lack initializers"""
+        root = logging.getLogger()
+        handlers = list(root.handlers)
+        self.addCleanup(root.handlers.extend, handlers)
+        self.addCleanup(root.handlers.clear)
+        self.addCleanup(logger.stop_logging)
+        logger.start_logging(
+            default_path="foo.json",
+            env_key="foo",
+            use_queue=True,
+            queue_multiprocess=True,
+        )
+        with mock.patch("caproj.pool._POOL_INITIALIZER", False):
+            results = list(run_in_pool(_worker_logging, [(1,), (2,)], 2))
+        self.assertListEqual(
+            results, [(True, ["BoundedQueueHandler"])] * 2
+        )
+        self.assertFalse(caproj.pool._worker_ready)
@@ -0,0 +1,151 @@
+"""
+Unit tests for caproj.service module
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pandas as pd
+
+from caproj.data.pipeline import Pipeline
+from caproj.service import DataService, make_server
+
+
+class DataServiceTests(unittest.TestCase):
+    """Tests to ensure caproj.service.DataService functions properly"""
+
+    def setUp(self):
+        """Set up input file and service for tests"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.fp = os.path.join(self.tmpdir.name, "input.csv")
+        pd.DataFrame(
+            {"PID": [1, 1, 2, 3], "a": ["1", "2", "2", "x"]}
+        ).to_csv(self.fp, index=False)
+        self.pipeline = Pipeline(
+            [
+                {"step": "from_file", "filename": self.fp},
+                {"step": "sort_values", "by": "PID"},
+            ]
+        )
+        self.service = DataService(self.pipeline, reload_interval=0.05)
+
+    def test_records_by_id(self):
+        """Ensure ID lookups use the index and coerce query strings"""
+        self.assertListEqual(
+            self.service.records("1")["a"].tolist(), ["1", "2"]
+        )
+        self.assertTrue(self.service.records("9").empty)
+
+    def test_records_by_column(self):
+        """Ensure lookups on other columns filter the data"""
+        records = self.service.records("2", column="a")
+        self.assertListEqual(records["PID"].tolist(), [1, 2])
+        with self.assertRaises(KeyError):
+            self.service.records("2", column="missing")
+
+    def test_value_counts_cached(self):
+        """Ensure value counts are computed once per column"""
+        counts = self.service.value_counts("a")
+        self.assertEqual(counts["2"], 2)
+        self.assertIs(self.service.value_counts("a"), counts)
+        self.assertEqual(len(self.service.value_counts("a", top=1)), 1)
+
+    def test_summary(self):
+        """Ensure summary reports record and ID counts"""
+        summary = self.service.summary()
+        self.assertEqual(summary["n_records"], 4)
+        self.assertEqual(summary["n_unique"], 3)
+        self.assertListEqual(summary["columns"], ["PID", "a"])
+
+    def test_check_reload(self):
+        """Ensure data reloads only after a source file changes"""
+        self.assertFalse(self.service.check_reload())
+        self.service.value_counts("a")
+        pd.DataFrame({"PID": [5], "a": ["y"]}).to_csv(self.fp, index=False)
+        mtime = os.path.getmtime(self.fp) + 10
+        os.utime(self.fp, (mtime, mtime))
+        self.assertTrue(self.service.check_reload())
+        self.assertEqual(self.service.summary()["n_records"], 1)
+        self.assertEqual(self.service.value_counts("a")["y"], 1)
+
+    def test_failed_reload_keeps_data(self):
+        """Ensure a failed reload keeps serving the previous data"""
+        pd.DataFrame({"ID": [5]}).to_csv(self.fp, index=False)
+        mtime = os.path.getmtime(self.fp) + 10
+        os.utime(self.fp, (mtime, mtime))
+        self.assertFalse(self.service.check_reload())
+        self.assertEqual(self.service.summary()["n_records"], 4)
+
+    def test_watching(self):
+        """Ensure background thread reloads changed files"""
+        self.service.start_watching()
+        self.addCleanup(self.service.stop_watching)
+        loaded_at = self.service.loaded_at
+        mtime = os.path.getmtime(self.fp) + 10
+        os.utime(self.fp, (mtime, mtime))
+        deadline = time.time() + 5
+        while self.service.loaded_at == loaded_at and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertNotEqual(self.service.loaded_at, loaded_at)
+
+
+class ServerTests(unittest.TestCase):
+    """Tests to ensure caproj.service HTTP endpoints function properly"""
+
+    def setUp(self):
+        """Start server on a free port"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        fp = os.path.join(self.tmpdir.name, "input.csv")
+        pd.DataFrame({"PID": [1, 1, 2], "a": ["x", "y", "y"]}).to_csv(
+            fp, index=False
+        )
+        service = DataService(
+            Pipeline([{"step": "from_file", "filename": fp}])
+        )
+        self.server = make_server(service, port=0)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+
+    def get(self, path):
+        """Return decoded json response of a GET request"""
+        with urlopen(self.url + path) as response:
+            return json.loads(response.read().decode())
+
+    def test_records(self):
+        """Ensure records endpoint returns matching records"""
+        records = self.get("/records?value=1")
+        self.assertListEqual([rec["a"] for rec in records], ["x", "y"])
+
+    def test_value_counts(self):
+        """Ensure value_counts endpoint returns ordered pairs"""
+        self.assertListEqual(
+            self.get("/value_counts?column=a&top=1"), [["y", 2]]
+        )
+
+    def test_summary_and_health(self):
+        """Ensure summary and health endpoints respond"""
+        self.assertEqual(self.get("/summary")["n_records"], 3)
+        self.assertDictEqual(self.get("/health"), {"status": "ok"})
+
+    def test_errors(self):
+        """Ensure bad requests return 400 and unknown paths 404"""
+        with self.assertRaises(HTTPError) as context:
+            self.get("/value_counts?column=missing")
+        self.assertEqual(context.exception.code, 400)
+        with self.assertRaises(HTTPError) as context:
+            self.get("/records")
+        self.assertEqual(context.exception.code, 400)
+        with self.assertRaises(HTTPError) as context:
+            self.get("/unknown")
+        self.assertEqual(context.exception.code, 404)
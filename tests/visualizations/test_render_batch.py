@@ -0,0 +1,107 @@
+import os
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+
+import pandas as pd
+
+from caproj import visualizations as vis
+from caproj.visualizations.batch import render_barplots
+
+
+class TestBatchPlots(TestCase):
+    """Test headless and batch plotting functions"""
+
+    def setUp(self):
+        """Set up data and output directory for tests"""
+        self.tmpdir = TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.data = pd.Series(['a', 'b', 'b', 'c', 'c', 'c']).value_counts()
+        self.specs = [
+            {
+                'value_counts': self.data,
+                'title': 'test {}'.format(i),
+                'savepath': os.path.join(self.tmpdir.name, '{}.png'.format(i)),
+            }
+            for i in range(3)
+        ]
+
+    def test_make_barplot_no_pyplot(self):
+        """Test make_barplot does not register figures with pyplot"""
+        import matplotlib.pyplot as plt
+
+        n_figures = len(plt.get_fignums())
+        fig = vis.make_barplot(value_counts=self.data, title='test')
+        self.assertEqual(len(plt.get_fignums()), n_figures)
+        self.assertEqual(len(fig.axes), 1)
+
+    def test_render_barplots_serial(self):
+        """Test render_barplots writes every file in-process"""
+        results = render_barplots(self.specs, workers=1)
+        self.assertListEqual([r['status'] for r in results], ['ok'] * 3)
+        for spec in self.specs:
+            self.assertTrue(os.path.exists(spec['savepath']))
+
+    def test_render_barplots_pool_isolates_failures(self):
+        """Test a failing spec does not stop other plots in the pool"""
+        specs = self.specs + [
+            {
+                'value_counts': pd.Series([], dtype=int),
+                'title': 'empty',
+                'savepath': os.path.join(self.tmpdir.name, 'empty.png'),
+            }
+        ]
+        results = render_barplots(specs, workers=2)
+        self.assertListEqual([r['index'] for r in results], [0, 1, 2, 3])
+        self.assertEqual(results[-1]['status'], 'failed')
+        for spec in self.specs:
+            self.assertTrue(os.path.exists(spec['savepath']))
+
+    def test_render_barplots_requires_savepath(self):
+        """Test render_barplots rejects specs without savepath"""
+        with self.assertRaises(ValueError):
+            render_barplots([{'value_counts': self.data, 'title': 'test'}])
+
+    def test_render_barplots_cache(self):
+        """Test cached specs are skipped until data or parameters change"""
+        self.assertListEqual(
+            [r['status'] for r in render_barplots(self.specs, 1, cache=True)],
+            ['ok'] * 3
+        )
+        self.specs[1]['title'] = 'changed'
+        self.specs[2]['value_counts'] = self.data + 1
+        results = render_barplots(self.specs, workers=1, cache=True)
+        self.assertListEqual(
+            [r['status'] for r in results], ['cached', 'ok', 'ok']
+        )
+        os.remove(self.specs[0]['savepath'])
+        results = render_barplots(self.specs, workers=1, cache=True)
+        self.assertListEqual(
+            [r['status'] for r in results], ['ok', 'cached', 'cached']
+        )
+
+    def test_render_barplots_cache_defaults(self):
+        """Test explicit default arguments share the cache key"""
+        render_barplots(self.specs[:1], workers=1, cache=True)
+        spec = dict(self.specs[0], top=None, height=6)
+        results = render_barplots([spec], workers=1, cache=True)
+        self.assertEqual(results[0]['status'], 'cached')
+
+    def test_render_barplots_cache_isolates_invalid_spec(self):
+        """Test a spec whose cache key fails only fails that spec"""
+        specs = self.specs + [
+            {
+                'value_counts': self.data,
+                'title': 'invalid',
+                'colour': 'k',
+                'savepath': os.path.join(self.tmpdir.name, 'invalid.png'),
+            }
+        ]
+        for workers in [1, 2]:
+            with self.subTest(workers=workers):
+                results = render_barplots(specs, workers=workers, cache=True)
+                self.assertListEqual(
+                    [r['status'] for r in results[:3]],
+                    ['ok'] * 3 if workers == 1 else ['cached'] * 3
+                )
+                self.assertEqual(results[3]['status'], 'failed')
+                self.assertIn('TypeError', results[3]['error'])
@@ -0,0 +1,111 @@
+import os
+from unittest import TestCase, mock
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pandas as pd
+
+from caproj.visualizations import report
+
+
+class TestReport(TestCase):
+    """Test multi-figure report builder"""
+
+    def setUp(self):
+        """Set up plot specs and output directory for tests"""
+        self.tmpdir = TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.specs = [
+            {
+                'value_counts': pd.Series([3, 2, 1], index=['a', 'b', 'c']),
+                'title': 'bars <1>',
+            },
+            {
+                'kind': 'hexbin',
+                'x': np.arange(100),
+                'y': np.arange(100) % 7,
+                'gridsize': 10,
+                'title': 'hexbin',
+            },
+            {'kind': 'hist2d', 'x': [1, 2], 'y': [3, 4], 'bins': 4},
+        ]
+
+    def test_build_report_pdf(self):
+        """Test plots are written as PDF pages in a pool"""
+        fp = os.path.join(self.tmpdir.name, 'reports', 'report.pdf')
+        summary = report.build_report(self.specs, fp, workers=2)
+        self.assertEqual(summary['succeeded'], 3)
+        self.assertListEqual([r['index'] for r in summary['results']], [0, 1, 2])
+        with open(fp, 'rb') as f:
+            content = f.read()
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertIn(b'/Count 3', content)
+        self.assertFalse(os.path.exists(fp.replace('.pdf', '.tmp.pdf')))
+
+    def test_build_report_html(self):
+        """Test plots are embedded in a self-contained HTML file"""
+        fp = os.path.join(self.tmpdir.name, 'report.html')
+        summary = report.build_report(
+            self.specs, fp, title='EDA', workers=1
+        )
+        self.assertEqual(summary['plots'], 3)
+        with open(fp) as f:
+            content = f.read()
+        self.assertEqual(content.count('data:image/png;base64,'), 3)
+        self.assertIn('<title>EDA</title>', content)
+        self.assertIn('alt="bars &lt;1&gt;"', content)
+
+    def test_build_report_skips_failed(self):
+        """Test failed specs are reported and left out of the report"""
+        fp = os.path.join(self.tmpdir.name, 'report.html')
+        specs = [{'value_counts': pd.Series([], dtype=int), 'title': 'x'}]
+        summary = report.build_report(specs + self.specs[:1], fp, workers=1)
+        self.assertEqual(summary['failed'], 1)
+        self.assertIn('ValueError', summary['results'][0]['error'])
+        with open(fp) as f:
+            self.assertEqual(f.read().count('<img'), 1)
+
+    def test_build_report_bounded_window(self):
+        """Test at most two specs per worker are in flight"""
+        submitted = []
+        render = report._render_png
+
+        class Executor(object):
+            """Run submissions immediately, recording in-flight counts"""
+
+            def __init__(self, **kwargs):
+                self.pending = 0
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+            def submit(executor, func, index, spec, dpi):
+                executor.pending += 1
+                submitted.append(executor.pending)
+                future = mock.Mock()
+
+                def result():
+                    executor.pending -= 1
+                    return render(index, spec, dpi)
+
+                future.result.side_effect = result
+                return future
+
+        specs = [self.specs[0]] * 6
+        fp = os.path.join(self.tmpdir.name, 'report.pdf')
+        with mock.patch(
+            'concurrent.futures.ProcessPoolExecutor', Executor
+        ):
+            summary = report.build_report(specs, fp, workers=2)
+        self.assertEqual(summary['succeeded'], 6)
+        self.assertEqual(max(submitted), 4)
+
+    def test_build_report_invalid(self):
+        """Test unknown report formats and plot kinds raise ValueError"""
+        with self.assertRaises(ValueError):
+            report.build_report(self.specs, 'report.png')
+        with self.assertRaises(ValueError):
+            report.build_report([{'kind': 'pie'}], 'report.pdf')
@@ -2,6 +2,7 @@ import os
 from unittest import TestCase, mock
 from tempfile import TemporaryDirectory
 
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
@@ -43,6 +44,144 @@ class TestPlots(TestCase):
             vis.plot_barplot(value_counts=data, title='test')
             self.assertTrue(show_patch.called)
 
+    def test_plot_cache_key(self):
+        """Test cache key changes with data, index and parameters"""
+        data = self.data['x']
+        key = vis.plot_cache_key(data, title='a')
+        self.assertEqual(key, vis.plot_cache_key(data.copy(), title='a'))
+        self.assertNotEqual(key, vis.plot_cache_key(data, title='b'))
+        self.assertNotEqual(key, vis.plot_cache_key(data + 1, title='a'))
+        self.assertNotEqual(
+            key, vis.plot_cache_key(data.rename('z'), title='a')
+        )
+        self.assertNotEqual(
+            vis.plot_cache_key(self.data), vis.plot_cache_key(self.data[['y', 'x']])
+        )
+
+    def test_save_plot_cache_key(self):
+        """Test save_plot records cache key and plain saves remove it"""
+        with TemporaryDirectory() as tmp:
+            fp = os.path.join(tmp, 'test.png')
+            fig = vis.make_barplot(self.data['x'].value_counts(), 'test')
+            self.assertFalse(vis.is_plot_cached(fp, 'abc'))
+            vis.save_plot(plt_object=fig, savepath=fp, cache_key='abc')
+            self.assertTrue(vis.is_plot_cached(fp, 'abc'))
+            self.assertFalse(vis.is_plot_cached(fp, 'def'))
+            vis.save_plot(plt_object=fig, savepath=fp)
+            self.assertFalse(vis.is_plot_cached(fp, 'abc'))
+
+    def test_plot_barplot_cache(self):
+        """Test plot_barplot skips rendering when saved plot is up to date"""
+        data = self.data['x'].value_counts()
+        with TemporaryDirectory() as tmp, \
+                mock.patch("caproj.visualizations.plt.show") as show_patch:
+            fp = os.path.join(tmp, 'test.png')
+            vis.plot_barplot(data, title='test', savepath=fp, cache=True)
+            vis.plot_barplot(data, title='test', savepath=fp, cache=True)
+            self.assertEqual(show_patch.call_count, 1)
+
+    def test_make_barplot_top_n(self):
+        """Test high-cardinality value counts are capped with other bucket"""
+        data = pd.Series(range(1000, 0, -1), index=range(1000))
+        fig = vis.make_barplot(value_counts=data, title='test', top=10)
+        ax = fig.axes[0]
+        self.assertEqual(len(ax.patches), 11)
+        self.assertEqual(ax.get_yticklabels()[-1].get_text(), 'other')
+        widths = [patch.get_width() for patch in ax.patches]
+        self.assertEqual(sum(widths), data.sum())
+        self.assertEqual(len(ax.texts), 11)
+        self.assertEqual(ax.texts[0].get_text(), '1,000')
+
+    def test_make_barplot_plots_all_values_by_default(self):
+        """Test all values are plotted unless top is given"""
+        data = pd.Series(range(100, 0, -1), index=range(100))
+        fig = vis.make_barplot(value_counts=data, title='test')
+        self.assertEqual(len(fig.axes[0].patches), 100)
+
+    def test_make_barplot_auto_height(self):
+        """Test automatic figure height grows with the number of bars"""
+        small = vis.make_barplot(pd.Series([1, 2]), title='test', height=None)
+        large = vis.make_barplot(
+            pd.Series(range(100)), title='test', height=None, top=40
+        )
+        self.assertLess(small.get_figheight(), large.get_figheight())
+        self.assertEqual(
+            vis.make_barplot(pd.Series([1]), 'test').get_figheight(), 6
+        )
+
+    def test_make_barplot_auto_height_capped(self):
+        """Test automatic height keeps the top values at a bounded size"""
+        data = pd.Series(range(5000, 0, -1), index=range(5000))
+        fig = vis.make_barplot(data, title='test', height=None)
+        self.assertEqual(len(fig.axes[0].patches), 51)
+        fig = vis.make_barplot(data, title='test', height=None, top=1000)
+        self.assertEqual(fig.get_figheight(), 30)
+
+    def test_make_barplot_many_bars_unlabeled(self):
+        """Test bars above the label threshold are drawn without labels"""
+        data = pd.Series(range(5000, 0, -1), index=range(5000))
+        ax = vis.make_barplot(data, title='test').axes[0]
+        self.assertEqual(ax.get_figure().get_figheight(), 6)
+        self.assertEqual(len(ax.texts), 0)
+        self.assertEqual(len(ax.get_yticks()), 0)
+        self.assertEqual(len(ax.collections[0].get_paths()), 5000)
+
+    def test_make_barplot_truncates_labels(self):
+        """Test long category labels are truncated"""
+        data = pd.Series([2, 1], index=['x' * 100, 'short'])
+        fig = vis.make_barplot(data, title='test', max_label_length=10)
+        labels = [label.get_text() for label in fig.axes[0].get_yticklabels()]
+        self.assertListEqual(labels, ['xxxxxxx...', 'short'])
+
+    def test_make_barplot_empty(self):
+        """Test empty value counts raise ValueError"""
+        with self.assertRaises(ValueError):
+            vis.make_barplot(pd.Series([], dtype=int), title='test')
+
+    def test_bin_2d_matches_histogram2d(self):
+        """Test bin_2d counts match numpy histogram2d"""
+        rng = np.random.default_rng(0)
+        x, y = rng.normal(size=1000), rng.normal(size=1000)
+        counts, xedges, yedges = vis.bin_2d(x, y, bins=(10, 20))
+        expected, ex, ey = np.histogram2d(x, y, bins=(10, 20))
+        np.testing.assert_array_equal(counts, expected)
+        np.testing.assert_allclose(xedges, ex)
+        np.testing.assert_allclose(yedges, ey)
+
+    def test_bin_2d_drops_missing_and_outside(self):
+        """Test bin_2d skips non-finite pairs and pairs outside range"""
+        x = pd.Series([0.0, 0.5, np.nan, 1.0, 5.0])
+        y = pd.Series([0.0, 0.5, 0.5, np.inf, 0.5])
+        counts, _, _ = vis.bin_2d(x, y, bins=2, range=((0, 1), (0, 1)))
+        self.assertEqual(counts.sum(), 2)
+        with self.assertRaises(ValueError):
+            vis.bin_2d([1, 2], [1])
+
+    def test_bin_2d_quantiles(self):
+        """Test quantiles bound the binned area"""
+        x = np.arange(101, dtype=float)
+        _, xedges, _ = vis.bin_2d(x, x, bins=4, quantiles=(0.1, 0.9))
+        self.assertListEqual([xedges[0], xedges[-1]], [10.0, 90.0])
+
+    def test_make_hist2d_and_hexbin(self):
+        """Test binned figures keep every counted record"""
+        x = pd.Series(np.arange(1000) % 7, name='budget')
+        y = pd.Series(np.arange(1000) % 11, name='schedule')
+        fig = vis.make_hist2d(x, y, bins=5)
+        self.assertEqual(fig.axes[0].collections[0].get_array().sum(), 1000)
+        self.assertEqual(fig.axes[0].get_xlabel(), 'budget')
+        fig = vis.make_hexbin(x, y, gridsize=5, log=False)
+        self.assertEqual(fig.axes[0].collections[0].get_array().sum(), 1000)
+        with TemporaryDirectory() as tmp:
+            fp = os.path.join(tmp, 'hexbin.png')
+            vis.save_plot(plt_object=fig, savepath=fp)
+            self.assertTrue(os.path.exists(fp))
+
+    def test_make_hist2d_empty(self):
+        """Test binned figures of data without finite pairs"""
+        fig = vis.make_hist2d([np.nan], [1.0], bins=5)
+        self.assertEqual(len(fig.axes), 2)
+
     # def test_plot_barplot_saves(self):
     #     """Test plot_barplot saves to file using savefile"""
     #     data = self.data['x'].value_counts()